@@ -0,0 +1,81 @@
+"""
+Measure the per-request cost of getting a database connection.
+
+Each simulated request runs one query and then ends the way Django ends a
+request (close_if_unusable_or_obsolete), under three configurations of the
+default database:
+
+- connect: CONN_MAX_AGE=0, a new connection for every request
+- persistent: CONN_MAX_AGE=None with health checks, one connection reused
+- pool: the psycopg 3 pool (OPTIONS['pool']), connections borrowed and returned
+
+The pool needs PostgreSQL with psycopg 3 and psycopg_pool; it is skipped on
+other backends. Only SELECT 1 is run, so the configured database is used as is.
+
+Usage:
+    python -m benchmarks.bench_connections [--requests 500] [--pool-size 4]
+"""
+import argparse
+import json
+
+from benchmarks.utils import setup_django, time_calls
+
+setup_django()
+
+from django.db import connections  # noqa: E402
+
+
+def add_alias(alias, **overrides):
+    # Register a copy of the default database settings under another alias
+    settings = {**connections.settings['default'], **overrides}
+    settings['OPTIONS'] = {**settings.get('OPTIONS', {}), **overrides.get('OPTIONS', {})}
+    if 'pool' not in overrides.get('OPTIONS', {}):
+        settings['OPTIONS'].pop('pool', None)
+    connections.settings[alias] = settings
+    return connections[alias]
+
+
+def request_cycle(connection):
+    # One request: a query, then the end-of-request connection handling
+    def handle(_):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        connection.close_if_unusable_or_obsolete()
+    return handle
+
+
+def bench_connections(requests, pool_size):
+    modes = {
+        'connect': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+        'persistent': {'CONN_MAX_AGE': None, 'CONN_HEALTH_CHECKS': True},
+    }
+    vendor = connections['default'].vendor
+    if vendor == 'postgresql':
+        modes['pool'] = {'CONN_MAX_AGE': 0, 'OPTIONS': {'pool': {'min_size': pool_size, 'max_size': pool_size}}}
+
+    results = {}
+    for mode, overrides in modes.items():
+        connection = add_alias(f'bench_{mode}', **overrides)
+        handle = request_cycle(connection)
+        handle(None)  # Warm up: the persistent connection or the pool is opened outside the timings
+        results[f'connection.{mode}'] = time_calls(handle, range(requests))
+        connection.close()
+        if mode == 'pool':
+            connection.close_pool()
+
+    if 'pool' not in modes:
+        results['connection.pool'] = {'skipped': f'pooling needs PostgreSQL with psycopg 3, not {vendor}'}
+    return {'meta': {'database': vendor, 'requests': requests, 'pool_size': pool_size}, 'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500, help='Simulated requests per configuration')
+    parser.add_argument('--pool-size', type=int, default=4, help='Connections kept in the pool')
+    args = parser.parse_args()
+    print(json.dumps(bench_connections(args.requests, args.pool_size), indent=2))
+
+
+if __name__ == '__main__':
+    main()
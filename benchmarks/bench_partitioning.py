@@ -0,0 +1,162 @@
+"""
+Measure per-customer query latency as the loan book grows, with and without partitioning.
+
+For each Loan table layout the book is grown step by step to each --sizes total,
+keeping the loans per customer constant, and after each step the scoring
+aggregate and the first page of a customer's loans are timed for random
+customers. Flat latencies across sizes mean the per-customer cost does not
+depend on the total number of loans.
+
+Layouts:
+- plain: the regular table with the composite scoring indexes
+- hash: partitioned by hash of customer_id (--partitions partitions)
+- range: partitioned by start_date year
+
+The partitioned layouts need PostgreSQL, where rows are generated server-side
+with generate_series so books of 100M+ loans can be built (allow for the disk:
+roughly 25 GB per 100M loans with indexes). Other backends run the plain layout
+with rows generated in Python.
+
+Usage:
+    python -m benchmarks.bench_partitioning [--sizes 100000,1000000,10000000] [--layouts plain,hash]
+    python -m benchmarks.bench_partitioning --sizes 1000000,10000000,100000000,200000000 --samples 1000
+"""
+import argparse
+import json
+import random
+
+from benchmarks.utils import setup_django, temporary_database, time_calls
+
+setup_django()
+
+from django.db import connection  # noqa: E402
+
+from benchmarks.datagen import generate_customer_rows, generate_loan_rows  # noqa: E402
+from credit_app import partitioning  # noqa: E402
+from credit_app.models import Customer, Loan  # noqa: E402
+from credit_app.utils import CustomerCreditSnapshot  # noqa: E402
+
+CUSTOMERS_SQL = '''
+INSERT INTO credit_app_customer (first_name, last_name, age, phone_number, monthly_salary, approved_limit)
+SELECT 'First' || g, 'Last' || g, 21 + g % 49, 6000000000 + g, salary, round(36 * salary, -5)
+FROM (SELECT g, 10000 + (g * 7919) % 490000 AS salary FROM generate_series(%s, %s) g) customers
+'''
+
+# Volatile values are drawn once per row in the inner query, then derived columns reuse them
+LOANS_SQL = '''
+INSERT INTO credit_app_loan (customer_id, loan_amount, tenure, interest_rate, monthly_repayment, emis_paid_on_time, start_date, end_date)
+SELECT customer_id, amount, tenure, rate,
+       round((amount * rate / 1200 / (1 - power(1 + rate / 1200, -tenure)))::numeric, 2),
+       CASE WHEN paid < 0.7 THEN floor(tenure * paid) ELSE tenure END,
+       start_date, (start_date + make_interval(months => tenure))::date
+FROM (
+    SELECT c.customer_id, 10000 + floor(random() * 1990000) AS amount, 6 + floor(random() * 174)::int AS tenure,
+           (ARRAY[8.0, 10.5, 12.0, 14.5, 16.0, 18.5])[1 + floor(random() * 6)::int] AS rate, random() AS paid,
+           current_date - floor(random() * 3650)::int AS start_date
+    FROM credit_app_customer c CROSS JOIN generate_series(1, %s) s
+    WHERE c.customer_id BETWEEN %s AND %s
+) loans
+'''
+
+
+def grow_loan_book(customers, target_customers, loans_per_customer, chunk_size=100000):
+    """
+    Add customers, each with loans_per_customer loans, until there are target_customers.
+
+    Args:
+    - customers: int, Customers already inserted (ids 1..customers)
+    - target_customers: int, Customers wanted
+    - loans_per_customer: int, Loans inserted per new customer
+    - chunk_size: int, Customers inserted per statement or batch
+    """
+    for start in range(customers + 1, target_customers + 1, chunk_size):
+        end = min(start + chunk_size - 1, target_customers)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(CUSTOMERS_SQL, [start, end])
+                cursor.execute(LOANS_SQL, [loans_per_customer, start, end])
+            continue
+
+        rows = generate_customer_rows(end - start + 1, seed=start)
+        created = Customer.objects.bulk_create(
+            [Customer(customer_id=customer_id, **row) for customer_id, row in zip(range(start, end + 1), rows)])
+        loans = generate_loan_rows([customer.customer_id for customer in created], loans_per_customer, seed=start)
+        Loan.objects.bulk_create([Loan(**row) for row in loans], batch_size=5000)
+
+
+def scoring_query(customer_id):
+    return Loan.objects.filter(customer_id=customer_id).aggregate(**CustomerCreditSnapshot.aggregates())
+
+
+def loans_page(customer_id):
+    return list(Loan.objects.filter(customer_id=customer_id).order_by('loan_id').values('loan_id', 'loan_amount')[:100])
+
+
+def measure(customers, samples, seed):
+    sample = [random.Random(seed).randint(1, customers) for _ in range(samples)]
+    plan = Loan.objects.filter(customer_id=sample[0]).values('customer_id').annotate(**CustomerCreditSnapshot.aggregates()).explain()
+    return {
+        'scoring': time_calls(scoring_query, sample),
+        'loans_page': time_calls(loans_page, sample),
+        'plan': plan,
+    }
+
+
+def bench_layout(layout, sizes, loans_per_customer, partitions, samples):
+    results = []
+    with temporary_database():
+        if layout != 'plain':
+            # Partition the empty table the way migration 0018 does
+            partitioning.prepare(connection, layout, partitions, range(2010, 2040))
+            partitioning.swap(connection)
+            partitioning.drop_old(connection)
+
+        customers = 0
+        for size in sizes:
+            target = max(1, size // loans_per_customer)
+            grow_loan_book(customers, target, loans_per_customer)
+            customers = target
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('VACUUM ANALYZE credit_app_loan')
+            results.append({'loans': customers * loans_per_customer, **measure(customers, samples, seed=size)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='100000,1000000,10000000',
+                        help='Comma-separated total loan counts, measured in ascending order')
+    parser.add_argument('--loans-per-customer', type=int, default=20)
+    parser.add_argument('--layouts', default='plain,hash,range', help='Comma-separated layouts: plain, hash, range')
+    parser.add_argument('--partitions', type=int, default=16, help='Number of hash partitions')
+    parser.add_argument('--samples', type=int, default=500)
+    parser.add_argument('--json', action='store_true', help='Print machine-readable JSON instead of a report')
+    args = parser.parse_args()
+
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    results = {}
+    for layout in args.layouts.split(','):
+        if layout != 'plain' and connection.vendor != 'postgresql':
+            results[layout] = {'skipped': f'partitioning needs PostgreSQL, not {connection.vendor}'}
+            continue
+        results[layout] = bench_layout(layout, sizes, args.loans_per_customer, args.partitions, args.samples)
+
+    if args.json:
+        print(json.dumps({'vendor': connection.vendor, 'loans_per_customer': args.loans_per_customer, 'results': results}, indent=2))
+        return
+
+    print(f'{connection.vendor}: {args.loans_per_customer} loans per customer')
+    for layout, rows in results.items():
+        print(f'\n[{layout}]')
+        if isinstance(rows, dict):
+            print(rows['skipped'])
+            continue
+        for row in rows:
+            print(f"{row['loans']:>13,} loans  scoring p50={row['scoring']['p50_ms']:.3f}ms p99={row['scoring']['p99_ms']:.3f}ms  "
+                  f"page p50={row['loans_page']['p50_ms']:.3f}ms p99={row['loans_page']['p99_ms']:.3f}ms")
+        print(rows[-1]['plan'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Compare per-request CPU time of the read endpoints against the previous serializer-based path.
+
+The legacy views below reproduce the ModelSerializer implementation the read
+endpoints used before the values()/select_related fast path. Both versions run
+through the same DRF stack with APIRequestFactory against a throwaway test
+database, and CPU time is measured with time.process_time.
+
+Usage:
+    python -m benchmarks.bench_read_paths [--loans-per-customer 200] [--requests 300]
+"""
+import argparse
+import json
+import time
+
+from benchmarks.utils import percentile, setup_django, temporary_database
+
+setup_django()
+
+from rest_framework import status  # noqa: E402
+from rest_framework.response import Response  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+from rest_framework.views import APIView  # noqa: E402
+
+from benchmarks.datagen import seed_loan_book  # noqa: E402
+from credit_app.models import Loan  # noqa: E402
+from credit_app.serializers import CustomerSerializer, LoanSerializer  # noqa: E402
+from credit_app.views import ViewLoanDetails, ViewLoansByCustomer  # noqa: E402
+
+
+class LegacyViewLoanDetails(APIView):
+    def get(self, request, loan_id):
+        loan = Loan.objects.get(loan_id=loan_id)
+        loan_serializer = LoanSerializer(loan)
+        customer_serializer = CustomerSerializer(loan.customer)
+        customer_data = {field: customer_serializer.data[field]
+                         for field in ['customer_id', 'first_name', 'last_name', 'phone_number', 'age']}
+        return Response({
+            'loan_id': loan_serializer.data['loan_id'],
+            'customer': customer_data,
+            'loan_amount': loan_serializer.data['loan_amount'],
+            'interest_rate': loan_serializer.data['interest_rate'],
+            'monthly_repayment': loan_serializer.data['monthly_repayment'],
+            'tenure': loan_serializer.data['tenure'],
+        }, status=status.HTTP_200_OK)
+
+
+class LegacyViewLoansByCustomer(APIView):
+    def get(self, request, customer_id):
+        loans = Loan.objects.filter(customer__customer_id=customer_id)
+        response_data = []
+        for loan_data in LoanSerializer(loans, many=True).data:
+            response_data.append({
+                'loan_id': loan_data['loan_id'],
+                'loan_amount': loan_data['loan_amount'],
+                'interest_rate': loan_data['interest_rate'],
+                'monthly_installment': loan_data['monthly_repayment'],
+                'repayments_left': loan_data['tenure'] - loan_data['emis_paid_on_time'],
+            })
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
+def cpu_times(view, path, kwargs_list):
+    # CPU milliseconds per request, including rendering the JSON body
+    factory = APIRequestFactory()
+    timings = []
+    for kwargs in kwargs_list:
+        started = time.process_time()
+        response = view(factory.get(path), **kwargs)
+        response.render()
+        timings.append((time.process_time() - started) * 1000)
+    return {
+        'p50_ms': percentile(timings, 0.50),
+        'p95_ms': percentile(timings, 0.95),
+        'mean_ms': sum(timings) / len(timings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--customers', type=int, default=20)
+    parser.add_argument('--loans-per-customer', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    with temporary_database():
+        customer_ids = seed_loan_book(args.customers, args.loans_per_customer)
+        loan_ids = list(Loan.objects.values_list('loan_id', flat=True)[:args.requests])
+        details = [{'loan_id': loan_id} for loan_id in loan_ids]
+        by_customer = [{'customer_id': customer_ids[index % len(customer_ids)]} for index in range(args.requests)]
+
+        results = {
+            'loan_details': {
+                'legacy': cpu_times(LegacyViewLoanDetails.as_view(), '/view-loan/', details),
+                'fast': cpu_times(ViewLoanDetails.as_view(), '/view-loan/', details),
+            },
+            'loans_by_customer': {
+                'legacy': cpu_times(LegacyViewLoansByCustomer.as_view(), '/view-loans/', by_customer),
+                'fast': cpu_times(ViewLoansByCustomer.as_view(), '/view-loans/', by_customer),
+            },
+        }
+
+    for endpoint in results.values():
+        endpoint['speedup'] = endpoint['legacy']['mean_ms'] / endpoint['fast']['mean_ms']
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
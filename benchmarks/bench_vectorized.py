@@ -0,0 +1,71 @@
+"""
+Micro-benchmark of the scalar scoring/EMI functions against the NumPy kernels.
+
+Usage:
+    python -m benchmarks.bench_vectorized [--size 1000000] [--repeat 3]
+"""
+import argparse
+import time
+
+from benchmarks.utils import setup_django
+
+setup_django()
+
+import numpy as np  # noqa: E402
+
+from credit_app.utils import calculate_corrected_interest_rate, calculate_monthly_installment  # noqa: E402
+from credit_app.vectorized import calculate_corrected_interest_rates, calculate_monthly_installments  # noqa: E402
+
+
+def generate_inputs(size, seed=0):
+    # Random but realistic loan book inputs
+    rng = np.random.default_rng(seed)
+    return {
+        'credit_scores': rng.integers(0, 101, size),
+        'loan_amounts': rng.integers(10_000, 5_000_000, size).astype(np.float64),
+        'tenures': rng.integers(6, 240, size),
+        'interest_rates': rng.choice([0.0, 8.0, 10.5, 12.0, 14.0, 18.0], size),
+    }
+
+
+def run_scalar(inputs):
+    installments = []
+    for score, amount, tenure, rate in zip(inputs['credit_scores'].tolist(), inputs['loan_amounts'].tolist(),
+                                           inputs['tenures'].tolist(), inputs['interest_rates'].tolist()):
+        corrected = calculate_corrected_interest_rate(score, rate)
+        installments.append(calculate_monthly_installment(amount, tenure, corrected))
+    return installments
+
+
+def run_vectorized(inputs):
+    corrected = calculate_corrected_interest_rates(inputs['credit_scores'], inputs['interest_rates'])
+    return calculate_monthly_installments(inputs['loan_amounts'], inputs['tenures'], corrected)
+
+
+def best_of(function, inputs, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(inputs)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=1_000_000, help='Number of loans to price')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of timed runs (best is reported)')
+    args = parser.parse_args()
+
+    inputs = generate_inputs(args.size)
+    scalar = best_of(run_scalar, inputs, args.repeat)
+    vectorized = best_of(run_vectorized, inputs, args.repeat)
+
+    print(f'loans:      {args.size}')
+    print(f'scalar:     {scalar:.4f}s ({args.size / scalar:,.0f} loans/s)')
+    print(f'vectorized: {vectorized:.4f}s ({args.size / vectorized:,.0f} loans/s)')
+    print(f'speedup:    {scalar / vectorized:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
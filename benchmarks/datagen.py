@@ -0,0 +1,143 @@
+# benchmarks/datagen.py
+import csv
+from datetime import date, timedelta
+
+import numpy as np
+
+
+def generate_customer_rows(count, seed=0):
+    """
+    Yield synthetic customer field dictionaries.
+
+    Args:
+    - count: int, Number of customers
+    - seed: int, Random seed so runs are repeatable
+    """
+    rng = np.random.default_rng(seed)
+    salaries = rng.integers(10_000, 500_000, count)
+    ages = rng.integers(21, 70, count)
+    phones = rng.integers(6_000_000_000, 9_999_999_999, count)
+
+    for index in range(count):
+        salary = int(salaries[index])
+        yield {
+            'first_name': f'First{index}',
+            'last_name': f'Last{index}',
+            'age': int(ages[index]),
+            'phone_number': int(phones[index]),
+            'monthly_salary': salary,
+            'approved_limit': int(round(36 * salary, -5)),
+        }
+
+
+def generate_loan_rows(customer_ids, loans_per_customer, seed=0, chunk_size=10_000):
+    """
+    Yield synthetic loan field dictionaries for the given customers.
+
+    Loans are generated chunk by chunk so memory stays bounded on large books.
+
+    Args:
+    - customer_ids: list of int, Customers that own the loans
+    - loans_per_customer: int, Average number of loans per customer
+    - seed: int, Random seed so runs are repeatable
+    - chunk_size: int, Number of loans generated per NumPy pass
+    """
+    from credit_app.amortization import add_months
+
+    rng = np.random.default_rng(seed + 1)
+    total = len(customer_ids) * loans_per_customer
+    owners = np.asarray(customer_ids)
+    today = date.today()
+
+    for start in range(0, total, chunk_size):
+        size = min(chunk_size, total - start)
+        owner_index = rng.integers(0, len(owners), size)
+        amounts = rng.integers(10_000, 2_000_000, size)
+        tenures = rng.integers(6, 180, size)
+        rates = rng.choice([8.0, 10.5, 12.0, 14.5, 16.0, 18.5], size)
+        paid_fraction = rng.random(size)
+        start_offsets = rng.integers(0, 3650, size)
+
+        for index in range(size):
+            tenure = int(tenures[index])
+            amount = float(amounts[index])
+            monthly_rate = rates[index] / 1200
+            start_date = today - timedelta(days=int(start_offsets[index]))
+            yield {
+                'customer_id': int(owners[owner_index[index]]),
+                'loan_amount': amount,
+                'tenure': tenure,
+                'interest_rate': float(rates[index]),
+                'monthly_repayment': round(amount * monthly_rate / (1 - (1 + monthly_rate) ** -tenure), 2),
+                'emis_paid_on_time': int(tenure * paid_fraction[index]) if paid_fraction[index] < 0.7 else tenure,
+                'start_date': start_date,
+                'end_date': add_months(start_date, tenure),
+            }
+
+
+def seed_loan_book(customers, loans_per_customer, seed=0, batch_size=5000):
+    """
+    Insert a synthetic loan book and rebuild the materialized loan stats.
+
+    Args:
+    - customers: int, Number of customers
+    - loans_per_customer: int, Average number of loans per customer
+    - seed: int, Random seed so runs are repeatable
+    - batch_size: int, Number of rows per insert
+
+    Returns:
+    - list: Ids of the inserted customers
+    """
+    from credit_app.loan_stats import rebuild_loan_stats
+    from credit_app.models import Customer, Loan
+
+    rows = generate_customer_rows(customers, seed)
+    customer_ids = []
+    while True:
+        batch = [Customer(**row) for _, row in zip(range(batch_size), rows)]
+        if not batch:
+            break
+        customer_ids.extend(customer.customer_id for customer in Customer.objects.bulk_create(batch, batch_size=batch_size))
+
+    rows = generate_loan_rows(customer_ids, loans_per_customer, seed)
+    while True:
+        batch = [Loan(**row) for _, row in zip(range(batch_size), rows)]
+        if not batch:
+            break
+        Loan.objects.bulk_create(batch, batch_size=batch_size)
+
+    rebuild_loan_stats()
+    return customer_ids
+
+
+def write_initdata_files(directory, customers, loans_per_customer, seed=0):
+    """
+    Write synthetic customer and loan CSV files in the layout initdata imports.
+
+    Args:
+    - directory: pathlib.Path, Directory the files are written to
+    - customers: int, Number of customers
+    - loans_per_customer: int, Average number of loans per customer
+    - seed: int, Random seed so runs are repeatable
+
+    Returns:
+    - tuple: (customer file path, loan file path)
+    """
+    from credit_app.ingest import CUSTOMER_COLUMNS, LOAN_COLUMNS
+
+    customer_path = directory / 'customers.csv'
+    with open(customer_path, 'w', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(CUSTOMER_COLUMNS)
+        for customer_id, row in enumerate(generate_customer_rows(customers, seed), start=1):
+            row['customer_id'] = customer_id
+            writer.writerow(row[field] for field in CUSTOMER_COLUMNS.values())
+
+    loan_path = directory / 'loans.csv'
+    with open(loan_path, 'w', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(LOAN_COLUMNS)
+        for row in generate_loan_rows(list(range(1, customers + 1)), loans_per_customer, seed):
+            writer.writerow(row[field] for field in LOAN_COLUMNS.values())
+
+    return customer_path, loan_path
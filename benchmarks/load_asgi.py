@@ -0,0 +1,117 @@
+"""
+Compare throughput of the sync and async loan endpoints under a single ASGI worker.
+
+Start one worker first, then point this script at it. The same URLs are hit with
+and without the /async prefix at a fixed number of concurrent connections:
+
+    uvicorn credit_approval_system.asgi:application --workers 1 --port 8000
+    python -m benchmarks.load_asgi --customer-id 1 --loan-id 1 --concurrency 50
+
+Under ASGI, sync views and the async ORM calls of the async views both run on
+Django's single sync thread, so the read endpoints are not expected to differ
+much; this script measures by how much. The async create-loan path runs on a
+thread pool instead (pass --create-loans to include it; it writes loans for the
+customer). Only the standard library is used, so the numbers include no
+client-side framework overhead.
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+from benchmarks.utils import percentile
+
+
+async def request(host, port, method, path, body=None):
+    # Send one HTTP/1.1 request on a fresh connection and return its status code
+    reader, writer = await asyncio.open_connection(host, port)
+    payload = json.dumps(body).encode() if body is not None else b''
+    head = (
+        f'{method} {path} HTTP/1.1\r\n'
+        f'Host: {host}:{port}\r\n'
+        'Content-Type: application/json\r\n'
+        f'Content-Length: {len(payload)}\r\n'
+        'Connection: close\r\n\r\n'
+    )
+    writer.write(head.encode() + payload)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    await writer.wait_closed()
+    return int(response.split(b' ', 2)[1])
+
+
+async def run_load(host, port, method, path, body, concurrency, total):
+    """
+    Issue total requests with at most concurrency of them in flight.
+
+    Returns:
+    - dict: Throughput, latency percentiles and error count
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                status_code = await request(host, port, method, path, body)
+            except OSError:
+                status_code = None
+            timings.append((time.perf_counter() - started) * 1000)
+            if status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': total,
+        'errors': errors,
+        'requests_per_sec': total / elapsed,
+        'p50_ms': percentile(timings, 0.50),
+        'p95_ms': percentile(timings, 0.95),
+        'p99_ms': percentile(timings, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8000', help='Base URL of the running ASGI server')
+    parser.add_argument('--customer-id', type=int, required=True, help='Existing customer with at least one loan')
+    parser.add_argument('--loan-id', type=int, required=True, help='Existing loan')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--create-loans', action='store_true', help='Also load the create-loan endpoints')
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    application = {'customer_id': args.customer_id, 'loan_amount': 10000, 'interest_rate': 10, 'tenure': 12}
+    endpoints = {
+        'check_eligibility': ('POST', '/check-eligibility/', application),
+        'loan_details': ('GET', f'/view-loan/loan-id/{args.loan_id}/', None),
+        'loans_by_customer': ('GET', f'/view-loans/customer-id/{args.customer_id}/', None),
+    }
+    if args.create_loans:
+        endpoints['create_loan'] = ('POST', '/create-loan/', application)
+
+    results = {}
+    for name, (method, path, body) in endpoints.items():
+        sync = asyncio.run(run_load(host, port, method, path, body, args.concurrency, args.requests))
+        async_ = asyncio.run(run_load(host, port, method, '/async' + path, body, args.concurrency, args.requests))
+        results[name] = {
+            'sync': sync,
+            'async': async_,
+            'throughput_gain': async_['requests_per_sec'] / sync['requests_per_sec'],
+        }
+
+    print(json.dumps({'concurrency': args.concurrency, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
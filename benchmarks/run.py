@@ -0,0 +1,226 @@
+"""
+Repeatable benchmark suite for the scoring and API hot paths.
+
+Seeds a synthetic loan book in a throwaway test database and times the scoring
+functions, every API view through the Django test client and the initdata
+import. Results are printed (or written with --output) as JSON with p50/p95/p99
+latencies, ops/sec and SQL queries per operation.
+
+Save a run as a baseline and compare later runs against it; the comparison
+exits with status 1 when a benchmark got slower than --threshold or runs more
+queries per operation than before:
+
+    python -m benchmarks.run --loans 100000 --output baseline.json
+    python -m benchmarks.run --loans 100000 --compare baseline.json
+
+Scale goes from 1k to 10M loans with --loans; data is generated and inserted in
+bounded batches.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+from benchmarks.utils import setup_django, temporary_database, time_calls
+
+setup_django()
+
+import django  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+
+from benchmarks.datagen import seed_loan_book, write_initdata_files  # noqa: E402
+from credit_app import score_cache  # noqa: E402
+from credit_app.models import Customer, Loan  # noqa: E402
+from credit_app.utils import calculate_credit_score, calculate_monthly_installment, check_loan_eligibility  # noqa: E402
+
+# Relative slowdown of p50 that --compare reports as a regression
+DEFAULT_THRESHOLD = 0.10
+
+
+def sample(values, count, seed):
+    # Deterministic sample with replacement
+    return random.Random(seed).choices(values, k=count)
+
+
+def load_customers(customer_ids):
+    # Fresh Customer instances in the given order, so no call reuses another's cached relations
+    customers = Customer.objects.in_bulk(set(customer_ids))
+    return [Customer(**{field.attname: getattr(customers[customer_id], field.attname) for field in Customer._meta.concrete_fields})
+            for customer_id in customer_ids]
+
+
+def bench_functions(customer_ids, iterations, seed):
+    sampled = sample(customer_ids, iterations, seed)
+    rng = random.Random(seed)
+    installments = [(rng.randint(10_000, 5_000_000), rng.randint(6, 240), rng.choice([0, 8, 10.5, 12, 16, 18]))
+                    for _ in range(iterations)]
+
+    results = {
+        'calculate_credit_score': time_calls(calculate_credit_score, load_customers(sampled), count_queries=True),
+        'calculate_monthly_installment': time_calls(lambda args: calculate_monthly_installment(*args), installments),
+    }
+
+    # Cold calls recompute every score; warm calls are answered by the score cache
+    score_cache.get_cache().clear()
+    check = lambda customer: check_loan_eligibility(customer, 100_000, 10, 12)  # noqa: E731
+    results['check_loan_eligibility.cold'] = time_calls(check, load_customers(list(dict.fromkeys(sampled))), count_queries=True)
+    results['check_loan_eligibility.warm'] = time_calls(check, load_customers(sampled), count_queries=True)
+    return results
+
+
+def bench_views(customer_ids, iterations, seed):
+    client = Client()
+    customers = sample(customer_ids, iterations, seed)
+    loan_ids = sample(list(Loan.objects.values_list('loan_id', flat=True)[:iterations * 10]), iterations, seed)
+
+    def post(path, data):
+        response = client.post(path, json.dumps(data), content_type='application/json')
+        assert response.status_code < 500, response.content
+        return response
+
+    def get(path):
+        response = client.get(path)
+        assert response.status_code < 500, response.content
+        return response
+
+    application = lambda customer_id: {'customer_id': customer_id, 'loan_amount': 50_000, 'interest_rate': 10, 'tenure': 12}  # noqa: E731
+    return {
+        'view.register': time_calls(lambda index: post('/register/', {
+            'first_name': 'Bench', 'last_name': str(index), 'age': 30, 'monthly_salary': 50_000, 'phone_number': 9_000_000_000 + index,
+        }), range(iterations), count_queries=True),
+        'view.check_eligibility': time_calls(lambda customer_id: post('/check-eligibility/', application(customer_id)),
+                                             customers, count_queries=True),
+        'view.check_eligibility_batch': time_calls(lambda chunk: post('/check-eligibility/batch/', [application(c) for c in chunk]),
+                                                   [customers[i:i + 100] for i in range(0, len(customers), 100)], count_queries=True),
+        'view.view_loan': time_calls(lambda loan_id: get(f'/view-loan/loan-id/{loan_id}/'), loan_ids, count_queries=True),
+        'view.view_loans': time_calls(lambda customer_id: get(f'/view-loans/customer-id/{customer_id}/'), customers, count_queries=True),
+        'view.create_loan': time_calls(lambda customer_id: post('/create-loan/', application(customer_id)), customers, count_queries=True),
+    }
+
+
+def bench_initdata(loans, loans_per_customer, seed):
+    # initdata replaces all credit data, so it runs last
+    customers = max(1, loans // loans_per_customer)
+    with tempfile.TemporaryDirectory() as directory:
+        customer_path, loan_path = write_initdata_files(Path(directory), customers, loans_per_customer, seed)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            call_command('initdata', customers=str(customer_path), loans=str(loan_path), stdout=StringIO(), stderr=StringIO())
+            elapsed = time.perf_counter() - started
+
+    rows = customers + Loan.objects.count()
+    return {'initdata': {
+        'count': 1,
+        'rows': rows,
+        'p50_ms': elapsed * 1000,
+        'p95_ms': elapsed * 1000,
+        'p99_ms': elapsed * 1000,
+        'mean_ms': elapsed * 1000,
+        'ops_per_sec': rows / elapsed,
+        'queries_per_op': len(queries),
+    }}
+
+
+def run(args):
+    customers = max(1, args.loans // args.loans_per_customer)
+    results = {}
+    with temporary_database(keepdb=args.keepdb):
+        setup_test_environment()
+        started = time.perf_counter()
+        customer_ids = seed_loan_book(customers, args.loans_per_customer, seed=args.seed)
+        seed_seconds = time.perf_counter() - started
+
+        if 'functions' in args.only:
+            results.update(bench_functions(customer_ids, args.iterations, args.seed))
+        if 'views' in args.only:
+            results.update(bench_views(customer_ids, args.iterations, args.seed))
+        if 'initdata' in args.only:
+            results.update(bench_initdata(args.initdata_loans or args.loans, args.loans_per_customer, args.seed))
+
+    return {
+        'meta': {
+            'loans': args.loans,
+            'customers': customers,
+            'loans_per_customer': args.loans_per_customer,
+            'iterations': args.iterations,
+            'seed': args.seed,
+            'seed_seconds': seed_seconds,
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    Compare a run against a saved baseline.
+
+    Args:
+    - current: dict, Output of run
+    - baseline: dict, Output of an earlier run
+    - threshold: float, Relative p50 slowdown reported as a regression
+
+    Returns:
+    - dict: Per-benchmark ratios and the names of regressed benchmarks
+    """
+    report = {'threshold': threshold, 'benchmarks': {}, 'regressions': []}
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+
+        ratio = result['p50_ms'] / before['p50_ms'] if before['p50_ms'] else 1.0
+        entry = {'p50_ms': result['p50_ms'], 'baseline_p50_ms': before['p50_ms'], 'ratio': ratio}
+        reasons = []
+        if ratio > 1 + threshold:
+            reasons.append(f'p50 {ratio:.2f}x baseline')
+        if result.get('queries_per_op', 0) > before.get('queries_per_op', 0):
+            entry['queries_per_op'] = result['queries_per_op']
+            entry['baseline_queries_per_op'] = before.get('queries_per_op', 0)
+            reasons.append('more queries per operation')
+        if reasons:
+            entry['regression'] = ', '.join(reasons)
+            report['regressions'].append(name)
+        report['benchmarks'][name] = entry
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--loans', type=int, default=10_000, help='Size of the seeded loan book (1k to 10M)')
+    parser.add_argument('--loans-per-customer', type=int, default=10)
+    parser.add_argument('--iterations', type=int, default=200, help='Calls per benchmark')
+    parser.add_argument('--initdata-loans', type=int, help='Size of the initdata import (defaults to --loans)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', choices=['functions', 'views', 'initdata'], default=['functions', 'views', 'initdata'])
+    parser.add_argument('--keepdb', action='store_true', help='Reuse the test database between runs')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Baseline JSON file to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    current = run(args)
+    if args.output:
+        Path(args.output).write_text(json.dumps(current, indent=2))
+
+    if args.compare:
+        report = compare(current, json.loads(Path(args.compare).read_text()), args.threshold)
+        print(json.dumps(report, indent=2))
+        if report['regressions']:
+            sys.exit(1)
+    elif not args.output:
+        print(json.dumps(current, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/utils.py
+import os
+import statistics
+import time
+from contextlib import contextmanager, nullcontext
+
+import django
+
+
+def setup_django():
+    # Configure Django the same way manage.py does
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit_approval_system.settings')
+    django.setup()
+
+
+@contextmanager
+def temporary_database(keepdb=False):
+    """
+    Run a benchmark against a throwaway test database so real data is never touched.
+
+    Args:
+    - keepdb: bool, Reuse an existing test database and keep it afterwards
+    """
+    from django.db import connection
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of a list of numbers
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def time_calls(function, arguments, count_queries=False):
+    """
+    Time one call of function per argument.
+
+    Args:
+    - function: callable taking a single argument
+    - arguments: iterable of arguments
+    - count_queries: bool, Also report the average number of SQL queries per call
+
+    Returns:
+    - dict: p50/p95/p99/mean latencies in milliseconds and ops/sec (plus queries_per_op)
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings = []
+    with CaptureQueriesContext(connection) if count_queries else nullcontext() as queries:
+        for argument in arguments:
+            started = time.perf_counter()
+            function(argument)
+            timings.append((time.perf_counter() - started) * 1000)
+
+    results = {
+        'count': len(timings),
+        'p50_ms': percentile(timings, 0.50),
+        'p95_ms': percentile(timings, 0.95),
+        'p99_ms': percentile(timings, 0.99),
+        'mean_ms': statistics.fmean(timings),
+        'ops_per_sec': len(timings) / (sum(timings) / 1000) if sum(timings) else float('inf'),
+    }
+    if count_queries:
+        results['queries_per_op'] = len(queries) / len(timings)
+    return results
@@ -1,6 +1,7 @@
 # credit_app/admin.py
 from django.contrib import admin
-from .models import Customer, Loan
+from .models import (ArchivedLoan, ArchivedLoanSummary, CreditScoreSnapshot, Customer, CustomerLoanStats, IdempotencyRecord, Loan,
+                     ScoringRuleSet)
 
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
@@ -14,3 +15,51 @@ class LoanAdmin(admin.ModelAdmin):
     list_display = ['loan_id', 'customer','customer_id', 'loan_amount', 'tenure', 'interest_rate', 'monthly_repayment', 'emis_paid_on_time', 'start_date', 'end_date']
     search_fields = ['customer__first_name', 'customer__last_name', 'loan_id']
     list_filter = ['customer','emis_paid_on_time', 'start_date', 'end_date',]
+    list_select_related = ['customer']  # Loan.__str__ reads the customer's name
+
+
+@admin.register(CustomerLoanStats)
+class CustomerLoanStatsAdmin(admin.ModelAdmin):
+    list_display = ['customer', 'total_loans', 'late_loans', 'current_year_loans', 'total_loan_amount', 'total_monthly_repayment', 'current_exposure', 'as_of', 'updated_at']
+    search_fields = ['customer__first_name', 'customer__last_name', 'customer__customer_id']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(ArchivedLoan)
+class ArchivedLoanAdmin(admin.ModelAdmin):
+    list_display = ['loan_id', 'customer_id', 'loan_amount', 'tenure', 'interest_rate', 'monthly_repayment', 'start_date', 'end_date', 'archived_at']
+    search_fields = ['loan_id', 'customer__customer_id']
+    list_filter = ['end_date']
+    readonly_fields = ['archived_at']
+
+
+@admin.register(ArchivedLoanSummary)
+class ArchivedLoanSummaryAdmin(admin.ModelAdmin):
+    list_display = ['customer', 'total_loans', 'total_loan_amount', 'total_monthly_repayment', 'updated_at']
+    search_fields = ['customer__customer_id']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(IdempotencyRecord)
+class IdempotencyRecordAdmin(admin.ModelAdmin):
+    list_display = ['endpoint', 'key', 'status_code', 'created_at', 'expires_at']
+    search_fields = ['key']
+    list_filter = ['endpoint', 'status_code']
+    readonly_fields = ['created_at']
+
+
+@admin.register(CreditScoreSnapshot)
+class CreditScoreSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['customer', 'credit_score', 'rule_version', 'run', 'as_of', 'created_at']
+    search_fields = ['customer__customer_id']
+    list_filter = ['rule_version']
+    list_select_related = ['customer']
+    readonly_fields = ['created_at']
+
+
+@admin.register(ScoringRuleSet)
+class ScoringRuleSetAdmin(admin.ModelAdmin):
+    list_display = ['version', 'weight', 'is_active', 'updated_at']
+    search_fields = ['version']
+    list_filter = ['is_active']
+    readonly_fields = ['updated_at']
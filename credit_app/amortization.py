@@ -0,0 +1,152 @@
+# credit_app/amortization.py
+import calendar
+from datetime import date
+import numpy as np
+from .vectorized import calculate_monthly_installments
+
+
+def add_months(start, months):
+    """
+    Move a date by whole calendar months, clamping the day to the end of the month.
+
+    Args:
+    - start: date, Date to move
+    - months: int, Number of months to add
+
+    Returns:
+    - date: 31 Jan + 1 month is 28/29 Feb, 15 Mar + 1 month is 15 Apr
+    """
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def add_months_array(start_dates, months):
+    """
+    Vectorized add_months for arrays of dates.
+
+    Args:
+    - start_dates: array of datetime64[D] (or dates)
+    - months: array of int, Number of months to add to each date
+
+    Returns:
+    - ndarray of datetime64[D]
+    """
+    start_dates = np.asarray(start_dates, dtype='datetime64[D]')
+    start_months = start_dates.astype('datetime64[M]')
+    days = (start_dates - start_months).astype(np.int64)  # Day of month, zero-based
+
+    target_months = start_months + np.asarray(months, dtype=np.int64)
+    days_in_month = ((target_months + 1).astype('datetime64[D]') - target_months.astype('datetime64[D]')).astype(np.int64)
+    return target_months.astype('datetime64[D]') + np.minimum(days, days_in_month - 1)
+
+
+def remaining_principal(loan_amount, tenure, interest_rate, installments_paid):
+    """
+    Calculate the principal a loan still owes after a number of installments.
+
+    Python counterpart of utils.remaining_principal_expression: the annuity balance
+    P * ((1 + r)^n - (1 + r)^k) / ((1 + r)^n - 1), linear for interest-free loans.
+
+    Args:
+    - loan_amount: float, Loan amount
+    - tenure: int, Loan tenure in months
+    - interest_rate: float, Interest rate per annum
+    - installments_paid: int, Installments paid so far
+
+    Returns:
+    - float: Remaining principal
+    """
+    if tenure <= 0:
+        return 0.0
+    paid = min(installments_paid, tenure)
+    if interest_rate == 0:
+        return loan_amount * (tenure - paid) / tenure
+    growth = 1.0 + interest_rate / 1200.0
+    return loan_amount * (growth ** tenure - growth ** paid) / (growth ** tenure - 1.0)
+
+
+def balances_after(loan_amounts, emis, interest_rates, installments):
+    # Balance left after paying emis for the given number of installments
+    monthly_interest_rates = np.asarray(interest_rates, dtype=np.float64) / 100 / 12
+    interest_free = monthly_interest_rates == 0
+    safe_rates = np.where(interest_free, 1.0, monthly_interest_rates)
+
+    growth = (1 + safe_rates) ** installments
+    balances = loan_amounts * growth - emis * (growth - 1) / safe_rates
+    return np.where(interest_free, loan_amounts - emis * installments, balances)
+
+
+def amortization_schedules(loan_amounts, tenures, interest_rates, start_dates):
+    """
+    Build the amortization schedules of many loans at once.
+
+    Every loan pays its rounded EMI each calendar month after the start date; the
+    last installment is adjusted to clear the remaining balance.
+
+    Args:
+    - loan_amounts: array of float, Loan amounts
+    - tenures: array of int, Loan tenures in months
+    - interest_rates: array of float, Interest rates per annum
+    - start_dates: array of datetime64[D] (or dates), Loan start dates
+
+    Returns:
+    - dict: Flat arrays with one entry per installment: loan_index (position of the
+      loan in the inputs), installment (1-based), due_date, payment, principal,
+      interest and balance (outstanding after the payment)
+    """
+    loan_amounts = np.asarray(loan_amounts, dtype=np.float64)
+    tenures = np.asarray(tenures, dtype=np.int64)
+    interest_rates = np.asarray(interest_rates, dtype=np.float64)
+    start_dates = np.asarray(start_dates, dtype='datetime64[D]')
+    emis = calculate_monthly_installments(loan_amounts, tenures, interest_rates)
+
+    # One row per installment: repeat each loan's terms tenure times
+    loan_index = np.repeat(np.arange(len(loan_amounts)), tenures)
+    offsets = np.repeat(np.cumsum(tenures) - tenures, tenures)
+    installment = np.arange(len(loan_index)) - offsets + 1
+
+    amounts, rates, emi = loan_amounts[loan_index], interest_rates[loan_index], emis[loan_index]
+    opening = balances_after(amounts, emi, rates, installment - 1)
+    interest = opening * rates / 100 / 12
+    closing = balances_after(amounts, emi, rates, installment)
+
+    last = installment == tenures[loan_index]
+    closing = np.where(last, 0.0, np.maximum(closing, 0.0))
+    principal = opening - closing
+    payment = principal + interest
+
+    return {
+        'loan_index': loan_index,
+        'installment': installment,
+        'due_date': add_months_array(start_dates[loan_index], installment),
+        'payment': np.round(payment, 2),
+        'principal': np.round(principal, 2),
+        'interest': np.round(interest, 2),
+        'balance': np.round(closing, 2),
+    }
+
+
+def amortization_schedule(loan_amount, tenure, interest_rate, start_date):
+    """
+    Yield the amortization schedule of a single loan, one installment at a time.
+
+    Args:
+    - loan_amount: float, Loan amount
+    - tenure: int, Loan tenure in months
+    - interest_rate: float, Interest rate per annum
+    - start_date: date, Loan start date
+
+    Returns:
+    - generator: dicts with installment, due_date, payment, principal, interest and balance
+    """
+    schedule = amortization_schedules([loan_amount], [tenure], [interest_rate], [start_date])
+    for index in range(len(schedule['installment'])):
+        yield {
+            'installment': int(schedule['installment'][index]),
+            'due_date': schedule['due_date'][index].item(),
+            'payment': float(schedule['payment'][index]),
+            'principal': float(schedule['principal'][index]),
+            'interest': float(schedule['interest'][index]),
+            'balance': float(schedule['balance'][index]),
+        }
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CreditAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'credit_app'
+
+    def ready(self):
+        # Register the signal handlers that keep CustomerLoanStats in sync, and the replica routing checks
+        from . import routers, signals  # noqa: F401
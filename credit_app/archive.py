@@ -0,0 +1,170 @@
+# credit_app/archive.py
+"""
+Tiering of closed loans out of the Loan table.
+
+A loan is closed once its end_date has passed and every EMI was paid on time.
+Closed loans that started before the current year are moved to ArchivedLoan,
+and their count and sums are added to the customer's ArchivedLoanSummary row.
+
+Such loans count in the scoring aggregates only through total_loans,
+total_loan_amount and total_monthly_repayment: they are not late, did not start
+in the current year and have no exposure left. The summary therefore keeps the
+aggregates exact for any date on or after the archive run, while per-customer
+queries on the Loan table only see active and recent loans. Loans are archived
+as of today at the latest, so archiving leaves the totals unchanged and
+CustomerLoanStats rows and cached scores stay valid.
+"""
+from datetime import date
+from django.db import router, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import ArchivedLoan, ArchivedLoanSummary, Loan
+
+SUMMARY_FIELDS = ['total_loans', 'total_loan_amount', 'total_monthly_repayment']
+
+LOAN_FIELDS = ['loan_id', 'customer_id', 'loan_amount', 'tenure', 'interest_rate', 'monthly_repayment',
+               'emis_paid_on_time', 'start_date', 'end_date']
+
+
+def archive_date(as_of=None):
+    """
+    Return the date loans are archived as of, refusing dates after today.
+
+    A later date would archive loans that still have exposure or started this
+    year, which the summary does not keep.
+
+    Args:
+    - as_of: date, Requested date (defaults to today)
+
+    Returns:
+    - date
+    """
+    today = date.today()
+    if as_of is not None and as_of > today:
+        raise ValueError(f'Loans cannot be archived as of {as_of.isoformat()}, which is after today')
+    return as_of or today
+
+
+def archivable_loans(as_of=None):
+    """
+    Return the loans that can be moved to the archive.
+
+    Args:
+    - as_of: date, Date the loans must have ended before, at the latest today (defaults to today)
+
+    Returns:
+    - QuerySet: Closed loans that started before the year of as_of
+    """
+    as_of = archive_date(as_of)
+    return Loan.objects.filter(customer__isnull=False, end_date__lt=as_of, start_date__lt=date(as_of.year, 1, 1),
+                               emis_paid_on_time__gte=F('tenure'))
+
+
+def add_to_summaries(rows):
+    # Add archived loan rows to their customers' summary rows, creating the missing ones
+    totals = {}
+    for row in rows:
+        total = totals.setdefault(row['customer_id'], dict.fromkeys(SUMMARY_FIELDS, 0))
+        total['total_loans'] += 1
+        total['total_loan_amount'] += row['loan_amount']
+        total['total_monthly_repayment'] += row['monthly_repayment']
+
+    summaries = ArchivedLoanSummary.objects.select_for_update().in_bulk(list(totals))
+    now = timezone.now()
+    for customer_id, summary in summaries.items():
+        for field in SUMMARY_FIELDS:
+            setattr(summary, field, getattr(summary, field) + totals[customer_id][field])
+        summary.updated_at = now  # bulk_update does not apply auto_now
+    ArchivedLoanSummary.objects.bulk_update(summaries.values(), SUMMARY_FIELDS + ['updated_at'])
+    ArchivedLoanSummary.objects.bulk_create(
+        [ArchivedLoanSummary(customer_id=customer_id, **total) for customer_id, total in totals.items() if customer_id not in summaries])
+
+
+def archive_closed_loans(as_of=None, batch_size=5000, progress=None):
+    """
+    Move closed loans from the Loan table to the archive, batch by batch.
+
+    Each batch locks its loans, copies them to ArchivedLoan, adds them to the
+    summaries and deletes them in one transaction. The delete skips the Loan
+    signal handlers on purpose: the customer's aggregates do not change.
+
+    Args:
+    - as_of: date, Date the loans must have ended before, at the latest today (defaults to today)
+    - batch_size: int, Number of loans moved per transaction
+    - progress: callable, Called with the number of loans moved so far after each batch
+
+    Returns:
+    - int: Number of loans moved
+    """
+    as_of = archive_date(as_of)
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(archivable_loans(as_of).select_for_update().order_by('loan_id').values(*LOAN_FIELDS)[:batch_size])
+            if not rows:
+                break
+            archived_at = timezone.now()
+            ArchivedLoan.objects.bulk_create([ArchivedLoan(archived_at=archived_at, **row) for row in rows])
+            add_to_summaries(rows)
+            Loan.objects.filter(loan_id__in=[row['loan_id'] for row in rows])._raw_delete(router.db_for_write(Loan))
+        moved += len(rows)
+        if progress:
+            progress(moved)
+    return moved
+
+
+def archived_totals(customer_ids=None):
+    """
+    Return the archived loan aggregates of customers.
+
+    Args:
+    - customer_ids: iterable of int, Customers to read (every customer with archived loans if None)
+
+    Returns:
+    - dict: Aggregates keyed by customer_id, only for customers with archived loans
+    """
+    summaries = ArchivedLoanSummary.objects.all()
+    if customer_ids is not None:
+        summaries = summaries.filter(customer_id__in=list(customer_ids))
+    return {row.pop('customer_id'): row for row in summaries.values('customer_id', *SUMMARY_FIELDS)}
+
+
+def archived_aggregates(customer_ids, aggregates, as_of):
+    """
+    Aggregate the archived loans of customers that had started by a date, from the ArchivedLoan rows.
+
+    Used for dates before an archive run, for which the summary is not exact.
+
+    Args:
+    - customer_ids: iterable of int, Customers to read
+    - aggregates: dict, Aggregate expressions keyed by snapshot attribute name
+    - as_of: date, Only loans started on or before this date are counted
+
+    Returns:
+    - dict: Aggregates keyed by customer_id, only for customers with such archived loans
+    """
+    rows = (ArchivedLoan.objects.filter(customer_id__in=list(customer_ids), start_date__lte=as_of)
+            .values('customer_id').annotate(**aggregates).order_by())
+    return {row.pop('customer_id'): row for row in rows}
+
+
+async def aarchived_totals(customer_ids):
+    # Async version of archived_totals for ASGI views
+    rows = ArchivedLoanSummary.objects.filter(customer_id__in=list(customer_ids)).values('customer_id', *SUMMARY_FIELDS)
+    return {row.pop('customer_id'): row async for row in rows}
+
+
+def add_archived(values, totals):
+    """
+    Add a customer's archived loan aggregates to aggregates computed from the Loan table.
+
+    Args:
+    - values: dict, Aggregates keyed by snapshot attribute name (sums may be None)
+    - totals: dict or None, The customer's entry from archived_totals or archived_aggregates
+
+    Returns:
+    - dict: The combined aggregates
+    """
+    if not totals:
+        return values
+    return {**values, **{field: (values.get(field) or 0) + (total or 0) for field, total in totals.items()}}
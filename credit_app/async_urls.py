@@ -0,0 +1,17 @@
+from django.urls import path
+from .async_views import AsyncCheckLoanEligibilityView, AsyncCreateLoanView, AsyncViewLoanDetails, AsyncViewLoansByCustomer
+
+# Async (ASGI) versions of the loan endpoints, mounted under /async/
+urlpatterns = [
+    # Endpoint for checking loan eligibility
+    path('check-eligibility/', AsyncCheckLoanEligibilityView.as_view(), name='async-check-eligibility'),
+
+    # Endpoint for creating a new loan
+    path('create-loan/', AsyncCreateLoanView.as_view(), name='async-create-loan'),
+
+    # Endpoint for viewing details of a specific loan
+    path('view-loan/loan-id/<int:loan_id>/', AsyncViewLoanDetails.as_view(), name='async-view-loan-details'),
+
+    # Endpoint for viewing all loans associated with a specific customer
+    path('view-loans/customer-id/<int:customer_id>/', AsyncViewLoansByCustomer.as_view(), name='async-view-loans-by-customer'),
+]
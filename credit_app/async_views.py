@@ -0,0 +1,226 @@
+# credit_app/async_views.py
+import json
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from . import idempotency, routers
+from .models import ArchivedLoan, Customer, Loan
+from .utils import acheck_loan_eligibility, create_loan_if_eligible
+from .views import ViewLoanDetails, ViewLoansByCustomer, include_archived
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAPIView(View):
+    """
+    Base class for the async (ASGI) versions of the loan API views.
+
+    Handlers are coroutines, so they run without the sync_to_async wrapper Django
+    puts around sync views under ASGI. Their async ORM calls still run on the
+    single thread Django keeps for sync code, the same one sync views use; only
+    the create-loan path is moved to threads of its own (see in_own_thread).
+    Bodies and status codes match the sync DRF views.
+    """
+
+    def json_body(self, request):
+        # Parse the JSON request body into a dict
+        data = json.loads(request.body or b'{}')
+        if not isinstance(data, dict):
+            raise ValueError('Expected a JSON object.')
+        return data
+
+    def loan_request(self, request):
+        # Extract and check the loan fields shared by the eligibility and create-loan endpoints
+        data = self.json_body(request)
+        customer_id = data.get('customer_id')
+        loan_amount = data.get('loan_amount')
+        interest_rate = data.get('interest_rate')
+        tenure = data.get('tenure')
+
+        # Check if values are greater than zero
+        if not all(value > 0 for value in [loan_amount, interest_rate, tenure]):
+            raise ValueError('Loan amount, interest rate, and tenure must be greater than zero.')
+
+        return customer_id, loan_amount, interest_rate, tenure
+
+
+def in_own_thread(func):
+    """
+    Wrap a blocking function so it is awaited on a thread pool instead of Django's shared sync thread.
+
+    Only for code that is safe to run in parallel: the thread gets its own
+    database connection, which is closed once obsolete, as a sync request's
+    connection would be when the request finishes.
+    """
+
+    @wraps(func)
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
+
+
+class AsyncCheckLoanEligibilityView(AsyncAPIView):
+    async def post(self, request, *args, **kwargs):
+        try:
+            customer_id, loan_amount, interest_rate, tenure = self.loan_request(request)
+
+            # Reads go to a replica unless the customer was just written; the score history is still written to the primary
+            async with routers.aread_from_replica(customer_id):
+                # Retrieve customer and its materialized loan aggregates based on customer_id
+                customer = await Customer.objects.select_related('loan_stats').aget(customer_id=customer_id)
+
+                # Check loan eligibility using utility function
+                eligibility_result = await acheck_loan_eligibility(customer, loan_amount, interest_rate, tenure)
+
+            # Adjust interest_rate if needed
+            if interest_rate != eligibility_result['corrected_interest_rate']:
+                eligibility_result['interest_rate'] = eligibility_result['corrected_interest_rate']
+
+            return JsonResponse(eligibility_result, status=200)
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+
+class AsyncCreateLoanView(AsyncAPIView):
+    def create_loan(self, customer_id, loan_amount, interest_rate, tenure):
+        # Check and create the loan; returns (status_code, body, final) as idempotency.run_once expects
+        try:
+            # The check and insert run in one transaction holding the customer lock, so parallel calls are safe
+            eligibility_result, new_loan = create_loan_if_eligible(customer_id, loan_amount, interest_rate, tenure)
+        except Exception as e:
+            # Not final, so a retry with the same Idempotency-Key runs again
+            return 400, {'error': str(e)}, False
+
+        # Process loan creation based on eligibility
+        if eligibility_result['approval']:
+            response_data = {
+                'loan_id': new_loan.loan_id,
+                'customer_id': customer_id,
+                'loan_approved': True,
+                'message': 'Loan approved',
+                'monthly_installment': new_loan.monthly_repayment
+            }
+        else:
+            response_data = {
+                'loan_id': None,
+                'customer_id': customer_id,
+                'loan_approved': False,
+                'message': 'Loan not approved',
+                'monthly_installment': None
+            }
+
+        return 200, response_data, True
+
+    def create_loan_once(self, key, data, loan):
+        # Run create_loan at most once per Idempotency-Key, holding the key's lock in this thread
+        return idempotency.run_once('create-loan', key, idempotency.request_hash(data), lambda: self.create_loan(*loan))
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            loan = self.loan_request(request)
+            key = request.headers.get(idempotency.HEADER)
+            # Run on a thread of its own rather than queue behind other requests on the shared sync thread
+            if not key:
+                status_code, body, _ = await in_own_thread(self.create_loan)(*loan)
+                return JsonResponse(body, status=status_code)
+
+            error = idempotency.key_error(key)
+            if error:
+                return JsonResponse({'error': error}, status=400)
+
+            # Keys are shared with the sync endpoint, so a retry may go to either
+            status_code, body, replayed = await in_own_thread(self.create_loan_once)(key, self.json_body(request), loan)
+            response = JsonResponse(body, status=status_code)
+            if replayed:
+                response[idempotency.REPLAYED_HEADER] = 'true'
+            return response
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+
+class AsyncViewLoanDetails(AsyncAPIView):
+    async def find_loan(self, loan_id, archived):
+        # Async version of ViewLoanDetails.find_loan
+        loan = await Loan.objects.filter(loan_id=loan_id).values(*ViewLoanDetails.fields).afirst()
+        if loan is None and archived:
+            loan = await ArchivedLoan.objects.filter(loan_id=loan_id).values(*ViewLoanDetails.fields).afirst()
+        return loan
+
+    async def get(self, request, loan_id):
+        try:
+            # Retrieve loan and customer data based on loan_id as a plain dict, from a replica when there is one
+            archived = include_archived(request.GET)
+            async with routers.aread_from_replica() as replica:
+                loan = await self.find_loan(loan_id, archived)
+            if loan is None and replica is not None:
+                # A loan too new for the replica is read from the primary
+                loan = await self.find_loan(loan_id, archived)
+            if loan is None:
+                raise Loan.DoesNotExist('Loan matching query does not exist.')
+
+            return JsonResponse(ViewLoanDetails.loan_details(loan), status=200)
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+
+class AsyncViewLoansByCustomer(AsyncAPIView):
+    async def stream(self, loans):
+        # Yield the loans as a JSON array straight from the async database iterator
+        first = True
+        yield '['
+        async for row in loans.aiterator(chunk_size=ViewLoansByCustomer.stream_chunk_size):
+            yield ('' if first else ',') + json.dumps(ViewLoansByCustomer.loan_entry(row))
+            first = False
+        yield ']'
+
+    async def get(self, request, customer_id, *args, **kwargs):
+        try:
+            # Keyset pagination parameters: the last loan_id already seen and the page size
+            try:
+                cursor = ViewLoansByCustomer.parse_positive_int(request.GET, 'cursor')
+                page_size = ViewLoansByCustomer.parse_positive_int(request.GET, 'page_size')
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            if page_size is not None:
+                page_size = min(page_size, ViewLoansByCustomer.max_page_size)
+
+            async with routers.aread_from_replica(customer_id) as replica:
+                # Retrieve the loans for the given customer_id in loan_id order
+                loans = ViewLoansByCustomer.loan_rows(customer_id, cursor, include_archived(request.GET))
+
+                # Return a custom error if there are no loans for the customer
+                if cursor is None and not await loans.aexists():
+                    return JsonResponse({'Error': 'Customer is not present'}, status=400)
+
+                if request.GET.get('stream') in ('1', 'true'):
+                    if page_size is not None:
+                        loans = loans[:page_size]
+                    if replica is not None:
+                        # The stream is read after the view returns, outside this block
+                        loans = loans.using(replica)
+                    return StreamingHttpResponse(self.stream(loans), content_type='application/json', status=200)
+
+                # Fetch one extra loan to know whether another page follows
+                if page_size is not None:
+                    loans = loans[:page_size + 1]
+                response_data = [ViewLoansByCustomer.loan_entry(row) async for row in loans]
+
+            has_next = page_size is not None and len(response_data) > page_size
+            if has_next:
+                response_data = response_data[:page_size]
+
+            response = JsonResponse(response_data, status=200, safe=False)
+            if has_next:
+                # Clients pass this back as ?cursor= to fetch the next page
+                response['X-Next-Cursor'] = str(response_data[-1]['loan_id'])
+            return response
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=400)
@@ -0,0 +1,170 @@
+# credit_app/idempotency.py
+import hashlib
+import json
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import wraps
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from .locks import KeyedLock
+from .models import IdempotencyRecord
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+key_locks = KeyedLock()
+
+
+def get_ttl():
+    # Seconds a key and its stored response are kept before the key may be reused
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+
+
+def request_hash(data):
+    # Fingerprint of a request body, to reject a key reused for a different request
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+@contextmanager
+def claim_key(endpoint, key, fingerprint):
+    """
+    Open a transaction holding the IdempotencyRecord of a key locked until it ends.
+
+    The record is created on first use. A concurrent request with the same key
+    blocks on the row lock (SELECT ... FOR UPDATE, or an in-process lock on
+    backends without row locks) until the first request has stored its response.
+    Expired records are reset as if the key were new.
+
+    Args:
+    - endpoint: str, Endpoint name the key is scoped to
+    - key: str, Idempotency-Key header value
+    - fingerprint: str, request_hash of the request body
+
+    Returns:
+    - context manager yielding the locked IdempotencyRecord
+    """
+    def claim():
+        now = timezone.now()
+        records = IdempotencyRecord.objects.select_for_update() if connection.features.has_select_for_update else IdempotencyRecord.objects
+        record, created = records.get_or_create(
+            endpoint=endpoint, key=key,
+            defaults={'request_hash': fingerprint, 'expires_at': now + timedelta(seconds=get_ttl())},
+        )
+        if not created and record.expires_at <= now:
+            record.request_hash = fingerprint
+            record.status_code = None
+            record.response_body = None
+            record.expires_at = now + timedelta(seconds=get_ttl())
+            record.save(update_fields=['request_hash', 'status_code', 'response_body', 'expires_at'])
+        return record
+
+    if connection.features.has_select_for_update:
+        with transaction.atomic():
+            yield claim()
+    else:
+        with key_locks.hold((endpoint, key)), transaction.atomic():
+            yield claim()
+
+
+def key_error(key):
+    # Error message for an unusable Idempotency-Key header value, or None
+    if len(key) > IdempotencyRecord._meta.get_field('key').max_length:
+        return f'{HEADER} must be at most 255 characters.'
+    return None
+
+
+def is_final(status_code, unexpected=False):
+    # 2xx responses and deliberate 4xx answers are stored; server errors and 400s reporting an unexpected exception
+    # (a lock timeout or lost connection caught by the view) are not, so a retry runs the request again
+    return status.is_success(status_code) or (status.is_client_error(status_code) and not unexpected)
+
+
+def run_once(endpoint, key, fingerprint, handler):
+    """
+    Run a request under the lock of its Idempotency-Key, or replay the response stored for the key.
+
+    A response that is not final is not stored: the claim is rolled back together
+    with anything the handler wrote, and the key is free for a retry.
+
+    Args:
+    - endpoint: str, Endpoint name the key is scoped to
+    - key: str, Idempotency-Key header value
+    - fingerprint: str, request_hash of the request body
+    - handler: callable, Runs the request and returns (status_code, body, final)
+
+    Returns:
+    - tuple: (status_code, body, replayed)
+    """
+    with claim_key(endpoint, key, fingerprint) as record:
+        if record.request_hash != fingerprint:
+            return status.HTTP_422_UNPROCESSABLE_ENTITY, {'error': f'{HEADER} was already used with a different request.'}, False
+
+        if record.status_code is not None:
+            return record.status_code, record.response_body, True
+
+        status_code, body, final = handler()
+        if final:
+            record.status_code = status_code
+            record.response_body = body
+            record.save(update_fields=['status_code', 'response_body'])
+        else:
+            transaction.set_rollback(True)
+        return status_code, body, False
+
+
+def idempotent(endpoint):
+    """
+    Make an APIView handler replay its first response for a repeated Idempotency-Key.
+
+    Requests without the header run as before. With the header, the first request
+    runs the handler and stores its response; retries with the same key and body
+    get the stored response back without running the handler again, and a key
+    reused with a different body is rejected with 422. Only successful responses
+    and deliberate 4xx answers are stored: handlers mark the 400 they return for an
+    unexpected exception with Response(..., exception=True), and such responses and
+    server errors leave the key free for a retry.
+
+    Args:
+    - endpoint: str, Name the keys of this handler are scoped to
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key:
+                return handler(view, request, *args, **kwargs)
+            error = key_error(key)
+            if error:
+                return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+            responses = []
+
+            def run():
+                response = handler(view, request, *args, **kwargs)
+                responses.append(response)
+                return response.status_code, response.data, is_final(response.status_code, response.exception)
+
+            status_code, body, replayed = run_once(endpoint, key, request_hash(request.data), run)
+            if responses:
+                return responses[0]
+            response = Response(body, status=status_code)
+            if replayed:
+                response[REPLAYED_HEADER] = 'true'
+            return response
+
+        return wrapper
+    return decorator
+
+
+def purge_expired(now=None):
+    """
+    Delete the records of expired idempotency keys.
+
+    Returns:
+    - int: Number of records deleted
+    """
+    deleted, _ = IdempotencyRecord.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
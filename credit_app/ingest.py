@@ -0,0 +1,420 @@
+# credit_app/ingest.py
+import csv
+import io
+import time
+from datetime import date, datetime
+from pathlib import Path
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connection
+from .models import ArchivedLoan, ArchivedLoanSummary, CreditScoreSnapshot, Customer, CustomerLoanStats, Loan
+
+# Spreadsheet column -> model field, for each importable model
+CUSTOMER_COLUMNS = {
+    'Customer ID': 'customer_id',
+    'First Name': 'first_name',
+    'Last Name': 'last_name',
+    'Age': 'age',
+    'Phone Number': 'phone_number',
+    'Monthly Salary': 'monthly_salary',
+    'Approved Limit': 'approved_limit',
+}
+
+LOAN_COLUMNS = {
+    'Customer ID': 'customer_id',
+    'Loan Amount': 'loan_amount',
+    'Tenure': 'tenure',
+    'Interest Rate': 'interest_rate',
+    'Monthly payment': 'monthly_repayment',
+    'EMIs paid on Time': 'emis_paid_on_time',
+    'Date of Approval': 'start_date',
+    'End Date': 'end_date',
+}
+
+# Model field -> converter applied to every raw cell value
+FIELD_TYPES = {
+    'customer_id': int,
+    'first_name': str,
+    'last_name': str,
+    'age': int,
+    'phone_number': int,
+    'monthly_salary': int,
+    'approved_limit': int,
+    'loan_amount': float,
+    'tenure': int,
+    'interest_rate': float,
+    'monthly_repayment': float,
+    'emis_paid_on_time': int,
+    'start_date': 'date',
+    'end_date': 'date',
+}
+
+
+def to_date(value):
+    # Spreadsheets yield datetimes, CSV files ISO strings
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.fromisoformat(str(value).strip()).date()
+
+
+def convert(field, value):
+    """
+    Convert a raw cell value to the Python type of a model field.
+
+    Args:
+    - field: str, Model field name
+    - value: Raw value read from the file
+
+    Returns:
+    - Converted value, or None for empty cells
+    """
+    if value is None or value == '':
+        return None
+    converter = FIELD_TYPES[field]
+    if converter == 'date':
+        return to_date(value)
+    if converter is int and isinstance(value, str):
+        return int(float(value))
+    return converter(value)
+
+
+def iter_xlsx(path, chunk_size):
+    # openpyxl read-only mode streams rows instead of loading the whole workbook
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else None for cell in next(rows)]
+        chunk = []
+        for row in rows:
+            if all(cell is None for cell in row):
+                continue  # Skip blank rows left at the end of a sheet
+            chunk.append(dict(zip(header, row)))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        workbook.close()
+
+
+def iter_csv(path, chunk_size):
+    with open(path, newline='', encoding='utf-8') as handle:
+        chunk = []
+        for row in csv.DictReader(handle):
+            chunk.append({key.strip(): value for key, value in row.items()})
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def iter_parquet(path, chunk_size):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('Reading Parquet files requires pyarrow (pip install pyarrow).')
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pylist()
+
+
+READERS = {
+    '.xlsx': iter_xlsx,
+    '.csv': iter_csv,
+    '.parquet': iter_parquet,
+}
+
+
+def iter_chunks(path, chunk_size=10000):
+    """
+    Stream a customer or loan file in fixed-size chunks of row dictionaries.
+
+    Supports Excel (.xlsx), CSV (.csv) and Parquet (.parquet) files.
+
+    Args:
+    - path: str, Path to the input file
+    - chunk_size: int, Number of rows per chunk
+
+    Returns:
+    - generator: Lists of dictionaries keyed by column header
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix not in READERS:
+        raise ValueError(f'Unsupported file type {suffix!r}; expected one of {", ".join(READERS)}')
+    return READERS[suffix](path, chunk_size)
+
+
+def map_row(row, columns):
+    """
+    Map a row read from a file to model field values.
+
+    Args:
+    - row: dict, Values keyed by column header
+    - columns: dict, Column header -> model field name
+
+    Returns:
+    - dict: Converted values keyed by model field name
+    """
+    try:
+        return {field: convert(field, row[column]) for column, field in columns.items()}
+    except KeyError as e:
+        raise ValueError(f'Missing column {e.args[0]!r}')
+
+
+def validate_row(model, values):
+    """
+    Validate converted values against the model's field constraints.
+
+    Checks null constraints and field validators (e.g. MinValueValidator), which
+    bulk_create and COPY would otherwise skip.
+
+    Args:
+    - model: Model class the row is imported into
+    - values: dict, Converted values keyed by model field name
+
+    Returns:
+    - dict: The validated values
+    """
+    if model is Customer and values.get('approved_limit') is None and values.get('monthly_salary') is not None:
+        values['approved_limit'] = round(36 * values['monthly_salary'], -5)  # Same default as Customer.save
+
+    for name, value in values.items():
+        field = model._meta.get_field(name)
+        if value is None:
+            if not field.null and not field.primary_key:
+                raise ValueError(f'{name} is required')
+            continue
+        try:
+            field.run_validators(value)
+        except ValidationError as e:
+            raise ValueError(f'{name}: {" ".join(e.messages)}')
+    return values
+
+
+def iter_validated(model, columns, path, chunk_size):
+    """
+    Stream a file as chunks of validated model field values.
+
+    Args:
+    - model: Model class the rows are imported into
+    - columns: dict, Column header -> model field name
+    - path: str, Path to the input file
+    - chunk_size: int, Number of rows per chunk
+
+    Returns:
+    - generator: Lists of validated value dictionaries
+    """
+    row_number = 1  # The header is row 1
+    for chunk in iter_chunks(path, chunk_size):
+        validated = []
+        for row in chunk:
+            row_number += 1
+            try:
+                validated.append(validate_row(model, map_row(row, columns)))
+            except ValueError as e:
+                raise ValueError(f'{Path(path).name} row {row_number}: {e}')
+        yield validated
+
+
+class ImportProgress:
+    """
+    Rows-per-second progress tracker for a single import.
+    """
+
+    def __init__(self, label, report=None):
+        self.label = label
+        self.report = report
+        self.rows = 0
+        self.started = time.perf_counter()
+
+    @property
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.rows / elapsed if elapsed else 0.0
+
+    def advance(self, rows):
+        self.rows += rows
+        if self.report is not None:
+            self.report(f'{self.label}: {self.rows:,} rows ({self.rate:,.0f} rows/s)')
+
+
+def bulk_load(model, columns, path, chunk_size=10000, batch_size=5000, report=None):
+    """
+    Stream a file into a model with batched bulk_create, keeping memory bounded by chunk_size.
+
+    Args:
+    - model: Model class to insert into
+    - columns: dict, Column header -> model field name
+    - path: str, Path to the input file
+    - chunk_size: int, Number of rows read and converted at a time
+    - batch_size: int, Number of rows per INSERT statement
+    - report: callable, Receives a progress message after every chunk
+
+    Returns:
+    - ImportProgress: Row count and throughput of the import
+    """
+    progress = ImportProgress(model._meta.verbose_name_plural, report)
+    for chunk in iter_validated(model, columns, path, chunk_size):
+        model.objects.bulk_create([model(**values) for values in chunk], batch_size=batch_size)
+        progress.advance(len(chunk))
+    return progress
+
+
+def copy_value(value):
+    # Encode a value for COPY's text format
+    if value is None:
+        return '\\N'
+    if isinstance(value, date):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def copy_rows(cursor, table, columns, rows):
+    """
+    Send rows to PostgreSQL with COPY FROM STDIN.
+
+    Works with both psycopg2 (copy_expert) and psycopg 3 (cursor.copy).
+
+    Args:
+    - cursor: Django cursor on a PostgreSQL connection
+    - table: str, Table name
+    - columns: list of str, Column names
+    - rows: list of lists, Values in column order
+    """
+    quote = connection.ops.quote_name
+    statement = f'COPY {quote(table)} ({", ".join(quote(column) for column in columns)}) FROM STDIN'
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    raw_cursor = cursor.cursor
+    if hasattr(raw_cursor, 'copy_expert'):
+        raw_cursor.copy_expert(statement, buffer)
+    else:
+        with raw_cursor.copy(statement) as copy:
+            copy.write(buffer.getvalue())
+
+
+def copy_load(model, columns, path, chunk_size=10000, report=None, **kwargs):
+    """
+    Stream a file into a model with PostgreSQL COPY FROM STDIN, one COPY per chunk.
+
+    Args:
+    - model: Model class to insert into
+    - columns: dict, Column header -> model field name
+    - path: str, Path to the input file
+    - chunk_size: int, Number of rows read, validated and copied at a time
+    - report: callable, Receives a progress message after every chunk
+
+    Returns:
+    - ImportProgress: Row count and throughput of the import
+    """
+    fields = [model._meta.get_field(name) for name in columns.values()]
+    db_columns = [field.column for field in fields]
+    progress = ImportProgress(model._meta.verbose_name_plural, report)
+
+    with connection.cursor() as cursor:
+        for chunk in iter_validated(model, columns, path, chunk_size):
+            copy_rows(cursor, model._meta.db_table, db_columns, [[values[field.name] for field in fields] for values in chunk])
+            progress.advance(len(chunk))
+    return progress
+
+
+def supports_copy():
+    # COPY FROM STDIN is only available on PostgreSQL
+    return connection.vendor == 'postgresql'
+
+
+def load(model, columns, path, fast=False, **kwargs):
+    """
+    Import a file into a model, using COPY when fast is set and the backend supports it.
+
+    Falls back to batched bulk_create on other backends such as SQLite.
+
+    Args:
+    - model: Model class to insert into
+    - columns: dict, Column header -> model field name
+    - path: str, Path to the input file
+    - fast: bool, Use PostgreSQL COPY FROM STDIN when available
+    - kwargs: chunk_size, batch_size and report, passed to the loader
+
+    Returns:
+    - ImportProgress: Row count and throughput of the import
+    """
+    loader = copy_load if fast and supports_copy() else bulk_load
+    return loader(model, columns, path, **kwargs)
+
+
+def load_customers(path, **kwargs):
+    # Import customers with the ids given in the Customer ID column
+    return load(Customer, CUSTOMER_COLUMNS, path, **kwargs)
+
+
+def load_loans(path, **kwargs):
+    # Import loans; the Customer ID column references customers by id
+    return load(Loan, LOAN_COLUMNS, path, **kwargs)
+
+
+def reset_sequences(models=(Customer, Loan)):
+    """
+    Move the id sequences past the highest imported id.
+
+    Imports write explicit ids, which leaves PostgreSQL sequences behind and would
+    make the next AutoField insert collide with an imported row. SQLite needs no reset.
+
+    Args:
+    - models: iterable of Model classes
+    """
+    statements = connection.ops.sequence_reset_sql(no_style(), list(models))
+    if statements:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+
+def clear_credit_data(keep_history=False):
+    """
+    Empty the customer and loan tables, and the tables derived from them, and reset their id sequences.
+
+    The credit score history references the customers, so it is emptied too
+    unless keep_history is set. Kept snapshots still point at their customers:
+    the import must then bring those customers back under the same ids, which
+    missing_history_customers checks before the transaction commits. Rule sets,
+    idempotency keys and rescore runs are always kept.
+
+    Uses the backend's flush SQL (TRUNCATE on PostgreSQL) instead of a
+    row-by-row ORM delete, which would fetch every row to send signals. With
+    keep_history, Customer cannot be TRUNCATEd on PostgreSQL while the history
+    references it, so it is emptied with a single DELETE.
+
+    Args:
+    - keep_history: bool, Whether to keep the CreditScoreSnapshot rows
+    """
+    models = [Loan, ArchivedLoan, ArchivedLoanSummary, CustomerLoanStats]
+    if not keep_history:
+        models += [CreditScoreSnapshot, Customer]
+    tables = [model._meta.db_table for model in models]
+    connection.ops.execute_sql_flush(connection.ops.sql_flush(no_style(), tables, reset_sequences=True))
+    if keep_history:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(Customer._meta.db_table)}')
+
+
+def missing_history_customers(limit=10):
+    # Ids of customers the kept score history references but the import did not bring back
+    missing = CreditScoreSnapshot.objects.exclude(customer_id__in=Customer.objects.values('customer_id'))
+    return list(missing.order_by('customer_id').values_list('customer_id', flat=True).distinct()[:limit])
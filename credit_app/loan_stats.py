@@ -0,0 +1,163 @@
+# credit_app/loan_stats.py
+from datetime import date
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from . import archive
+from .amortization import remaining_principal
+from .models import Customer, CustomerLoanStats, Loan
+from .utils import CustomerCreditSnapshot
+
+STAT_FIELDS = ['total_loans', 'late_loans', 'current_year_loans', 'total_loan_amount', 'total_monthly_repayment', 'current_exposure']
+
+
+def compute_loan_stats(customer_ids=None, as_of=None):
+    """
+    Compute loan aggregates from the Loan table with a grouped query, plus the archived loan summaries.
+
+    Args:
+    - customer_ids: iterable of int, Customers to compute (all customers with loans if None)
+    - as_of: date, Date the date-dependent aggregates are computed for (defaults to today)
+
+    Returns:
+    - dict: Aggregate values keyed by customer_id
+    """
+    as_of = as_of or date.today()
+    loans = Loan.objects.filter(customer__isnull=False)
+    if customer_ids is not None:
+        customer_ids = list(customer_ids)
+        loans = loans.filter(customer_id__in=customer_ids)
+
+    rows = loans.values('customer_id').annotate(**CustomerCreditSnapshot.aggregates(as_of)).order_by()
+    stats = {}
+    for row in rows:
+        customer_id = row.pop('customer_id')
+        row['total_loan_amount'] = row['total_loan_amount'] or 0
+        row['total_monthly_repayment'] = row['total_monthly_repayment'] or 0
+        row['current_exposure'] = row['current_exposure'] or 0
+        stats[customer_id] = row
+
+    for customer_id, totals in archive.archived_totals(customer_ids).items():
+        stats[customer_id] = archive.add_archived(stats.get(customer_id, empty_loan_stats()), totals)
+    return stats
+
+
+def empty_loan_stats():
+    # Aggregate values for a customer without loans
+    return {field: 0 for field in STAT_FIELDS}
+
+
+def refresh_customer_loan_stats(customer_id, as_of=None):
+    """
+    Recompute and store the loan aggregates for a single customer.
+
+    Args:
+    - customer_id: int, Customer to refresh
+    - as_of: date, Date the date-dependent aggregates are computed for (defaults to today)
+
+    Returns:
+    - CustomerLoanStats: The stored row
+    """
+    as_of = as_of or date.today()
+    values = compute_loan_stats([customer_id], as_of).get(customer_id, empty_loan_stats())
+    stats, _ = CustomerLoanStats.objects.update_or_create(customer_id=customer_id, defaults={**values, 'as_of': as_of})
+    return stats
+
+
+def apply_new_loan(loan):
+    """
+    Incrementally add a newly created loan to its customer's aggregates.
+
+    Falls back to a full refresh of the customer's row when the row is missing or
+    was computed for an earlier day.
+
+    Args:
+    - loan: Loan object that was just inserted
+    """
+    if loan.customer_id is None:
+        return
+
+    today = date.today()
+    exposure = remaining_principal(loan.loan_amount, loan.tenure, loan.interest_rate, loan.emis_paid_on_time) if loan.end_date >= today else 0
+    updated = CustomerLoanStats.objects.filter(customer_id=loan.customer_id, as_of=today).update(
+        total_loans=F('total_loans') + 1,
+        late_loans=F('late_loans') + int(loan.emis_paid_on_time < loan.tenure),
+        current_year_loans=F('current_year_loans') + int(loan.start_date.year == today.year),
+        total_loan_amount=F('total_loan_amount') + loan.loan_amount,
+        total_monthly_repayment=F('total_monthly_repayment') + loan.monthly_repayment,
+        current_exposure=F('current_exposure') + exposure,
+        as_of=today,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        refresh_customer_loan_stats(loan.customer_id, today)
+
+
+def rebuild_loan_stats(chunk_size=2000):
+    """
+    Rebuild the CustomerLoanStats table from scratch.
+
+    Args:
+    - chunk_size: int, Number of customers aggregated and inserted per batch
+
+    Returns:
+    - int: Number of rows written
+    """
+    as_of = date.today()
+    customer_ids = list(Customer.objects.order_by('customer_id').values_list('customer_id', flat=True))
+    written = 0
+
+    with transaction.atomic():
+        CustomerLoanStats.objects.all().delete()
+        for start in range(0, len(customer_ids), chunk_size):
+            chunk = customer_ids[start:start + chunk_size]
+            computed = compute_loan_stats(chunk, as_of)
+            rows = [
+                CustomerLoanStats(customer_id=customer_id, as_of=as_of, **computed.get(customer_id, empty_loan_stats()))
+                for customer_id in chunk
+            ]
+            CustomerLoanStats.objects.bulk_create(rows, batch_size=chunk_size)
+            written += len(rows)
+
+    return written
+
+
+def find_loan_stats_drift(chunk_size=2000):
+    """
+    Compare the stored aggregates with ones freshly computed for the same day.
+
+    Each row is checked against aggregates computed at its own as_of: a row
+    from an earlier day is stale, not drifted, and is refreshed on its
+    customer's next read or loan write.
+
+    Args:
+    - chunk_size: int, Number of customers compared per query
+
+    Returns:
+    - list: (customer_id, field, stored value, computed value) tuples for every mismatch
+    """
+    customer_ids = list(Customer.objects.order_by('customer_id').values_list('customer_id', flat=True))
+    drift = []
+
+    for start in range(0, len(customer_ids), chunk_size):
+        chunk = customer_ids[start:start + chunk_size]
+        stored = CustomerLoanStats.objects.in_bulk(chunk)
+        by_day = {}
+        for stats in stored.values():
+            by_day.setdefault(stats.as_of, []).append(stats.customer_id)
+        computed = {}
+        for as_of, day_customer_ids in by_day.items():
+            computed.update(compute_loan_stats(day_customer_ids, as_of))
+
+        for customer_id in chunk:
+            expected = computed.get(customer_id, empty_loan_stats())
+            stats = stored.get(customer_id)
+            if stats is None:
+                drift.append((customer_id, 'row', None, 'missing'))
+                continue
+            for field in STAT_FIELDS:
+                # Exposure is summed in floating point, so compare with a relative tolerance
+                if abs(getattr(stats, field) - expected[field]) > 1e-6 * max(1, abs(expected[field])):
+                    drift.append((customer_id, field, getattr(stats, field), expected[field]))
+
+    return drift
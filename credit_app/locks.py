@@ -0,0 +1,59 @@
+# credit_app/locks.py
+import threading
+from contextlib import contextmanager
+from django.db import connection, transaction
+from .models import Customer
+
+
+class KeyedLock:
+    """
+    In-process mutex per key.
+
+    Each key gets its own lock, created on first use and dropped once nobody holds
+    or waits for it, so callers working on different keys never contend.
+    """
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks = {}  # key -> [lock, number of holders and waiters]
+
+    @contextmanager
+    def hold(self, key):
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+
+customer_locks = KeyedLock()
+
+
+@contextmanager
+def lock_customer(customer_id):
+    """
+    Open a transaction holding an exclusive lock on a customer until it ends.
+
+    Uses SELECT ... FOR UPDATE on the customer row where the backend supports it,
+    so concurrent writers for the same customer queue up across processes while
+    other customers are unaffected. Backends without row locks (SQLite) fall back
+    to an in-process lock per customer.
+
+    Args:
+    - customer_id: int, Customer to lock
+
+    Returns:
+    - context manager yielding the locked Customer object
+    """
+    if connection.features.has_select_for_update:
+        with transaction.atomic():
+            yield Customer.objects.select_for_update().get(customer_id=customer_id)
+    else:
+        with customer_locks.hold(customer_id), transaction.atomic():
+            yield Customer.objects.get(customer_id=customer_id)
@@ -0,0 +1,26 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from credit_app.archive import archivable_loans, archive_closed_loans, archive_date
+
+class Command(BaseCommand):
+    help = 'Move closed loans (ended, every EMI paid, started before this year) from the Loan table to the archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', type=date.fromisoformat, help='Archive loans that ended before this date (YYYY-MM-DD, at the latest today, defaults to today)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Number of loans moved per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the loans that would be moved')
+
+    def handle(self, *args, **options):
+        try:
+            as_of = archive_date(options['as_of'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['dry_run']:
+            count = archivable_loans(as_of).count()
+            self.stdout.write(f'{count:,} loan(s) can be archived')
+            return
+
+        report = lambda moved: self.stdout.write(f'Archived {moved:,} loans')  # noqa: E731
+        moved = archive_closed_loans(as_of, options['batch_size'], progress=report)
+        self.stdout.write(self.style.SUCCESS(f'Moved {moved:,} closed loan(s) to the archive'))
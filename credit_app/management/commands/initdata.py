@@ -1,60 +1,65 @@
-import pandas as pd
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from django.core.management import call_command
-from credit_app.models import Customer, Loan
+from credit_app.ingest import (clear_credit_data, load_customers, load_loans, missing_history_customers, reset_sequences,
+                               supports_copy)
+from credit_app.loan_stats import rebuild_loan_stats
 
 class Command(BaseCommand):
     help = 'Initialize data into the system'
-    call_command('flush', '--noinput')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', default='customer_data.xlsx', help='Customer file (.xlsx, .csv or .parquet)')
+        parser.add_argument('--loans', default='loan_data.xlsx', help='Loan file (.xlsx, .csv or .parquet)')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='Number of rows read into memory at a time')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Number of rows per INSERT statement')
+        parser.add_argument('--fast', action='store_true', help='Use PostgreSQL COPY FROM STDIN (falls back to bulk_create on other backends)')
+        parser.add_argument('--flush', action='store_true', help='Flush the whole database, including rule sets and the credit score history, before loading; '
+                                 'without it only customer and loan data is replaced')
+        parser.add_argument('--keep-history', action='store_true', help='Keep the credit score history; every customer it references '
+                                 'must be in the customer file under the same id')
+
     def handle(self, *args, **options):
         try:
+            if options['flush']:
+                call_command('flush', '--noinput')
+
+            if options['fast'] and not supports_copy():
+                self.stdout.write('COPY is only available on PostgreSQL; falling back to bulk_create')
+
+            load_options = {
+                'fast': options['fast'],
+                'chunk_size': options['chunk_size'],
+                'batch_size': options['batch_size'],
+                'report': self.stdout.write,
+            }
+
             with transaction.atomic():
                 # Clean existing data
-                Customer.objects.all().delete()
-                Loan.objects.all().delete()
-
-                # Read customer data
-                customer_data = pd.read_excel('customer_data.xlsx')
-                customers = []
-
-                # Populate Customer objects
-                for _, row in customer_data.iterrows():
-                    customer = Customer(
-                        first_name=row['First Name'],
-                        last_name=row['Last Name'],
-                        age=row['Age'],
-                        phone_number=row['Phone Number'],
-                        monthly_salary=row['Monthly Salary'],
-                        approved_limit=row['Approved Limit']
-                    )
-                    customers.append(customer)
-
-                # Bulk create customers
-                Customer.objects.bulk_create(customers)
-
-                # Read loan data
-                loan_data = pd.read_excel('loan_data.xlsx')
-                loans = []
-
-                # Populate Loan objects
-                for _, row in loan_data.iterrows():
-                    loan = Loan(
-                        customer_id=row['Customer ID'],
-                        loan_amount=row['Loan Amount'],
-                        tenure=row['Tenure'],
-                        interest_rate=row['Interest Rate'],
-                        monthly_repayment=row['Monthly payment'],
-                        emis_paid_on_time=row['EMIs paid on Time'],
-                        start_date=row['Date of Approval'],
-                        end_date=row['End Date']
-                    )
-                    loans.append(loan)
-
-                # Bulk create loans
-                Loan.objects.bulk_create(loans)
-
-                self.stdout.write(self.style.SUCCESS('Data initialized successfully'))
+                clear_credit_data(keep_history=options['keep_history'])
+
+                # Stream customers and loans in bounded chunks
+                customers = load_customers(options['customers'], **load_options)
+                loans = load_loans(options['loans'], **load_options)
+
+                # Imported rows carry explicit ids, so move the id sequences past them
+                reset_sequences()
+
+                # Kept snapshots would fail the foreign key check when the transaction commits
+                if options['keep_history']:
+                    missing = missing_history_customers()
+                    if missing:
+                        raise CommandError('The credit score history references customers missing from the import: '
+                                           + ', '.join(map(str, missing)))
+
+                # bulk_create skips the signals that maintain CustomerLoanStats, so rebuild it
+                rebuild_loan_stats()
+
+            for progress in (customers, loans):
+                self.stdout.write(f'Loaded {progress.rows:,} {progress.label} ({progress.rate:,.0f} rows/s)')
+            self.stdout.write(self.style.SUCCESS('Data initialized successfully'))
+        except CommandError:
+            raise
         except Exception as e:
-            # Log and display error if any exception occurs during data initialization
-            self.stderr.write(self.style.ERROR(f'An error occurred: {e}'))
+            # Exit with a non-zero status so scripts notice the failed import
+            raise CommandError(f'An error occurred: {e}') from e
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from credit_app import partitioning
+
+STEPS = ('all', 'prepare', 'backfill', 'swap', 'drop-old')
+
+class Command(BaseCommand):
+    help = 'Move the Loan table into a PostgreSQL partitioned layout (by hash of customer_id or start_date range) while it stays in use'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--strategy', choices=partitioning.STRATEGIES, default='hash',
+                            help='hash partitions by customer_id, range by start_date year')
+        parser.add_argument('--partitions', type=int, default=16, help='Number of hash partitions')
+        parser.add_argument('--years-ahead', type=int, default=2, help='Range partitions created past the current year')
+        parser.add_argument('--batch-size', type=int, default=50000, help='Range of loan_ids copied per transaction')
+        parser.add_argument('--step', choices=STEPS, default='all',
+                            help='Run one step of the move; all runs prepare, backfill and swap, resuming where it stopped')
+        parser.add_argument('--status', action='store_true', help='Only report the current layout')
+
+    def handle(self, *args, **options):
+        try:
+            self.run(options)
+        except partitioning.PartitioningError as e:
+            raise CommandError(str(e)) from e
+
+    def run(self, options):
+        state = partitioning.status(connection)
+        if options['status']:
+            for name, value in state.items():
+                self.stdout.write(f'{name}: {value}')
+            return
+
+        step = options['step']
+        if step in ('all', 'prepare') and not state['moving']:
+            if state['partitioned']:
+                raise CommandError(f'The Loan table is already partitioned by {state["strategy"]}')
+            years = None
+            if options['strategy'] == 'range':
+                years = partitioning.default_years(connection, years_ahead=options['years_ahead'])
+            partitioning.prepare(connection, options['strategy'], options['partitions'], years)
+            self.stdout.write(f'Created the {options["strategy"]}-partitioned table; new writes are mirrored into it')
+
+        if step in ('all', 'backfill'):
+            report = lambda done, highest: self.stdout.write(f'Copied loans up to id {done:,} of {highest:,}')  # noqa: E731
+            copied = partitioning.backfill(connection, options['batch_size'], progress=report)
+            self.stdout.write(f'Copied {copied:,} loans')
+
+        if step in ('all', 'swap'):
+            partitioning.swap(connection)
+            self.stdout.write(self.style.SUCCESS(
+                'The Loan table is partitioned; the old table is kept until you run --step drop-old'))
+
+        if step == 'drop-old':
+            partitioning.drop_old(connection)
+            self.stdout.write(self.style.SUCCESS('Dropped the unpartitioned Loan table'))
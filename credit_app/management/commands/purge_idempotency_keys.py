@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from credit_app.idempotency import purge_expired
+
+class Command(BaseCommand):
+    help = 'Delete stored responses of expired Idempotency-Key headers'
+
+    def handle(self, *args, **options):
+        deleted = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys'))
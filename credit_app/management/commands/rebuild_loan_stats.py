@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from credit_app.loan_stats import find_loan_stats_drift, rebuild_loan_stats
+
+class Command(BaseCommand):
+    help = 'Rebuild the CustomerLoanStats table from the Loan table, or check it for drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report rows that drifted from the Loan table')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Number of customers processed per batch')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drift = find_loan_stats_drift(chunk_size=options['chunk_size'])
+            for customer_id, field, stored, expected in drift:
+                self.stdout.write(f'customer {customer_id}: {field} is {stored}, expected {expected}')
+            if drift:
+                raise CommandError(f'{len(drift)} drifted value(s) found; run rebuild_loan_stats to repair them')
+            self.stdout.write(self.style.SUCCESS('Loan stats are in sync'))
+            return
+
+        written = rebuild_loan_stats(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt loan stats for {written} customers'))
@@ -0,0 +1,51 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from credit_app.models import RescoreRun
+from credit_app.rescoring import finish_run, init_worker, pending_partitions, rescore_partition, start_run
+
+class Command(BaseCommand):
+    help = 'Recompute the credit score of every customer into CreditScoreSnapshot, in parallel by customer_id range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes (1 runs in this process)')
+        parser.add_argument('--partition-size', type=int, default=10000, help='Number of customer ids per partition')
+        parser.add_argument('--as-of', type=date.fromisoformat, help='Date to score for (YYYY-MM-DD, defaults to today); a past date counts only the loans started by then, and its scores are kept out of the current score lookups')
+        parser.add_argument('--resume', type=int, nargs='?', const=0, metavar='RUN_ID',
+                            help='Continue an interrupted run (the latest unfinished one if no id is given)')
+
+    def handle(self, *args, **options):
+        if options['resume'] is not None:
+            runs = RescoreRun.objects.filter(finished_at__isnull=True).order_by('-run_id')
+            if options['resume']:
+                runs = runs.filter(run_id=options['resume'])
+            run = runs.first()
+            if run is None:
+                raise CommandError('No unfinished rescore run to resume')
+        else:
+            run = start_run(options['partition_size'], options['as_of'])
+
+        partitions = pending_partitions(run)
+        self.stdout.write(f'Run {run.run_id}: {len(partitions)} partition(s) to score as of {run.as_of}')
+
+        started = time.perf_counter()
+        scored = 0
+        if options['workers'] <= 1:
+            for partition_id in partitions:
+                scored += rescore_partition(partition_id)
+        else:
+            # Forked workers must not inherit the parent's open connection
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker) as executor:
+                futures = [executor.submit(rescore_partition, partition_id) for partition_id in partitions]
+                for done, future in enumerate(as_completed(futures), start=1):
+                    scored += future.result()
+                    self.stdout.write(f'{done}/{len(futures)} partitions, {scored:,} customers')
+
+        elapsed = time.perf_counter() - started
+        finish_run(run)
+        rate = scored / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(f'Scored {scored:,} customers in run {run.run_id} ({rate:,.0f} customers/s)'))
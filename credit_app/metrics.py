@@ -0,0 +1,168 @@
+# credit_app/metrics.py
+import bisect
+import threading
+import time
+from . import score_cache
+
+# Upper bounds (seconds) of the request duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper that counts and times the queries of one request.
+
+    Installed with connection.execute_wrapper, so it sees every query the ORM or
+    a raw cursor sends on that connection. A query is a duplicate when the same
+    SQL ran earlier in the request with the same parameters.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.duplicates = 0
+        self.seconds = 0.0
+        self._seen = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        signature = (sql, repr(params))
+        if signature in self._seen:
+            self.duplicates += 1
+        else:
+            self._seen.add(signature)
+        self.queries += 1
+
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+
+class RequestMetric:
+    # Running totals of one route, method and status combination
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+        self.db_requests = 0  # Requests whose queries were observed; the DB totals below cover only these
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.duplicates = 0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+
+
+class MetricsRegistry:
+    """
+    Process-local registry of per-endpoint request metrics.
+
+    Each worker process keeps its own totals; Prometheus scrapes every worker
+    and sums them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._metrics = {}
+
+    def record(self, route, method, status_code, seconds, db_seconds=None, queries=0, duplicates=0):
+        """
+        Add one request to the totals of its endpoint.
+
+        A request recorded without db_seconds had its queries unobserved (async
+        views); it counts towards the request totals only.
+
+        Args:
+        - route: str, URL pattern the request resolved to
+        - method: str, HTTP method
+        - status_code: int, Response status
+        - seconds: float, Wall time of the request
+        - db_seconds: float or None, Time spent executing queries, None when not observed
+        - queries: int, Number of queries
+        - duplicates: int, Number of repeated queries
+        """
+        bucket = bisect.bisect_left(DURATION_BUCKETS, seconds)
+        with self._lock:
+            metric = self._metrics.setdefault((route, method, str(status_code)), RequestMetric())
+            metric.requests += 1
+            metric.seconds += seconds
+            if db_seconds is not None:
+                metric.db_requests += 1
+                metric.db_seconds += db_seconds
+                metric.queries += queries
+                metric.duplicates += duplicates
+            if bucket < len(DURATION_BUCKETS):
+                metric.buckets[bucket] += 1
+
+    def snapshot(self):
+        # Copy of the current totals keyed by (route, method, status)
+        with self._lock:
+            return {labels: {**vars(metric), 'buckets': list(metric.buckets)}
+                    for labels, metric in self._metrics.items()}
+
+    def render(self, sample_rate=1.0):
+        """
+        Render the registry in the Prometheus text exposition format.
+
+        Args:
+        - sample_rate: float, Fraction of requests being recorded, exported as a gauge
+
+        Returns:
+        - str: Metrics text
+        """
+        metrics = sorted(self.snapshot().items())
+        # Endpoints whose queries were never observed get no DB series rather than zeros
+        observed = [(key, metric) for key, metric in metrics if metric['db_requests']]
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(samples)
+
+        def labels(route, method, status_code=None, **extra):
+            pairs = {'route': route, 'method': method}
+            if status_code is not None:
+                pairs['status'] = status_code
+            pairs.update(extra)
+            return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in pairs.items()) + '}'
+
+        family('credit_http_requests_total', 'counter', 'Sampled HTTP requests.',
+               [f'credit_http_requests_total{labels(*key)} {metric["requests"]}' for key, metric in metrics])
+        family('credit_http_db_requests_total', 'counter', 'Sampled HTTP requests whose SQL queries were observed.',
+               [f'credit_http_db_requests_total{labels(*key)} {metric["db_requests"]}' for key, metric in observed])
+        family('credit_http_db_seconds_total', 'counter', 'Time spent executing SQL queries in sampled requests.',
+               [f'credit_http_db_seconds_total{labels(*key)} {metric["db_seconds"]:.6f}' for key, metric in observed])
+        family('credit_http_queries_total', 'counter', 'SQL queries executed by sampled requests.',
+               [f'credit_http_queries_total{labels(*key)} {metric["queries"]}' for key, metric in observed])
+        family('credit_http_duplicate_queries_total', 'counter', 'Repeated SQL queries (same SQL and parameters) in sampled requests.',
+               [f'credit_http_duplicate_queries_total{labels(*key)} {metric["duplicates"]}' for key, metric in observed])
+
+        histogram = []
+        for key, metric in metrics:
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, metric['buckets']):
+                cumulative += count
+                histogram.append(f'credit_http_request_duration_seconds_bucket{labels(*key, le=str(bound))} {cumulative}')
+            histogram.append(f'credit_http_request_duration_seconds_bucket{labels(*key, le="+Inf")} {metric["requests"]}')
+            histogram.append(f'credit_http_request_duration_seconds_sum{labels(*key)} {metric["seconds"]:.6f}')
+            histogram.append(f'credit_http_request_duration_seconds_count{labels(*key)} {metric["requests"]}')
+        family('credit_http_request_duration_seconds', 'histogram', 'Wall time of sampled HTTP requests.', histogram)
+
+        family('credit_http_metrics_sample_rate', 'gauge', 'Fraction of requests recorded.',
+               [f'credit_http_metrics_sample_rate {sample_rate}'])
+
+        for name, value in score_cache.counters.as_dict().items():
+            family(f'credit_score_cache_{name}_total', 'counter', f'Credit score cache {name}.',
+                   [f'credit_score_cache_{name}_total {value}'])
+
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    # Escape a Prometheus label value
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,89 @@
+# credit_app/middleware.py
+import random
+import time
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from .metrics import QueryRecorder, registry
+
+
+def get_sample_rate():
+    # Fraction of requests instrumented; lower it in production to keep the overhead negligible
+    return getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE', 1.0)
+
+
+def request_route(request):
+    # URL pattern of the resolved view, so ids in the path do not create a metric per loan
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match is not None else 'unmatched'
+
+
+def server_timing(seconds, recorder=None):
+    # Server-Timing header value; durations are in milliseconds
+    parts = [f'total;dur={seconds * 1000:.2f}']
+    if recorder is not None:
+        parts.append(f'db;dur={recorder.seconds * 1000:.2f};desc="{recorder.queries} queries"')
+        parts.append(f'dup;desc="{recorder.duplicates} duplicate queries"')
+    return ', '.join(parts)
+
+
+class RequestMetricsMiddleware:
+    """
+    Record wall time, DB time, query count and duplicate-query count of sampled requests.
+
+    Queries are observed with execute_wrapper on every database alias, so reads
+    sent to a replica are counted too. The numbers are added to the in-process
+    registry served at /metrics and returned in a Server-Timing header. Only
+    REQUEST_METRICS_SAMPLE_RATE of the requests are instrumented.
+
+    Async views run their queries on other threads' connections, so for them only
+    the wall time is recorded: they get no DB series on /metrics and no db or dup
+    parts in Server-Timing.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        if not self.sampled():
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            response = self.get_response(request)
+        self.finish(request, response, time.perf_counter() - started, recorder)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.finish(request, response, time.perf_counter() - started)
+        return response
+
+    def sampled(self):
+        rate = get_sample_rate()
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def finish(self, request, response, seconds, recorder=None):
+        if recorder is None:
+            registry.record(request_route(request), request.method, response.status_code, seconds)
+        else:
+            registry.record(request_route(request), request.method, response.status_code, seconds,
+                            db_seconds=recorder.seconds, queries=recorder.queries, duplicates=recorder.duplicates)
+        response['Server-Timing'] = server_timing(seconds, recorder)
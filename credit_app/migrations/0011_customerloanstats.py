@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_app', '0010_alter_loan_emis_paid_on_time_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerLoanStats',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='loan_stats', serialize=False, to='credit_app.customer')),
+                ('total_loans', models.IntegerField(default=0)),
+                ('late_loans', models.IntegerField(default=0)),
+                ('current_year_loans', models.IntegerField(default=0)),
+                ('total_loan_amount', models.FloatField(default=0)),
+                ('total_monthly_repayment', models.FloatField(default=0)),
+                ('as_of', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_app', '0011_customerloanstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'start_date', 'emis_paid_on_time', 'tenure', 'loan_amount', 'monthly_repayment'], name='loan_customer_scoring_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('emis_paid_on_time__lt', models.F('tenure'))), fields=['customer'], name='loan_customer_late_idx'),
+        ),
+        # Drop the single-column FK index only once the composite index that replaces it exists
+        migrations.AlterField(
+            model_name='loan',
+            name='customer',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='credit_app.customer'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_app', '0014_idempotencyrecord'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='loan',
+            name='loan_customer_scoring_idx',
+        ),
+        migrations.AddField(
+            model_name='customerloanstats',
+            name='current_exposure',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'start_date', 'emis_paid_on_time', 'tenure', 'loan_amount', 'monthly_repayment', 'end_date', 'interest_rate'], name='loan_customer_scoring_idx'),
+        ),
+    ]
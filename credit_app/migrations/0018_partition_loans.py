@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def partition_empty_loan_table(apps, schema_editor):
+    # New PostgreSQL databases get the partitioned layout from LOAN_PARTITIONING right away;
+    # tables that already hold loans are moved online with the partition_loans command
+    from credit_app import partitioning
+
+    config = getattr(settings, 'LOAN_PARTITIONING', None)
+    connection = schema_editor.connection
+    if not config or connection.vendor != 'postgresql':
+        return
+
+    Loan = apps.get_model('credit_app', 'Loan')
+    if partitioning.status(connection, Loan)['partitioned'] or Loan.objects.using(connection.alias).exists():
+        return
+    strategy = config.get('strategy', 'hash')
+    years = partitioning.default_years(connection, Loan) if strategy == 'range' else None
+    partitioning.prepare(connection, strategy, config.get('partitions', 16), years, Loan, schema_editor)
+    partitioning.swap(connection, Loan)
+    partitioning.drop_old(connection, Loan)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_app', '0017_scoring_rule_sets'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_empty_loan_table, migrations.RunPython.noop),
+    ]
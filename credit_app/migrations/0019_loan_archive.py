@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_app', '0018_partition_loans'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedLoanSummary',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archived_summary', serialize=False, to='credit_app.customer')),
+                ('total_loans', models.IntegerField(default=0)),
+                ('total_loan_amount', models.FloatField(default=0)),
+                ('total_monthly_repayment', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedLoan',
+            fields=[
+                ('loan_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('loan_amount', models.FloatField()),
+                ('tenure', models.IntegerField()),
+                ('interest_rate', models.FloatField()),
+                ('monthly_repayment', models.FloatField()),
+                ('emis_paid_on_time', models.IntegerField()),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('customer', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_loans', to='credit_app.customer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['customer', 'loan_id'], name='archived_loan_customer_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:33
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_app', '0019_loan_archive'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='loan',
+            name='loan_customer_late_idx',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('credit_app', '0020_remove_loan_late_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='creditscoresnapshot',
+            name='as_of',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 
 class Customer(models.Model):
     # Customer model representing information about a customer
@@ -25,7 +26,7 @@ class Customer(models.Model):
 class Loan(models.Model):
     # Loan model representing information about a loan
     loan_id = models.AutoField(primary_key=True)  # Auto-incremented primary key for the loan
-    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, null=True, blank=True)  # ForeignKey linking loan to a customer
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, null=True, blank=True, db_index=False)  # ForeignKey linking loan to a customer, indexed by the composite indexes below
     loan_amount = models.FloatField(validators=[MinValueValidator(0)])  # Amount of the loan, disallowing negative values
     tenure = models.IntegerField(validators=[MinValueValidator(0)])  # Tenure or duration of the loan
     interest_rate = models.FloatField(validators=[MinValueValidator(0)])  # Interest rate for the loan
@@ -34,6 +35,159 @@ class Loan(models.Model):
     start_date = models.DateField()  # Start date of the loan
     end_date = models.DateField()  # End date of the loan
 
+    class Meta:
+        indexes = [
+            # Covers the per-customer scoring aggregate: the customer and start_date range filters
+            # plus every column it counts, sums or needs for the exposure, so it is answered from the index alone
+            models.Index(
+                fields=['customer', 'start_date', 'emis_paid_on_time', 'tenure', 'loan_amount', 'monthly_repayment',
+                        'end_date', 'interest_rate'],
+                name='loan_customer_scoring_idx',
+            ),
+            # Keyset pagination of a customer's loans in loan_id order
+            models.Index(fields=['customer', 'loan_id'], name='loan_customer_loan_id_idx'),
+        ]
+
     def __str__(self):
         # String representation of the Loan object, used for display purposes
         return f"Loan ID: {self.loan_id} - Customer: {self.customer.first_name} {self.customer.last_name}"
+
+class CustomerLoanStats(models.Model):
+    # Materialized loan aggregates for a customer, kept in sync with the Loan table by credit_app.loan_stats
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name='loan_stats')  # Customer the aggregates belong to
+    total_loans = models.IntegerField(default=0)  # Number of loans taken by the customer
+    late_loans = models.IntegerField(default=0)  # Number of loans with EMIs not paid on time
+    current_year_loans = models.IntegerField(default=0)  # Number of loans started in the year of as_of
+    total_loan_amount = models.FloatField(default=0)  # Sum of loan_amount over all loans
+    total_monthly_repayment = models.FloatField(default=0)  # Sum of monthly_repayment over all loans
+    current_exposure = models.FloatField(default=0)  # Remaining principal of loans with end_date on or after as_of
+    as_of = models.DateField()  # Date the date-dependent aggregates were computed for
+    updated_at = models.DateTimeField(auto_now=True)  # Last time the row was written
+
+    def __str__(self):
+        # String representation of the CustomerLoanStats object, used for display purposes
+        return f"Loan stats for customer {self.customer_id}"
+
+class ArchivedLoan(models.Model):
+    # Closed loan moved out of the Loan table by credit_app.archive, read only by history endpoints
+    loan_id = models.IntegerField(primary_key=True)  # loan_id the loan had in the Loan table
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, null=True, blank=True, db_index=False, related_name='archived_loans')  # ForeignKey linking the loan to its customer, indexed below
+    loan_amount = models.FloatField()  # Amount of the loan
+    tenure = models.IntegerField()  # Tenure or duration of the loan
+    interest_rate = models.FloatField()  # Interest rate for the loan
+    monthly_repayment = models.FloatField()  # Monthly repayment amount for the loan
+    emis_paid_on_time = models.IntegerField()  # Number of EMIs paid on time
+    start_date = models.DateField()  # Start date of the loan
+    end_date = models.DateField()  # End date of the loan
+    archived_at = models.DateTimeField(default=timezone.now)  # When the loan was moved to the archive
+
+    class Meta:
+        indexes = [
+            # A customer's archived loans in loan_id order, for the history endpoints
+            models.Index(fields=['customer', 'loan_id'], name='archived_loan_customer_idx'),
+        ]
+
+    def __str__(self):
+        # String representation of the ArchivedLoan object, used for display purposes
+        return f"Archived loan ID: {self.loan_id}"
+
+class ArchivedLoanSummary(models.Model):
+    # Aggregates of a customer's archived loans, added to the Loan table aggregates wherever those are computed
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name='archived_summary')  # Customer the aggregates belong to
+    total_loans = models.IntegerField(default=0)  # Number of archived loans
+    total_loan_amount = models.FloatField(default=0)  # Sum of loan_amount over the archived loans
+    total_monthly_repayment = models.FloatField(default=0)  # Sum of monthly_repayment over the archived loans
+    updated_at = models.DateTimeField(auto_now=True)  # Last time the row was written
+
+    def __str__(self):
+        # String representation of the ArchivedLoanSummary object, used for display purposes
+        return f"Archived loan summary for customer {self.customer_id}"
+
+class IdempotencyRecord(models.Model):
+    # Stored response of a request sent with an Idempotency-Key header, replayed on retries
+    endpoint = models.CharField(max_length=100)  # Name of the endpoint the key was used on
+    key = models.CharField(max_length=255)  # Client-supplied Idempotency-Key header value
+    request_hash = models.CharField(max_length=64)  # SHA-256 of the request body the key was first used with
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)  # Status of the stored response, null while the first request runs
+    response_body = models.JSONField(null=True, blank=True)  # Body of the stored response
+    created_at = models.DateTimeField(auto_now_add=True)  # Time the key was first used
+    expires_at = models.DateTimeField(db_index=True)  # Time after which the key may be reused
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['endpoint', 'key'], name='idempotency_endpoint_key_unique'),
+        ]
+
+    def __str__(self):
+        # String representation of the IdempotencyRecord object, used for display purposes
+        return f"{self.endpoint}: {self.key}"
+
+class RescoreRun(models.Model):
+    # A run of the rescore_portfolio command; its partitions are the resume checkpoints
+    run_id = models.AutoField(primary_key=True)  # Auto-incremented primary key for the run
+    as_of = models.DateField()  # Date the scores are computed for
+    partition_size = models.PositiveIntegerField()  # Width of the customer_id range of each partition
+    started_at = models.DateTimeField(auto_now_add=True)  # Time the run was started
+    finished_at = models.DateTimeField(null=True, blank=True)  # Time the last partition was written, null while running
+
+    def __str__(self):
+        # String representation of the RescoreRun object, used for display purposes
+        return f"Rescore run {self.run_id} as of {self.as_of}"
+
+class RescorePartition(models.Model):
+    # A customer_id range of a rescore run, marked completed in the transaction that writes its snapshots
+    run = models.ForeignKey(RescoreRun, on_delete=models.CASCADE, related_name='partitions')  # Run the partition belongs to
+    start_id = models.IntegerField()  # First customer_id of the range
+    end_id = models.IntegerField()  # Customer_id just past the range
+    customers = models.IntegerField(default=0)  # Number of customers scored
+    completed_at = models.DateTimeField(null=True, blank=True)  # Time the snapshots were written, null until then
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'start_id'], name='rescore_partition_run_start_unique'),
+        ]
+
+    def __str__(self):
+        # String representation of the RescorePartition object, used for display purposes
+        return f"Run {self.run_id}: customers {self.start_id}-{self.end_id - 1}"
+
+class CreditScoreSnapshot(models.Model):
+    # Append-only record of a customer's credit score and the loan aggregates it was computed from
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='score_snapshots', db_index=False)  # Customer that was scored, indexed by the composite index below
+    credit_score = models.IntegerField()  # Computed credit score
+    inputs = models.JSONField()  # Loan aggregates, salary and approved limit the score was computed from
+    rule_version = models.CharField(max_length=50)  # Version of the scoring rules that produced the score
+    run = models.ForeignKey(RescoreRun, on_delete=models.SET_NULL, null=True, blank=True, related_name='snapshots')  # Rescore run that wrote the snapshot, if any
+    as_of = models.DateField(null=True, blank=True)  # Past date a backdated rescore run scored the customer as of; null for current scores
+    created_at = models.DateTimeField(default=timezone.now)  # Time the score was computed
+
+    class Meta:
+        indexes = [
+            # Latest score per customer and score as of a date: newest-first within a customer
+            models.Index(fields=['customer', '-created_at'], name='score_snapshot_customer_idx'),
+        ]
+
+    def __str__(self):
+        # String representation of the CreditScoreSnapshot object, used for display purposes
+        return f"Score {self.credit_score} for customer {self.customer_id} at {self.created_at}"
+
+class ScoringRuleSet(models.Model):
+    # Credit scoring and rate correction rules stored as data, so versions can be added and A/B tested without a deploy
+    version = models.CharField(max_length=50, unique=True)  # Version name stored with every score the rules compute
+    definition = models.JSONField()  # Rule set definition, in the format of rules.BUILTIN_RULES
+    weight = models.PositiveIntegerField(default=0)  # Share of customers scored with this version, relative to the other weights
+    is_active = models.BooleanField(default=True)  # Inactive rule sets are not loaded
+    updated_at = models.DateTimeField(auto_now=True)  # Time the rule set was last changed
+
+    def clean(self):
+        # Refuse definitions that do not compile, so a bad edit never reaches the running rule sets
+        from django.core.exceptions import ValidationError
+        from .rules import CompiledRuleSet, RuleSetError
+        try:
+            CompiledRuleSet({**(self.definition or {}), 'version': self.version})
+        except (RuleSetError, TypeError) as e:
+            raise ValidationError({'definition': str(e)})
+
+    def __str__(self):
+        # String representation of the ScoringRuleSet object, used for display purposes
+        return f"Rule set {self.version}"
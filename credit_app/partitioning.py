@@ -0,0 +1,319 @@
+# credit_app/partitioning.py
+"""
+Declarative PostgreSQL partitioning of the Loan table.
+
+Loans are partitioned by hash of customer_id, so every per-customer query is
+pruned to one partition whose indexes stay small, or by start_date range, one
+partition per year plus a default partition for dates outside them.
+
+An existing table is moved online in four steps:
+
+1. prepare: create the partitioned table next to the current one, with the
+   model's indexes, and a trigger that mirrors every insert, update and delete
+   of the current table into it
+2. backfill: copy the existing rows in loan_id batches; each batch locks its
+   source rows so a concurrent update cannot be copied twice
+3. swap: in one short transaction, lock the current table, drop the trigger,
+   move the id sequence past the copied rows and exchange the table names
+4. drop-old: drop the unpartitioned table once the new one is trusted
+
+PostgreSQL requires the partition key in every unique constraint, so the hash
+layout has a unique (loan_id, customer_id) constraint instead of a primary key
+(customer_id is nullable) and the range layout a (loan_id, start_date) primary
+key. loan_id stays unique because ids come from a single sequence.
+"""
+from datetime import date
+from django.db import transaction
+from .models import Loan
+
+STRATEGIES = ('hash', 'range')
+
+
+class PartitioningError(RuntimeError):
+    pass
+
+
+def table_names(model=Loan):
+    # Current, new and old table names plus the sequence and trigger of the move
+    table = model._meta.db_table
+    return {
+        'table': table,
+        'new': f'{table}_partitioned',
+        'old': f'{table}_unpartitioned',
+        'sequence': f'{table}_partitioned_loan_id_seq',
+        'sync': f'{table}_partition_sync',
+    }
+
+
+def key_constraint(strategy, table):
+    # Name and definition of the unique key, which must contain the partition key
+    if strategy == 'hash':
+        return f'{table}_loan_key', 'UNIQUE (loan_id, customer_id)'
+    return f'{table}_pkey', 'PRIMARY KEY (loan_id, start_date)'
+
+
+def partition_statements(parent, strategy='hash', partitions=16, years=None):
+    """
+    Return the CREATE TABLE statements of the partitions of a partitioned table.
+
+    Args:
+    - parent: str, Partitioned table name
+    - strategy: str, hash (by customer_id) or range (by start_date)
+    - partitions: int, Number of hash partitions
+    - years: iterable of int, Years that get a range partition; other dates go to the default partition
+
+    Returns:
+    - list of str
+    """
+    if strategy == 'hash':
+        if partitions < 1:
+            raise PartitioningError('The number of hash partitions must be at least 1')
+        return [f'CREATE TABLE "{parent}_p{remainder}" PARTITION OF "{parent}" '
+                f'FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})' for remainder in range(partitions)]
+
+    if strategy != 'range':
+        raise PartitioningError(f'Unknown partitioning strategy {strategy!r}, expected one of {", ".join(STRATEGIES)}')
+    statements = [f'CREATE TABLE "{parent}_y{year}" PARTITION OF "{parent}" '
+                  f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')" for year in sorted(set(years or ()))]
+    statements.append(f'CREATE TABLE "{parent}_default" PARTITION OF "{parent}" DEFAULT')
+    return statements
+
+
+def index_statements(schema_editor, model=Loan):
+    # The model's indexes on the new table, suffixed with _p until the swap gives them their names
+    names = table_names(model)
+    statements = []
+    for index in model._meta.indexes:
+        renamed = index.clone()
+        renamed.name = f'{index.name}_p'
+        statement = renamed.create_sql(model, schema_editor)
+        statement.rename_table_references(names['table'], names['new'])
+        statements.append(str(statement))
+    return statements
+
+
+def prepare_statements(schema_editor, strategy='hash', partitions=16, years=None, model=Loan):
+    """
+    Return the statements that create the partitioned table and start mirroring writes into it.
+
+    Args:
+    - schema_editor: BaseDatabaseSchemaEditor, Renders the model's indexes
+    - strategy: str, hash (by customer_id) or range (by start_date)
+    - partitions: int, Number of hash partitions
+    - years: iterable of int, Years that get a range partition
+    - model: Model class, Loan or its historical version in a migration
+
+    Returns:
+    - list of str
+    """
+    names = table_names(model)
+    table, new, sequence, sync = names['table'], names['new'], names['sequence'], names['sync']
+    column = 'customer_id' if strategy == 'hash' else 'start_date'
+    key_name, key_definition = key_constraint(strategy, new)
+    customer_table = model._meta.get_field('customer').related_model._meta.db_table
+
+    return [
+        f'CREATE SEQUENCE "{sequence}"',
+        # LIKE copies the columns in order, so rows can be mirrored with SELECT (NEW).*
+        f'CREATE TABLE "{new}" (LIKE "{table}" INCLUDING DEFAULTS, CONSTRAINT "{key_name}" {key_definition}) '
+        f'PARTITION BY {strategy.upper()} ("{column}")',
+        f'''ALTER TABLE "{new}" ALTER COLUMN "loan_id" SET DEFAULT nextval('"{sequence}"')''',
+        f'ALTER SEQUENCE "{sequence}" OWNED BY "{new}"."loan_id"',
+        *partition_statements(new, strategy, partitions, years),
+        *index_statements(schema_editor, model),
+        f'ALTER TABLE "{new}" ADD CONSTRAINT "{new}_customer_id_fk" FOREIGN KEY ("customer_id") '
+        f'REFERENCES "{customer_table}" ("customer_id") DEFERRABLE INITIALLY DEFERRED',
+        f'''CREATE FUNCTION "{sync}"() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM "{new}" WHERE "loan_id" = OLD."loan_id";
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO "{new}" SELECT (NEW).*;
+    END IF;
+    RETURN NULL;
+END
+$$''',
+        # Taking the trigger's lock waits for in-flight writes, so every row is either committed or mirrored
+        f'CREATE TRIGGER "{sync}" AFTER INSERT OR UPDATE OR DELETE ON "{table}" FOR EACH ROW EXECUTE FUNCTION "{sync}"()',
+    ]
+
+
+def swap_statements(strategy, model=Loan):
+    # Statements run under an exclusive lock on the current table to put the partitioned one in its place
+    names = table_names(model)
+    table, new, old, sequence, sync = names['table'], names['new'], names['old'], names['sequence'], names['sync']
+    key_name = key_constraint(strategy, new)[0]
+    statements = [
+        f'LOCK TABLE "{table}" IN ACCESS EXCLUSIVE MODE',
+        f'DROP TRIGGER "{sync}" ON "{table}"',
+        f'DROP FUNCTION "{sync}"()',
+        f'''SELECT setval('"{sequence}"', COALESCE((SELECT max("loan_id") FROM "{new}"), 1), EXISTS (SELECT 1 FROM "{new}"))''',
+        f'ALTER TABLE "{table}" RENAME TO "{old}"',
+        f'ALTER TABLE "{old}" RENAME CONSTRAINT "{table}_pkey" TO "{old}_pkey"',
+        # The old table keeps no foreign keys, so customers can still be deleted while it is kept around
+        f'''DO $$
+DECLARE constraint_name text;
+BEGIN
+    FOR constraint_name IN SELECT conname FROM pg_constraint WHERE conrelid = '"{old}"'::regclass AND contype = 'f' LOOP
+        EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', '{old}', constraint_name);
+    END LOOP;
+END
+$$''',
+    ]
+    for index in model._meta.indexes:
+        statements.append(f'ALTER INDEX IF EXISTS "{index.name}" RENAME TO "{index.name}_u"')
+    statements.append(f'ALTER TABLE "{new}" RENAME TO "{table}"')
+    statements.append(f'ALTER TABLE "{table}" RENAME CONSTRAINT "{key_name}" TO "{key_constraint(strategy, table)[0]}"')
+    for index in model._meta.indexes:
+        statements.append(f'ALTER INDEX "{index.name}_p" RENAME TO "{index.name}"')
+    return statements
+
+
+def require_postgresql(connection):
+    if connection.vendor != 'postgresql':
+        raise PartitioningError(f'Partitioning the Loan table needs PostgreSQL, not {connection.vendor}')
+
+
+def relation_kind(connection, name):
+    # pg_class.relkind of a table: 'r' for a plain table, 'p' for a partitioned one, None if missing
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', [f'"{name}"'])
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def status(connection, model=Loan):
+    """
+    Describe where the move of the Loan table stands.
+
+    Returns:
+    - dict: partitioned (bool), strategy, moving (new table exists), old_table (unpartitioned copy kept) and partitions
+    """
+    require_postgresql(connection)
+    names = table_names(model)
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT count(*) FROM pg_inherits WHERE inhparent = to_regclass(%s)', [f'"{names["table"]}"'])
+        partitions = cursor.fetchone()[0]
+    return {
+        'partitioned': relation_kind(connection, names['table']) == 'p',
+        'strategy': partition_strategy(connection, names['table']),
+        'moving': relation_kind(connection, names['new']) is not None,
+        'old_table': relation_kind(connection, names['old']) is not None,
+        'partitions': partitions,
+    }
+
+
+def default_years(connection, model=Loan, years_ahead=2):
+    # One range partition per year from the oldest loan to years_ahead years from now
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT min("start_date") FROM "{model._meta.db_table}"')
+        oldest = cursor.fetchone()[0]
+    this_year = date.today().year
+    return range(oldest.year if oldest else this_year, this_year + years_ahead + 1)
+
+
+def prepare(connection, strategy='hash', partitions=16, years=None, model=Loan, schema_editor=None):
+    """
+    Create the partitioned table and start mirroring writes of the current table into it.
+
+    Args:
+    - connection: DatabaseWrapper, PostgreSQL connection
+    - strategy: str, hash (by customer_id) or range (by start_date)
+    - partitions: int, Number of hash partitions
+    - years: iterable of int, Years that get a range partition (defaults to default_years)
+    - model: Model class, Loan or its historical version in a migration
+    - schema_editor: BaseDatabaseSchemaEditor, Renders the indexes (defaults to one of connection)
+    """
+    require_postgresql(connection)
+    state = status(connection, model)
+    if state['partitioned'] or state['moving']:
+        raise PartitioningError('The Loan table is already partitioned or being moved')
+    if strategy == 'range' and years is None:
+        years = default_years(connection, model)
+
+    statements = prepare_statements(schema_editor or connection.schema_editor(), strategy, partitions, years, model)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def backfill(connection, batch_size=50000, model=Loan, progress=None):
+    """
+    Copy the rows of the current table into the partitioned one, batch by batch.
+
+    Safe to run again after an interruption: rows already present are skipped.
+
+    Args:
+    - connection: DatabaseWrapper, PostgreSQL connection
+    - batch_size: int, Range of loan_ids copied per transaction
+    - model: Model class, Loan or its historical version in a migration
+    - progress: callable, Called with (last loan_id copied, highest loan_id) after each batch
+
+    Returns:
+    - int: Number of rows copied
+    """
+    require_postgresql(connection)
+    names = table_names(model)
+    table, new = names['table'], names['new']
+    if relation_kind(connection, new) is None:
+        raise PartitioningError('Run the prepare step first')
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT min("loan_id"), max("loan_id") FROM "{table}"')
+        lowest, highest = cursor.fetchone()
+    if lowest is None:
+        return 0
+
+    copied = 0
+    for start in range(lowest, highest + 1, batch_size):
+        end = start + batch_size
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            # Concurrent updates of these rows wait for the batch, and are then mirrored by the trigger
+            cursor.execute(f'SELECT count(*) FROM (SELECT 1 FROM "{table}" WHERE "loan_id" >= %s AND "loan_id" < %s FOR SHARE) locked',
+                           [start, end])
+            cursor.execute(
+                f'INSERT INTO "{new}" SELECT source.* FROM "{table}" source '
+                f'WHERE source."loan_id" >= %s AND source."loan_id" < %s '
+                f'AND NOT EXISTS (SELECT 1 FROM "{new}" copy WHERE copy."loan_id" = source."loan_id")',
+                [start, end])
+            copied += cursor.rowcount
+        if progress:
+            progress(min(end - 1, highest), highest)
+    return copied
+
+
+def swap(connection, model=Loan):
+    """
+    Put the partitioned table in place of the current one.
+
+    The current table is locked only for the renames; it is kept as
+    <table>_unpartitioned until drop_old is run.
+
+    Args:
+    - connection: DatabaseWrapper, PostgreSQL connection
+    - model: Model class, Loan or its historical version in a migration
+    """
+    require_postgresql(connection)
+    strategy = partition_strategy(connection, table_names(model)['new'])
+    if strategy is None:
+        raise PartitioningError('Run the prepare and backfill steps first')
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        for statement in swap_statements(strategy, model):
+            cursor.execute(statement)
+
+
+def drop_old(connection, model=Loan):
+    # Drop the unpartitioned table kept by swap
+    require_postgresql(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS "{table_names(model)["old"]}"')
+
+
+def partition_strategy(connection, table):
+    # hash or range for a partitioned table, None for a plain or missing one
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT partstrat FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [f'"{table}"'])
+        row = cursor.fetchone()
+    return {'h': 'hash', 'r': 'range'}.get(row[0]) if row else None
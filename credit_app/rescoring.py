@@ -0,0 +1,109 @@
+# credit_app/rescoring.py
+from datetime import date
+import numpy as np
+from django.db import connections, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from . import rules
+from .models import CreditScoreSnapshot, Customer, RescorePartition, RescoreRun
+from .score_history import new_score_snapshot
+from .utils import CustomerCreditSnapshot
+from .vectorized import calculate_credit_scores
+
+
+def start_run(partition_size, as_of=None):
+    """
+    Create a rescore run and its customer_id range partitions.
+
+    Args:
+    - partition_size: int, Number of customer ids per partition
+    - as_of: date, Date the scores are computed for (defaults to today)
+
+    Returns:
+    - RescoreRun: The new run
+    """
+    bounds = Customer.objects.aggregate(low=Min('customer_id'), high=Max('customer_id'))
+    with transaction.atomic():
+        run = RescoreRun.objects.create(as_of=as_of or date.today(), partition_size=partition_size)
+        if bounds['low'] is not None:
+            RescorePartition.objects.bulk_create([
+                RescorePartition(run=run, start_id=start_id, end_id=start_id + partition_size)
+                for start_id in range(bounds['low'], bounds['high'] + 1, partition_size)
+            ])
+    return run
+
+
+def pending_partitions(run):
+    # Partitions whose snapshots have not been written yet, in id order
+    return list(run.partitions.filter(completed_at__isnull=True).order_by('start_id').values_list('pk', flat=True))
+
+
+def rescore_partition(partition_id):
+    """
+    Score every customer of one partition and write the snapshots in bulk.
+
+    The snapshots and the partition's completed mark are written in one
+    transaction, so a partition interrupted halfway is simply redone on resume.
+
+    Args:
+    - partition_id: int, RescorePartition to process
+
+    Returns:
+    - int: Number of customers scored
+    """
+    partition = RescorePartition.objects.select_related('run').get(pk=partition_id)
+    if partition.completed_at is not None:
+        return partition.customers
+
+    run = partition.run
+    customers = list(Customer.objects.filter(customer_id__gte=partition.start_id, customer_id__lt=partition.end_id))
+    snapshots = CustomerCreditSnapshot.for_customers(customers, as_of=run.as_of)
+    ordered = [snapshots[customer.customer_id] for customer in customers]
+
+    # Each rule set scores its share of the partition in one vectorized pass
+    late_loans = np.array([snapshot.late_loans for snapshot in ordered], dtype=np.int64)
+    total_loans = np.array([snapshot.total_loans for snapshot in ordered], dtype=np.int64)
+    current_year_loans = np.array([snapshot.current_year_loans for snapshot in ordered], dtype=np.int64)
+    current_exposure = np.array([snapshot.current_exposure for snapshot in ordered], dtype=np.float64)
+    approved_limit = np.array([customer.approved_limit for customer in customers], dtype=np.float64)
+
+    scores = np.zeros(len(customers), dtype=np.int64)
+    versions = [None] * len(customers)
+    for ruleset, positions in rules.get_rulebook().split([customer.customer_id for customer in customers]):
+        scores[positions] = calculate_credit_scores(late_loans[positions], total_loans[positions], current_year_loans[positions],
+                                                    current_exposure[positions], approved_limit[positions], ruleset)
+        for position in positions.tolist():
+            versions[position] = ruleset.version
+
+    now = timezone.now()
+    # Scores for a past date are marked with it, so they never pass for the customer's current score
+    as_of = run.as_of if run.as_of < date.today() else None
+    with transaction.atomic():
+        CreditScoreSnapshot.objects.bulk_create([
+            new_score_snapshot(snapshot, score, version, run=run, as_of=as_of, created_at=now)
+            for snapshot, score, version in zip(ordered, scores.tolist(), versions)
+        ], batch_size=2000)
+        completed = RescorePartition.objects.filter(pk=partition.pk, completed_at__isnull=True).update(
+            customers=len(customers), completed_at=now)
+        if not completed:
+            # Another worker finished the same partition first; keep its snapshots only
+            transaction.set_rollback(True)
+
+    return len(customers)
+
+
+def init_worker():
+    # Spawned workers set Django up again; each worker then opens its own database connection
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+def finish_run(run):
+    # Stamp the run as finished once every partition is written
+    if not run.partitions.filter(completed_at__isnull=True).exists():
+        run.finished_at = timezone.now()
+        run.save(update_fields=['finished_at'])
+    return run
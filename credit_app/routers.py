@@ -0,0 +1,249 @@
+# credit_app/routers.py
+import itertools
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+KEY_PREFIX = 'credit_app:primary'
+
+# Replica alias reads are sent to in the current request, None to read from the primary
+_read_alias = ContextVar('credit_app_read_alias', default=None)
+
+
+def get_replicas():
+    # Database aliases of the read replicas, empty when every read goes to the primary
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def get_sticky_window():
+    # Seconds a customer's reads stay on the primary after a write; should exceed the replication lag
+    return getattr(settings, 'DATABASE_REPLICA_STICKY_SECONDS', 30)
+
+
+def get_cache_alias():
+    return getattr(settings, 'DATABASE_REPLICA_CACHE_ALIAS', 'default')
+
+
+def get_cache():
+    # Shared between processes, so a read served by another worker still sees the write
+    return caches[get_cache_alias()]
+
+
+@checks.register(checks.Tags.database, checks.Tags.caches)
+def check_sticky_cache(app_configs=None, **kwargs):
+    """
+    Refuse read replicas whose sticky-after-write marks live in a process-local cache.
+
+    With several workers a read may reach a worker that never saw the mark and
+    return replica data older than the customer's own write.
+    """
+    if not get_replicas():
+        return []
+    alias = get_cache_alias()
+    if isinstance(get_cache(), (LocMemCache, DummyCache)):
+        return [checks.Error(
+            f'DATABASE_REPLICA_CACHE_ALIAS {alias!r} is a process-local cache, so sticky-after-write marks are not '
+            f'seen by other workers.',
+            hint='Point DATABASE_REPLICA_CACHE_ALIAS at a cache shared by every worker (e.g. Redis or memcached), '
+                 'or silence credit_app.E001 for a single-process deployment.',
+            id='credit_app.E001',
+        )]
+    return []
+
+
+def sticky_key(customer_id):
+    return f'{KEY_PREFIX}:{customer_id}'
+
+
+class ReplicaBalancer:
+    """
+    Process-local choice of the replica that serves the next read-only request.
+
+    round_robin cycles through the replicas; least_busy picks the one with the
+    fewest requests in flight in this process, cycling between ties.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._turns = itertools.count()
+        self._in_flight = {}
+
+    def choose(self, replicas, strategy='round_robin'):
+        with self._lock:
+            turn = next(self._turns)
+            if strategy == 'least_busy':
+                fewest = min(self._in_flight.get(alias, 0) for alias in replicas)
+                replicas = [alias for alias in replicas if self._in_flight.get(alias, 0) == fewest]
+            elif strategy != 'round_robin':
+                raise ValueError(f'Unknown replica selection {strategy!r}, expected round_robin or least_busy')
+            return replicas[turn % len(replicas)]
+
+    def acquire(self, alias):
+        with self._lock:
+            self._in_flight[alias] = self._in_flight.get(alias, 0) + 1
+
+    def release(self, alias):
+        with self._lock:
+            self._in_flight[alias] -= 1
+            if self._in_flight[alias] == 0:
+                del self._in_flight[alias]
+
+    def in_flight(self):
+        with self._lock:
+            return dict(self._in_flight)
+
+
+balancer = ReplicaBalancer()
+
+
+def mark_written(customer_ids):
+    """
+    Keep the reads of customers on the primary until their writes reach the replicas.
+
+    The mark is set once the surrounding transaction commits, when the write
+    becomes visible on the primary.
+
+    Args:
+    - customer_ids: iterable, Customers that were just written
+    """
+    window = get_sticky_window()
+    keys = {sticky_key(customer_id): 1 for customer_id in customer_ids if customer_id is not None}
+    if not get_replicas() or window <= 0 or not keys:
+        return
+    transaction.on_commit(lambda: get_cache().set_many(keys, timeout=window))
+
+
+def is_sticky(customer_id):
+    # Whether the customer was written recently enough that a replica may not have the change yet
+    return customer_id is not None and get_cache().get(sticky_key(customer_id)) is not None
+
+
+async def ais_sticky(customer_id):
+    # Async version of is_sticky for ASGI views
+    return customer_id is not None and await get_cache().aget(sticky_key(customer_id)) is not None
+
+
+def choose_replica(customer_id=None):
+    """
+    Pick the database a read-only request reads from.
+
+    Args:
+    - customer_id: int, Customer the request is about, if known
+
+    Returns:
+    - str or None: A replica alias, or None to read from the primary
+    """
+    replicas = get_replicas()
+    if not replicas or is_sticky(customer_id):
+        return None
+    return balancer.choose(replicas, getattr(settings, 'DATABASE_REPLICA_SELECTION', 'round_robin'))
+
+
+async def achoose_replica(customer_id=None):
+    # Async version of choose_replica for ASGI views
+    replicas = get_replicas()
+    if not replicas or await ais_sticky(customer_id):
+        return None
+    return balancer.choose(replicas, getattr(settings, 'DATABASE_REPLICA_SELECTION', 'round_robin'))
+
+
+@contextmanager
+def read_from_replica(customer_id=None):
+    """
+    Send the reads made inside the block to a replica.
+
+    Writes, and reads inside a transaction on the primary, still go to the primary.
+
+    Args:
+    - customer_id: int, Customer the reads are about; recently written customers read from the primary
+
+    Yields:
+    - str or None: The replica alias, or None when reading from the primary
+    """
+    with reading_from(choose_replica(customer_id)) as alias:
+        yield alias
+
+
+@asynccontextmanager
+async def aread_from_replica(customer_id=None):
+    """
+    Async version of read_from_replica for ASGI views.
+
+    The async ORM runs queries in a thread that inherits the coroutine's context,
+    so they are routed like sync ones.
+    """
+    with reading_from(await achoose_replica(customer_id)) as alias:
+        yield alias
+
+
+@contextmanager
+def reading_from(alias):
+    # Route the block's reads to alias (None for the primary) and count it as in flight
+    token = _read_alias.set(alias)
+    if alias is not None:
+        balancer.acquire(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+        if alias is not None:
+            balancer.release(alias)
+
+
+def current_read_alias():
+    # Replica the current reads are routed to, or None when they go to the primary
+    alias = _read_alias.get()
+    if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        # Reads inside a transaction on the primary must see its own uncommitted writes
+        return None
+    return alias
+
+
+def replica_reads(customer_id=None):
+    """
+    Decorate a read-only view method so its queries go to a replica.
+
+    Args:
+    - customer_id: callable, Takes (request, kwargs) and returns the customer the request is about
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            try:
+                customer = customer_id(request, kwargs) if customer_id else None
+            except Exception:
+                customer = None
+            with read_from_replica(customer):
+                return method(view, request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ReplicaRouter:
+    """
+    Route reads inside read_from_replica blocks to the chosen replica.
+
+    Everything else, including all writes, uses the primary. Replicas get their
+    schema through replication, but migrations are allowed everywhere so local
+    stand-in databases can be created by the test runner.
+    """
+
+    def db_for_read(self, model, **hints):
+        return current_read_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,436 @@
+# credit_app/rules.py
+import json
+import logging
+import threading
+import time
+import uuid
+from asgiref.sync import sync_to_async
+from django.conf import settings
+import numpy as np
+from .score_cache import get_cache
+
+logger = logging.getLogger(__name__)
+
+# Loan aggregates a rule set may deduct points for, in the order of the vectorized inputs
+DEDUCTION_FIELDS = ('late_loans', 'total_loans', 'current_year_loans')
+
+# The scoring, rate correction and approval rules the service has always applied
+BUILTIN_RULES = {
+    'version': 'builtin-1',
+    'base_score': 100,
+    # Points deducted per late loan, per past loan and per loan started this year
+    'deductions': {'late_loans': 2, 'total_loans': 3, 'current_year_loans': 5},
+    # The score drops to 0 when the principal still owed on current loans exceeds the approved limit
+    'zero_score_over_limit': True,
+    # Score bands from the best down: a score above score_above gets the rate raised to rate_floor,
+    # and is approved only if the corrected rate is above approve_rate_above. Lower scores are rejected.
+    'bands': [
+        {'score_above': 50, 'rate_floor': None, 'approve_rate_above': None},
+        {'score_above': 30, 'rate_floor': 12, 'approve_rate_above': 12},
+        {'score_above': 10, 'rate_floor': 16, 'approve_rate_above': 16},
+    ],
+    # Highest share of the monthly salary all EMIs together may take
+    'max_emi_ratio': 0.5,
+}
+
+# Cache key bumped whenever the rule sets stored in the database change
+GENERATION_KEY = 'credit_app:rules:generation'
+
+
+class RuleSetError(ValueError):
+    # Raised for a rule set definition that cannot be compiled
+    pass
+
+
+def number(definition, name, default=None):
+    # Read a numeric setting of a rule set definition
+    value = definition.get(name, default)
+    if value is None or isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise RuleSetError(f'{name} must be a number.')
+    return value
+
+
+class CompiledRuleSet:
+    """
+    A rule set definition compiled into a fast evaluator.
+
+    The definition is validated and turned into plain tuples and NumPy arrays
+    once, when it is loaded, so evaluating a snapshot costs a few arithmetic
+    operations and evaluating a batch a few array operations. Compiled rule sets
+    are immutable and shared by all threads.
+    """
+
+    def __init__(self, definition):
+        if not isinstance(definition, dict):
+            raise RuleSetError('A rule set must be an object.')
+        version = definition.get('version')
+        if not isinstance(version, str) or not version:
+            raise RuleSetError('version must be a non-empty string.')
+
+        deductions = definition.get('deductions', {})
+        if not isinstance(deductions, dict) or set(deductions) - set(DEDUCTION_FIELDS):
+            raise RuleSetError(f'deductions may only use {", ".join(DEDUCTION_FIELDS)}.')
+
+        bands = definition.get('bands')
+        if not isinstance(bands, list) or not bands or not all(isinstance(band, dict) for band in bands):
+            raise RuleSetError('bands must be a non-empty list of objects.')
+
+        self.version = version
+        self.definition = json.loads(json.dumps(definition))  # Private copy; callers may mutate theirs
+        self.base_score = number(definition, 'base_score')
+        self.deductions = tuple((field, number(deductions, field)) for field in DEDUCTION_FIELDS if field in deductions)
+        self.zero_score_over_limit = bool(definition.get('zero_score_over_limit', False))
+        self.max_emi_ratio = number(definition, 'max_emi_ratio')
+
+        # Bands as (score_above, rate_floor, approve_rate_above) from the highest score down
+        compiled = []
+        for band in bands:
+            floor, approve_above = band.get('rate_floor'), band.get('approve_rate_above')
+            compiled.append((
+                number(band, 'score_above'),
+                None if floor is None else number(band, 'rate_floor'),
+                None if approve_above is None else number(band, 'approve_rate_above'),
+            ))
+        self.bands = tuple(sorted(compiled, key=lambda band: band[0], reverse=True))
+
+        # Array forms of the same rules for the vectorized evaluators
+        self._weights = np.array([dict(self.deductions).get(field, 0) for field in DEDUCTION_FIELDS], dtype=np.float64)
+        self._score_above = np.array([band[0] for band in self.bands], dtype=np.float64)
+        self._rate_floors = np.array([-np.inf if band[1] is None else band[1] for band in self.bands], dtype=np.float64)
+        self._approve_above = np.array([-np.inf if band[2] is None else band[2] for band in self.bands], dtype=np.float64)
+
+    def __repr__(self):
+        return f'<CompiledRuleSet {self.version}>'
+
+    def score(self, snapshot, approved_limit):
+        """
+        Calculate the credit score of one customer.
+
+        Args:
+        - snapshot: CustomerCreditSnapshot, Loan aggregates of the customer
+        - approved_limit: float, Customer's approved credit limit
+
+        Returns:
+        - int: Credit score, never negative
+        """
+        if self.zero_score_over_limit and snapshot.current_exposure > approved_limit:
+            return 0
+        credit_score = self.base_score
+        for field, points in self.deductions:
+            credit_score -= getattr(snapshot, field) * points
+        return max(int(credit_score), 0)
+
+    def scores(self, late_loans, total_loans, current_year_loans, current_exposure, approved_limit):
+        """
+        Calculate the credit scores of many customers at once.
+
+        Args:
+        - late_loans: array of int, Number of loans with EMIs not paid on time
+        - total_loans: array of int, Number of loans taken in the past
+        - current_year_loans: array of int, Number of loans started in the current year
+        - current_exposure: array of float, Remaining principal of current loans
+        - approved_limit: array of float, Approved credit limit
+
+        Returns:
+        - ndarray of int: Credit scores
+        """
+        counts = np.stack([
+            np.asarray(late_loans, dtype=np.float64),
+            np.asarray(total_loans, dtype=np.float64),
+            np.asarray(current_year_loans, dtype=np.float64),
+        ], axis=-1)
+        credit_scores = np.trunc(self.base_score - counts @ self._weights).astype(np.int64)
+        if self.zero_score_over_limit:
+            over_limit = np.asarray(current_exposure, dtype=np.float64) > np.asarray(approved_limit, dtype=np.float64)
+            credit_scores = np.where(over_limit, 0, credit_scores)
+        return np.maximum(credit_scores, 0)
+
+    def band(self, credit_score):
+        # The first band the score falls in, or None when the score is too low for any
+        for band in self.bands:
+            if credit_score > band[0]:
+                return band
+        return None
+
+    def corrected_rate(self, credit_score, interest_rate):
+        """
+        Return the interest rate offered for a credit score.
+
+        Args:
+        - credit_score: int, Customer's credit score
+        - interest_rate: float, Requested interest rate
+
+        Returns:
+        - float or None: Corrected interest rate, or None if no rate is offered
+        """
+        band = self.band(credit_score)
+        if band is None:
+            return None
+        return interest_rate if band[1] is None else max(interest_rate, band[1])
+
+    def corrected_rates(self, credit_scores, interest_rates):
+        # Vectorized corrected_rate; NaN where no rate is offered
+        credit_scores = np.asarray(credit_scores)
+        interest_rates = np.asarray(interest_rates, dtype=np.float64)
+        return np.select(
+            [credit_scores > above for above in self._score_above],
+            [np.maximum(interest_rates, floor) for floor in self._rate_floors],
+            default=np.nan,
+        )
+
+    def approves(self, credit_score, corrected_rate, total_current_emis, monthly_installment, monthly_salary):
+        """
+        Decide a loan from its score band and the customer's EMI burden.
+
+        Args:
+        - credit_score: int, Customer's credit score
+        - corrected_rate: float or None, Rate offered for the score
+        - total_current_emis: float, Sum of the customer's current monthly repayments
+        - monthly_installment: float or None, EMI of the requested loan at the offered rate
+        - monthly_salary: float, Customer's monthly salary
+
+        Returns:
+        - bool: Whether the loan is approved
+        """
+        band = self.band(credit_score)
+        if band is None or corrected_rate is None:
+            return False
+        if band[2] is not None and not corrected_rate > band[2]:
+            return False
+        return total_current_emis + monthly_installment <= self.max_emi_ratio * monthly_salary
+
+    def approvals(self, credit_scores, corrected_rates, total_current_emis, monthly_installments, monthly_salaries):
+        # Vectorized approves; NaN rates and installments are never approved
+        credit_scores = np.asarray(credit_scores)
+        corrected_rates = np.asarray(corrected_rates, dtype=np.float64)
+        in_band = np.select(
+            [credit_scores > above for above in self._score_above],
+            [corrected_rates > approve_above for approve_above in self._approve_above],
+            default=False,
+        )
+        affordable = (
+            np.asarray(total_current_emis, dtype=np.float64) + np.asarray(monthly_installments, dtype=np.float64)
+            <= self.max_emi_ratio * np.asarray(monthly_salaries, dtype=np.float64)
+        )
+        return in_band & affordable
+
+
+BUILTIN = CompiledRuleSet(BUILTIN_RULES)
+
+
+def bucket_of(customer_ids, total_weight):
+    # Stable A/B bucket of customer ids: Knuth multiplicative hashing, modulo the total weight
+    return (np.asarray(customer_ids, dtype=np.uint64) * np.uint64(2654435761) % np.uint64(2 ** 32)) % np.uint64(total_weight)
+
+
+class RuleBook:
+    """
+    The compiled rule sets available to the service and the traffic split between them.
+
+    Each customer is assigned a rule set by a stable hash of their id, so a customer
+    keeps seeing the same rules while an A/B test runs. With no traffic configured,
+    every customer gets the default version.
+    """
+
+    def __init__(self, rule_sets, traffic=None, default_version=BUILTIN.version):
+        self.rule_sets = {rule_set.version: rule_set for rule_set in rule_sets}
+        if default_version not in self.rule_sets:
+            raise RuleSetError(f'Unknown default rule set version {default_version}.')
+        self.default = self.rule_sets[default_version]
+
+        # Cumulative weight bounds of the versions that take traffic
+        unknown = set(traffic or {}) - set(self.rule_sets)
+        if unknown:
+            raise RuleSetError(f'Traffic is routed to unknown rule set versions: {", ".join(sorted(unknown))}.')
+        self.traffic = {version: weight for version, weight in sorted((traffic or {}).items()) if weight > 0}
+        self._versions = list(self.traffic)
+        self._bounds = np.cumsum(list(self.traffic.values()), dtype=np.uint64)
+
+    def get(self, version):
+        # Compiled rule set of a version, or None if it is not loaded
+        return self.rule_sets.get(version)
+
+    def for_customer(self, customer_id):
+        # Rule set the customer is scored with
+        if not self._versions:
+            return self.default
+        bucket = bucket_of([customer_id], self._bounds[-1])
+        return self.rule_sets[self._versions[int(np.searchsorted(self._bounds, bucket, side='right')[0])]]
+
+    def split(self, customer_ids):
+        """
+        Group many customers by the rule set they are scored with.
+
+        Args:
+        - customer_ids: array of int
+
+        Returns:
+        - list: (CompiledRuleSet, ndarray of positions in customer_ids) pairs
+        """
+        customer_ids = np.asarray(customer_ids)
+        if not self._versions:
+            return [(self.default, np.arange(len(customer_ids)))]
+        assigned = np.searchsorted(self._bounds, bucket_of(customer_ids, self._bounds[-1]), side='right')
+        return [(self.rule_sets[version], np.flatnonzero(assigned == index))
+                for index, version in enumerate(self._versions) if (assigned == index).any()]
+
+
+def settings_definitions():
+    # Rule sets configured in settings: CREDIT_RULE_SETS inline and CREDIT_RULES_FILE as a JSON list
+    definitions = list(getattr(settings, 'CREDIT_RULE_SETS', []))
+    path = getattr(settings, 'CREDIT_RULES_FILE', None)
+    if path:
+        with open(path) as rules_file:
+            definitions.extend(json.load(rules_file))
+    return definitions
+
+
+def build_rulebook(include_database=True):
+    """
+    Compile every configured rule set into a new RuleBook.
+
+    Later sources override earlier ones for the same version: the builtin rules,
+    then CREDIT_RULE_SETS and CREDIT_RULES_FILE, then active ScoringRuleSet rows.
+    Traffic weights come from CREDIT_RULES_TRAFFIC, overridden by the weights of
+    the database rows. A settings error is raised; an invalid database row is
+    logged and skipped so a bad edit cannot take scoring down.
+
+    Args:
+    - include_database: bool, Whether to read ScoringRuleSet rows
+
+    Returns:
+    - RuleBook
+    """
+    rule_sets = {BUILTIN.version: BUILTIN}
+    for definition in settings_definitions():
+        rule_set = CompiledRuleSet(definition)
+        rule_sets[rule_set.version] = rule_set
+    traffic = dict(getattr(settings, 'CREDIT_RULES_TRAFFIC', {}))
+
+    if include_database:
+        # Imported here so the evaluators stay usable from the NumPy kernels without the app registry
+        from .models import ScoringRuleSet
+        for row in ScoringRuleSet.objects.filter(is_active=True).order_by('updated_at'):
+            try:
+                rule_sets[row.version] = CompiledRuleSet({**row.definition, 'version': row.version})
+            except (RuleSetError, TypeError) as e:
+                # Rows written with create(), update() or raw SQL skip ScoringRuleSet.clean; a definition
+                # that is not an object raises TypeError here
+                logger.warning('Skipping invalid scoring rule set %s: %s', row.version, e)
+                continue
+            traffic[row.version] = row.weight
+
+    return RuleBook(rule_sets.values(), {version: weight for version, weight in traffic.items() if version in rule_sets},
+                    getattr(settings, 'CREDIT_RULES_DEFAULT_VERSION', BUILTIN.version))
+
+
+def get_check_interval():
+    # Seconds between checks for rule set changes made by other processes
+    return getattr(settings, 'CREDIT_RULES_CHECK_SECONDS', 5)
+
+
+class RuleRegistry:
+    """
+    Process-wide holder of the current RuleBook with hot reload.
+
+    Readers take the current RuleBook reference without locking; a reload compiles
+    the new RuleBook on the side and swaps the reference in one assignment, so
+    requests are never paused and a request keeps the RuleBook it started with.
+    Changes made in another process are picked up through current_generation,
+    checked at most every CREDIT_RULES_CHECK_SECONDS.
+    """
+
+    def __init__(self):
+        self._reload_lock = threading.Lock()
+        self.rulebook = None
+        self.generation = None
+        self.next_check = 0.0
+
+    def get(self):
+        rulebook = self.rulebook
+        if rulebook is not None and not self.check_due():
+            return rulebook
+        if rulebook is None:
+            # Only the very first load makes callers wait
+            with self._reload_lock:
+                if self.rulebook is None:
+                    self.reload()
+            return self.rulebook
+        if self._reload_lock.acquire(blocking=False):
+            # One thread checks for changes while the others keep scoring with the current rules
+            try:
+                self.refresh()
+            finally:
+                self._reload_lock.release()
+        return self.rulebook
+
+    async def aget(self):
+        # Async version of get for ASGI views; loading reads the database, so it runs in a thread
+        rulebook = self.rulebook
+        if rulebook is not None and not self.check_due():
+            return rulebook
+        return await sync_to_async(self.get)()
+
+    def check_due(self):
+        return time.monotonic() >= self.next_check
+
+    def refresh(self):
+        # Reload if another process changed the stored rule sets since the last load
+        self.next_check = time.monotonic() + get_check_interval()
+        try:
+            if current_generation() != self.generation:
+                self.reload()
+        except Exception:
+            logger.exception('Reloading scoring rules failed; keeping rule sets %s', ', '.join(self.rulebook.rule_sets))
+
+    def reload(self):
+        # Compile the rule sets afresh and swap them in
+        generation = current_generation()
+        self.install(build_rulebook())
+        self.generation = generation
+        return self.rulebook
+
+    def install(self, rulebook):
+        # Swap in a RuleBook built elsewhere (tests use this to pin rule sets)
+        self.rulebook = rulebook
+        self.next_check = time.monotonic() + get_check_interval()
+
+
+def current_generation():
+    """
+    Signature of the stored rule sets; it changes whenever a ScoringRuleSet row is saved or deleted.
+
+    The row count and the latest updated_at are read from the database, so every
+    process sees a change even when the cache is local to each process. The
+    generation publish_change stores in the cache is added for edits that keep
+    both, such as a queryset update() of an existing row.
+    """
+    # Imported here like in build_rulebook
+    from django.db.models import Count, Max
+    from .models import ScoringRuleSet
+    stored = ScoringRuleSet.objects.aggregate(rows=Count('id'), updated_at=Max('updated_at'))
+    return stored['rows'], stored['updated_at'], get_cache().get(GENERATION_KEY)
+
+
+def publish_change():
+    # Tell every process to reload: bump the shared generation and reload this process right away
+    get_cache().set(GENERATION_KEY, uuid.uuid4().hex, None)
+    registry.reload()
+
+
+registry = RuleRegistry()
+
+
+def get_rulebook():
+    # The current RuleBook, loaded on first use
+    return registry.get()
+
+
+async def aget_rulebook():
+    # Async version of get_rulebook for ASGI views
+    return await registry.aget()
+
+
+def for_customer(customer_id):
+    # Rule set the customer is scored with under the current RuleBook
+    return get_rulebook().for_customer(customer_id)
@@ -0,0 +1,160 @@
+# credit_app/score_cache.py
+import threading
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+KEY_PREFIX = 'credit_app:score'
+
+
+class ScoreCacheCounters:
+    """
+    Process-local hit/miss/invalidation counters for the credit score cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+
+    def record(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'invalidations': self.invalidations}
+
+
+counters = ScoreCacheCounters()
+
+
+def get_cache():
+    # Cache alias used for credit scores; configured through CACHES so tests run on local memory
+    return caches[getattr(settings, 'CREDIT_SCORE_CACHE_ALIAS', 'default')]
+
+
+def is_enabled():
+    """
+    Tell whether credit scores may be cached.
+
+    A loan write invalidates the entry only in the cache of the process that made
+    it. With a process-local backend every other worker would keep serving the old
+    score until the entry expires, so such a cache is only used when
+    CREDIT_SCORE_CACHE_LOCAL declares that a single process serves requests.
+
+    Returns:
+    - bool
+    """
+    return getattr(settings, 'CREDIT_SCORE_CACHE_LOCAL', False) or not isinstance(get_cache(), LocMemCache)
+
+
+def get_timeout():
+    # Time-to-live of a cached credit score in seconds
+    return getattr(settings, 'CREDIT_SCORE_CACHE_TIMEOUT', 300)
+
+
+def cache_key(customer_id):
+    return f'{KEY_PREFIX}:{customer_id}'
+
+
+def entry_matches(entry, customer, rule_version=None):
+    # Entries remember the salary, approved limit and rule set version they were computed with
+    return (
+        entry is not None
+        and 'recorded_at' in entry
+        and entry['monthly_salary'] == customer.monthly_salary
+        and entry['approved_limit'] == customer.approved_limit
+        and entry.get('rule_version') == rule_version
+    )
+
+
+def make_entry(customer, total_current_emis, row):
+    # The entry keeps the inputs and time of the score history row it was served from
+    return {
+        'credit_score': row.credit_score,
+        'total_current_emis': total_current_emis,
+        'monthly_salary': customer.monthly_salary,
+        'approved_limit': customer.approved_limit,
+        'rule_version': row.rule_version,
+        'inputs': row.inputs,
+        'recorded_at': row.created_at.timestamp(),
+    }
+
+
+def lookup(customer, rule_version=None):
+    """
+    Return the cached score entry of a customer, or None on a miss or when the cache is disabled.
+
+    An entry is never served for a customer whose salary or limit has changed
+    since it was computed, nor when the customer is now scored with other rules.
+
+    Args:
+    - customer: Customer object
+    - rule_version: str, Version of the rule set the customer is scored with
+
+    Returns:
+    - dict or None: Entry with credit_score, total_current_emis and the inputs and
+      recorded_at (epoch seconds) of the score history row holding the score
+    """
+    if not is_enabled():
+        return None
+    entry = get_cache().get(cache_key(customer.customer_id))
+    if entry_matches(entry, customer, rule_version):
+        counters.record('hits')
+        return entry
+    counters.record('misses')
+    return None
+
+
+def store(customer, total_current_emis, row):
+    """
+    Cache a credit score and EMI total.
+
+    Args:
+    - customer: Customer object
+    - total_current_emis: float, Customer's current EMI total
+    - row: CreditScoreSnapshot, Score history row holding the score
+    """
+    if is_enabled():
+        get_cache().set(cache_key(customer.customer_id), make_entry(customer, total_current_emis, row), get_timeout())
+
+
+async def alookup(customer, rule_version=None):
+    # Async version of lookup for ASGI views
+    if not is_enabled():
+        return None
+    entry = await get_cache().aget(cache_key(customer.customer_id))
+    if entry_matches(entry, customer, rule_version):
+        counters.record('hits')
+        return entry
+    counters.record('misses')
+    return None
+
+
+async def astore(customer, total_current_emis, row):
+    # Async version of store for ASGI views
+    if is_enabled():
+        await get_cache().aset(cache_key(customer.customer_id), make_entry(customer, total_current_emis, row), get_timeout())
+
+
+def invalidate(customer_id):
+    """
+    Drop the cached credit score of a customer.
+
+    The entry is deleted right away and again once the surrounding transaction
+    commits, so a reader that recomputed it from uncommitted state does not keep it.
+
+    Args:
+    - customer_id: int, Customer whose entry is dropped
+    """
+    key = cache_key(customer_id)
+    get_cache().delete(key)
+    counters.record('invalidations')
+    transaction.on_commit(lambda: get_cache().delete(key))
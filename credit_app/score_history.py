@@ -0,0 +1,165 @@
+# credit_app/score_history.py
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .models import CreditScoreSnapshot
+
+
+def get_reuse_window():
+    # Seconds a persisted score may be reused by later eligibility checks
+    return getattr(settings, 'CREDIT_SCORE_SNAPSHOT_REUSE_SECONDS', 60)
+
+
+def snapshot_inputs(snapshot):
+    # Everything a score was computed from, stored with it for audits
+    customer = snapshot.customer
+    return {
+        'total_loans': snapshot.total_loans,
+        'late_loans': snapshot.late_loans,
+        'current_year_loans': snapshot.current_year_loans,
+        'total_loan_amount': snapshot.total_loan_amount,
+        'total_monthly_repayment': snapshot.total_monthly_repayment,
+        'current_exposure': snapshot.current_exposure,
+        'monthly_salary': customer.monthly_salary,
+        'approved_limit': customer.approved_limit,
+        # Version of the CustomerLoanStats row the aggregates were read from, if any
+        'stats_updated_at': snapshot.stats_updated_at.isoformat() if snapshot.stats_updated_at else None,
+    }
+
+
+def new_score_snapshot(snapshot, credit_score, rule_version, **kwargs):
+    # Unsaved CreditScoreSnapshot row for a freshly computed score
+    return CreditScoreSnapshot(customer_id=snapshot.customer.customer_id, credit_score=credit_score,
+                               inputs=snapshot_inputs(snapshot), rule_version=rule_version, **kwargs)
+
+
+def covers(recorded_at, now=None):
+    # Whether a score persisted at recorded_at (epoch seconds) may stand for a decision made now, as in is_reusable
+    return recorded_at >= (now or timezone.now()).timestamp() - get_reuse_window()
+
+
+def cached_score_row(customer_id, entry):
+    # Unsaved CreditScoreSnapshot row appending a score served from the score cache to the history
+    return CreditScoreSnapshot(customer_id=customer_id, credit_score=entry['credit_score'], inputs=entry['inputs'],
+                               rule_version=entry['rule_version'])
+
+
+def record_score(snapshot, credit_score, rule_version):
+    """
+    Append a computed score to the customer's score history.
+
+    Args:
+    - snapshot: CustomerCreditSnapshot, Loan aggregates the score was computed from
+    - credit_score: int, Computed credit score
+    - rule_version: str, Version of the rules that computed it
+
+    Returns:
+    - CreditScoreSnapshot: The stored row
+    """
+    row = new_score_snapshot(snapshot, credit_score, rule_version)
+    row.save(force_insert=True)
+    return row
+
+
+async def arecord_score(snapshot, credit_score, rule_version):
+    # Async version of record_score for ASGI views
+    row = new_score_snapshot(snapshot, credit_score, rule_version)
+    await row.asave(force_insert=True)
+    return row
+
+
+def current_scores():
+    # Scores computed for the day they were recorded; backdated rescore runs describe a past date and are left out
+    return CreditScoreSnapshot.objects.filter(as_of__isnull=True)
+
+
+def latest_score(customer_id):
+    # The customer's most recent persisted score, read from the (customer, -created_at) index
+    return current_scores().filter(customer_id=customer_id).order_by('-created_at').first()
+
+
+async def alatest_score(customer_id):
+    # Async version of latest_score for ASGI views
+    return await current_scores().filter(customer_id=customer_id).order_by('-created_at').afirst()
+
+
+def is_reusable(row, snapshot, rule_version, now=None):
+    """
+    Tell whether a persisted score can stand in for scoring a snapshot again.
+
+    It must be recent, come from the same rules, and have been computed with the
+    customer's current salary and limit from the very CustomerLoanStats row the
+    snapshot was read from. The row's updated_at moves on every loan write, so any
+    loan change since the score was computed makes it unusable; snapshots
+    aggregated from the Loan table are never matched.
+
+    Args:
+    - row: CreditScoreSnapshot or None
+    - snapshot: CustomerCreditSnapshot, Loan aggregates about to be scored
+    - rule_version: str, Version of the rules in use
+    - now: datetime, Current time (defaults to now)
+
+    Returns:
+    - bool
+    """
+    if row is None or row.rule_version != rule_version or snapshot.stats_updated_at is None:
+        return False
+    if row.created_at < (now or timezone.now()) - timedelta(seconds=get_reuse_window()):
+        return False
+
+    customer = snapshot.customer
+    return (
+        row.inputs.get('monthly_salary') == customer.monthly_salary
+        and row.inputs.get('approved_limit') == customer.approved_limit
+        and row.inputs.get('stats_updated_at') == snapshot.stats_updated_at.isoformat()
+    )
+
+
+def reusable_scores(snapshots, rule_versions):
+    """
+    Return the recent persisted scores that can stand in for scoring many snapshots.
+
+    Only rows inside the reuse window are read, with one query on the
+    (customer, -created_at) index.
+
+    Args:
+    - snapshots: dict, CustomerCreditSnapshot objects keyed by customer_id
+    - rule_versions: dict, Version of the rules each customer is scored with, keyed by customer_id
+
+    Returns:
+    - dict: Reusable CreditScoreSnapshot rows keyed by customer_id
+    """
+    candidates = [customer_id for customer_id, snapshot in snapshots.items() if snapshot.stats_updated_at is not None]
+    window = get_reuse_window()
+    if window <= 0 or not candidates:
+        return {}
+
+    now = timezone.now()
+    rows = (
+        current_scores()
+        .filter(customer_id__in=candidates, created_at__gte=now - timedelta(seconds=window))
+        .order_by('customer_id', '-created_at')
+    )
+    latest = {}
+    for row in rows:
+        latest.setdefault(row.customer_id, row)
+    return {customer_id: row for customer_id, row in latest.items() if is_reusable(row, snapshots[customer_id], rule_versions[customer_id], now)}
+
+
+def score_as_of(customer_id, when=None):
+    """
+    Return the customer's score as it was at a point in time.
+
+    Scores of backdated rescore runs are left out: they were recorded later than
+    the date they describe.
+
+    Args:
+    - customer_id: int, Customer to look up
+    - when: datetime, Point in time (defaults to now, i.e. the latest score)
+
+    Returns:
+    - CreditScoreSnapshot or None: The newest row created at or before when
+    """
+    if when is None:
+        return latest_score(customer_id)
+    return current_scores().filter(customer_id=customer_id, created_at__lte=when).order_by('-created_at').first()
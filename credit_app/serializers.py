@@ -1,5 +1,6 @@
 # credit_app/serializers.py
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from .models import Customer, Loan
 
 class CustomerSerializer(serializers.ModelSerializer):
@@ -22,3 +23,83 @@ class LoanSerializer(serializers.ModelSerializer):
     class Meta:
         model = Loan
         fields = ['loan_id', 'customer', 'loan_amount', 'tenure', 'interest_rate', 'monthly_repayment', 'emis_paid_on_time', 'start_date', 'end_date']
+
+
+class PositiveNumberField(serializers.Field):
+    # A JSON number greater than zero, kept as sent; strings and booleans are refused
+    default_error_messages = {'invalid': 'Loan amount, interest rate, and tenure must be greater than zero.'}
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('error_messages', {'required': self.default_error_messages['invalid'],
+                                             'null': self.default_error_messages['invalid']})
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool) or not isinstance(data, (int, float)) or not data > 0:
+            self.fail('invalid')
+        return data
+
+    def to_representation(self, value):
+        return value
+
+
+class LoanApplicationSerializer(serializers.Serializer):
+    """
+    Serializer for one loan eligibility application.
+
+    customer_id must be a whole number (12 or "12", but not 12.9), and the loan
+    amount, interest rate and tenure numbers greater than zero.
+    """
+    customer_id = serializers.IntegerField(error_messages={'invalid': 'A valid customer_id is required.',
+                                                           'required': 'A valid customer_id is required.',
+                                                           'null': 'A valid customer_id is required.'})
+    loan_amount = PositiveNumberField()
+    interest_rate = PositiveNumberField()
+    tenure = PositiveNumberField()
+
+    def error_message(self):
+        # First validation error as a single message, for the {'error': ...} responses of the loan endpoints
+        errors = self.errors
+        if api_settings.NON_FIELD_ERRORS_KEY in errors:
+            return str(errors[api_settings.NON_FIELD_ERRORS_KEY][0])
+        return str(next(iter(errors.values()))[0])
+
+
+class PartialListSerializer(serializers.ListSerializer):
+    """
+    List serializer that validates every row on its own.
+
+    A ListSerializer rejects the whole list when any row is invalid. This one keeps
+    the valid rows: validated_data holds one entry per input row, None for the
+    invalid ones, and row_errors maps the index of each invalid row to its errors.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            message = self.error_messages['not_a_list'].format(input_type=type(data).__name__)
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='not_a_list')
+        if not self.allow_empty and len(data) == 0:
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [self.error_messages['empty']]}, code='empty')
+        if self.max_length is not None and len(data) > self.max_length:
+            message = self.error_messages['max_length'].format(max_length=self.max_length)
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='max_length')
+
+        self.row_errors = {}
+        rows = []
+        for index, item in enumerate(data):
+            try:
+                rows.append(self.run_child_validation(item))
+            except serializers.ValidationError as exc:
+                self.row_errors[index] = exc.detail
+                rows.append(None)
+        return rows
+
+
+class CustomerBatchSerializer(CustomerSerializer):
+    """
+    Serializer for registering many customers at once.
+
+    Used with many=True; invalid rows are reported without failing the batch.
+    """
+    class Meta(CustomerSerializer.Meta):
+        list_serializer_class = PartialListSerializer
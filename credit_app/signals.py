@@ -0,0 +1,79 @@
+# credit_app/signals.py
+from datetime import date
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from . import routers, rules, score_cache
+from .loan_stats import apply_new_loan, refresh_customer_loan_stats
+from .models import Customer, CustomerLoanStats, Loan, ScoringRuleSet
+
+
+@receiver(post_save, sender=Customer)
+def create_customer_loan_stats(sender, instance, created, raw=False, **kwargs):
+    # Start every new customer with an empty stats row so eligibility checks are a primary-key lookup
+    if created and not raw:
+        CustomerLoanStats.objects.get_or_create(customer_id=instance.customer_id, defaults={'as_of': date.today()})
+
+
+@receiver(post_save, sender=Customer)
+def invalidate_score_on_customer_save(sender, instance, created, update_fields=None, **kwargs):
+    # The credit score depends on the approved limit and eligibility on the salary
+    if created or update_fields is None or {'monthly_salary', 'approved_limit'} & set(update_fields):
+        score_cache.invalidate(instance.customer_id)
+
+
+@receiver(post_save, sender=Customer)
+def read_customer_from_primary(sender, instance, raw=False, **kwargs):
+    # Replicas may not have the new or changed customer yet
+    if not raw:
+        routers.mark_written([instance.customer_id])
+
+
+@receiver(post_delete, sender=Customer)
+def invalidate_score_on_customer_delete(sender, instance, **kwargs):
+    score_cache.invalidate(instance.customer_id)
+
+
+@receiver(pre_save, sender=Loan)
+def remember_previous_loan_customer(sender, instance, raw=False, **kwargs):
+    # Remember the stored customer so a loan moved to another customer refreshes both rows
+    instance._previous_customer_id = None
+    if not raw and instance.pk is not None:
+        instance._previous_customer_id = Loan.objects.filter(pk=instance.pk).values_list('customer_id', flat=True).first()
+
+
+@receiver(post_save, sender=Loan)
+def update_loan_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    # Keep CustomerLoanStats in sync within the transaction that writes the loan and drop the cached score
+    if raw:
+        return
+    if created:
+        apply_new_loan(instance)
+        if instance.customer_id is not None:
+            score_cache.invalidate(instance.customer_id)
+        routers.mark_written([instance.customer_id])
+        return
+
+    customer_ids = {instance.customer_id, getattr(instance, '_previous_customer_id', None)}
+    for customer_id in customer_ids:
+        if customer_id is not None:
+            refresh_customer_loan_stats(customer_id)
+            score_cache.invalidate(customer_id)
+    routers.mark_written(customer_ids)
+
+
+@receiver(post_delete, sender=Loan)
+def update_loan_stats_on_delete(sender, instance, origin=None, **kwargs):
+    # Loans deleted together with their customer take the stats row with them
+    origin_model = getattr(origin, 'model', type(origin))
+    if instance.customer_id is not None and origin_model is not Customer:
+        refresh_customer_loan_stats(instance.customer_id)
+        score_cache.invalidate(instance.customer_id)
+        routers.mark_written([instance.customer_id])
+
+
+@receiver(post_save, sender=ScoringRuleSet)
+@receiver(post_delete, sender=ScoringRuleSet)
+def reload_rules_on_change(sender, **kwargs):
+    # Recompile the rule sets once the change is committed and tell the other processes to do the same
+    transaction.on_commit(rules.publish_change)
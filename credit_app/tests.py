@@ -1,8 +1,39 @@
-from django.test import TestCase
+from django.conf import settings
+from django.core.management import call_command
+from django.core.exceptions import ValidationError
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection, connections, transaction
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from unittest import skipUnless
+from unittest.mock import patch
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APIClient
-from .models import Customer,Loan
-from datetime import datetime,timedelta
+from credit_approval_system.database import databases
+from .models import ArchivedLoan,ArchivedLoanSummary,CreditScoreSnapshot,Customer,CustomerLoanStats,IdempotencyRecord,Loan,RescoreRun,ScoringRuleSet
+from . import partitioning, routers, rules, score_cache
+from .archive import archive_closed_loans
+from .amortization import add_months, add_months_array, amortization_schedule, amortization_schedules, remaining_principal
+from .ingest import load_customers, load_loans
+from .locks import customer_locks
+from .metrics import QueryRecorder, registry
+from .loan_stats import find_loan_stats_drift, rebuild_loan_stats, refresh_customer_loan_stats
+from .rescoring import pending_partitions, rescore_partition, start_run
+from .utils import (CustomerCreditSnapshot, calculate_corrected_interest_rate, calculate_credit_score,
+                    calculate_monthly_installment, check_loan_eligibility, create_loan_if_eligible, decide_loan_eligibility)
+from .views import CheckLoanEligibilityBatchView
+from .vectorized import (calculate_corrected_interest_rates, calculate_credit_scores, calculate_monthly_installments,
+                         check_loan_eligibilities)
+from datetime import date,datetime,timedelta
+from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import tempfile
+import threading
+import json
+import numpy as np
 
 
 class RegisterAPITest(TestCase):
@@ -295,4 +326,1973 @@ class ViewLoanDetailsByCustomerIDTest(TestCase):
         url = f'view-loans/customer-id/{loan_id}/'
         response = self.client.get(url, format='json')
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
-        print("Test Case Passed!")
\ No newline at end of file
+        print("Test Case Passed!")
+
+class CreditScoreSnapshotTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        rules.get_rulebook()  # Rule sets are loaded once per process, before any query is counted
+        self.customer = Customer.objects.create(first_name='John',
+                                                last_name='Doe',
+                                                age=30,
+                                                phone_number=1234567890,
+                                                monthly_salary=50000,
+                                                approved_limit=1000000)
+        today = datetime.now().date()
+        # One late loan from last year that ended yesterday, and two current loans from this year, one of them late
+        loans = [(date(today.year - 1, 1, 1), today - timedelta(days=1), 6),
+                 (today, today + timedelta(days=365), 12),
+                 (today, today + timedelta(days=365), 3)]
+        for start_date, end_date, emis_paid_on_time in loans:
+            Loan.objects.create(customer=self.customer,
+                                loan_amount=10000,
+                                interest_rate=10,
+                                monthly_repayment=900,
+                                tenure=12,
+                                emis_paid_on_time=emis_paid_on_time,
+                                start_date=start_date,
+                                end_date=end_date)
+
+    def test_snapshot_aggregates(self):
+        print("\nTest Case: Snapshot aggregates match the loan book")
+        snapshot = CustomerCreditSnapshot.for_customer(self.customer)
+        self.assertEqual(snapshot.total_loans, 3)
+        self.assertEqual(snapshot.late_loans, 2)
+        self.assertEqual(snapshot.current_year_loans, 2)
+        self.assertEqual(snapshot.total_loan_amount, 30000)
+        self.assertEqual(snapshot.total_monthly_repayment, 2700)
+        print("Test Case Passed!")
+
+    def test_credit_score_matches_rules(self):
+        print("\nTest Case: Credit score computed from the snapshot")
+        # 100 - 2 * 2 (late) - 3 * 3 (loans) - 2 * 5 (current year)
+        self.assertEqual(calculate_credit_score(self.customer), 77)
+        # Only the unpaid part of the loans that have not ended counts towards the limit
+        self.customer.approved_limit = 20000
+        self.assertEqual(calculate_credit_score(self.customer), 77)
+        self.customer.approved_limit = 5000
+        self.assertEqual(calculate_credit_score(self.customer), 0)
+        print("Test Case Passed!")
+
+    def test_current_exposure(self):
+        print("\nTest Case: Current exposure is the remaining principal of current loans")
+        # The loan from last year has ended and the fully paid loan owes nothing
+        expected = remaining_principal(10000, 12, 10, 3)
+        snapshot = CustomerCreditSnapshot.for_customer(self.customer)
+        self.assertAlmostEqual(snapshot.current_exposure, expected, places=6)
+        self.assertAlmostEqual(CustomerLoanStats.objects.get(customer=self.customer).current_exposure, expected, places=6)
+
+        CustomerLoanStats.objects.all().delete()
+        customer = Customer.objects.get(customer_id=self.customer.customer_id)
+        self.assertAlmostEqual(CustomerCreditSnapshot.for_customer(customer).current_exposure, expected, places=6)
+
+        # Matches the amortization schedule balance after the paid installments
+        rows = list(amortization_schedule(10000, 12, 10, datetime.now().date()))
+        self.assertAlmostEqual(expected, rows[2]['balance'], delta=0.05)
+        self.assertEqual(remaining_principal(1200, 12, 0, 3), 900)
+        print("Test Case Passed!")
+
+    def test_stale_stats_row_is_refreshed(self):
+        print("\nTest Case: A stats row from an earlier day is refreshed on first use")
+        CustomerLoanStats.objects.filter(customer=self.customer).update(as_of=datetime(2000, 1, 1).date(), current_exposure=0)
+        customer = Customer.objects.select_related('loan_stats').get(customer_id=self.customer.customer_id)
+        # The loan aggregate, the archived loan summary and the write-back of the row
+        with self.assertNumQueries(3):
+            snapshot = CustomerCreditSnapshot.for_customer(customer)
+        stats = CustomerLoanStats.objects.get(customer=self.customer)
+        self.assertEqual(stats.as_of, datetime.now().date())
+        self.assertAlmostEqual(stats.current_exposure, snapshot.current_exposure, places=6)
+        self.assertEqual(find_loan_stats_drift(), [])
+        print("Test Case Passed!")
+
+    def test_current_year_boundaries(self):
+        print("\nTest Case: Current-year rule uses an inclusive/exclusive date range")
+        year = datetime.now().year
+        for start_date in [datetime(year, 1, 1).date(), datetime(year, 12, 31).date(), datetime(year + 1, 1, 1).date()]:
+            Loan.objects.create(customer=self.customer,
+                                loan_amount=10000,
+                                interest_rate=10,
+                                monthly_repayment=900,
+                                tenure=12,
+                                emis_paid_on_time=12,
+                                start_date=start_date,
+                                end_date=start_date + timedelta(days=365))
+        CustomerLoanStats.objects.all().delete()
+        customer = Customer.objects.get(customer_id=self.customer.customer_id)
+        with CaptureQueriesContext(connection) as queries:
+            snapshot = CustomerCreditSnapshot.for_customer(customer, date(year, 6, 1))
+        self.assertEqual(snapshot.current_year_loans, 4)
+        self.assertNotIn('extract', queries[-1]['sql'].lower())
+        print("Test Case Passed!")
+
+    def test_snapshot_for_customer_without_loans(self):
+        print("\nTest Case: Snapshot for a customer without loans")
+        customer = Customer.objects.create(first_name='Jane',
+                                           last_name='Doe',
+                                           age=30,
+                                           phone_number=1234567890,
+                                           monthly_salary=50000)
+        snapshot = CustomerCreditSnapshot.for_customer(customer)
+        self.assertEqual(snapshot.total_loans, 0)
+        self.assertEqual(snapshot.total_loan_amount, 0)
+        self.assertEqual(calculate_credit_score(customer, snapshot), 100)
+        print("Test Case Passed!")
+
+    def test_eligibility_runs_single_loan_query(self):
+        print("\nTest Case: Eligibility check runs a single loan query")
+        # The stats row, then the latest persisted score and the new score appended to the history
+        with self.assertNumQueries(3):
+            result = check_loan_eligibility(self.customer, 10000, 10, 12)
+        self.assertTrue(result['approval'])
+        print("Test Case Passed!")
+
+    def test_snapshot_falls_back_to_aggregate_query(self):
+        print("\nTest Case: Snapshot without a stats row uses the aggregate query")
+        CustomerLoanStats.objects.all().delete()
+        customer = Customer.objects.get(customer_id=self.customer.customer_id)
+        # One query for the missing stats row, one for the loan aggregates and one for the archived loan summary
+        with self.assertNumQueries(3):
+            snapshot = CustomerCreditSnapshot.for_customer(customer)
+        self.assertEqual(snapshot.total_loans, 3)
+        self.assertEqual(snapshot.late_loans, 2)
+        print("Test Case Passed!")
+
+    def test_batch_snapshots_without_stats_rows(self):
+        print("\nTest Case: Batch snapshots without stats rows use a grouped query")
+        CustomerLoanStats.objects.all().delete()
+        customers = Customer.objects.select_related('loan_stats').in_bulk([self.customer.customer_id])
+        # The grouped loan aggregate and the archived loan summaries of the chunk
+        with self.assertNumQueries(2):
+            snapshots = CustomerCreditSnapshot.for_customers(customers.values())
+        self.assertEqual(snapshots[self.customer.customer_id].current_year_loans, 2)
+        print("Test Case Passed!")
+
+    def test_check_eligibility_view_query_count(self):
+        print("\nTest Case: Check eligibility endpoint query count")
+        data = {
+            "customer_id": self.customer.customer_id,
+            "loan_amount": 10000,
+            "interest_rate": 10,
+            "tenure": 12
+        }
+        # The customer and its materialized loan aggregates are loaded in one query,
+        # then the latest persisted score is read and the new score appended
+        with self.assertNumQueries(3):
+            response = self.client.post('/check-eligibility/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        print("Test Case Passed!")
+
+
+class CheckLoanEligibilityBatchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        rules.get_rulebook()  # Rule sets are loaded once per process, before any query is counted
+        self.customers = []
+        for index in range(3):
+            customer = Customer.objects.create(first_name='John',
+                                               last_name=f'Doe {index}',
+                                               age=30,
+                                               phone_number=1234567890,
+                                               monthly_salary=50000 * (index + 1),
+                                               approved_limit=1000000)
+            for _ in range(index * 4):
+                Loan.objects.create(customer=customer,
+                                    loan_amount=10000,
+                                    interest_rate=10,
+                                    monthly_repayment=900,
+                                    tenure=12,
+                                    emis_paid_on_time=6,
+                                    start_date=datetime.now().date(),
+                                    end_date=datetime.now().date() + timedelta(days=365))
+            self.customers.append(customer)
+
+    def test_batch_matches_single_endpoint(self):
+        print("\nTest Case: Batch decisions match the single-application endpoint")
+        applications = [
+            {"customer_id": customer.customer_id, "loan_amount": 20000, "interest_rate": 8, "tenure": 24}
+            for customer in self.customers
+        ]
+        response = self.client.post('/check-eligibility/batch/', applications, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for application, result in zip(applications, response.json()):
+            single = self.client.post('/check-eligibility/', application, format='json')
+            self.assertEqual(result, {'customer_id': application['customer_id'], **single.json()})
+        print("Test Case Passed!")
+
+    def test_batch_reports_bad_rows_in_order(self):
+        print("\nTest Case: Batch reports an error entry for each bad row")
+        applications = [
+            {"customer_id": self.customers[0].customer_id, "loan_amount": 20000, "interest_rate": 8, "tenure": 24},
+            {"customer_id": -1, "loan_amount": 20000, "interest_rate": 8, "tenure": 24},
+            {"customer_id": self.customers[1].customer_id, "loan_amount": -5, "interest_rate": 8, "tenure": 24},
+            "not an application",
+        ]
+        response = self.client.post('/check-eligibility/batch/', applications, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()
+        self.assertEqual(len(results), 4)
+        self.assertIn('approval', results[0])
+        self.assertEqual(results[1]['customer_id'], -1)
+        self.assertIn('error', results[1])
+        self.assertIn('error', results[2])
+        self.assertIsNone(results[3]['customer_id'])
+        self.assertIn('error', results[3])
+        print("Test Case Passed!")
+
+    def test_batch_query_count_is_constant(self):
+        print("\nTest Case: Batch scoring uses set-based queries")
+        applications = [
+            {"customer_id": customer.customer_id, "loan_amount": 20000, "interest_rate": 8, "tenure": 24}
+            for customer in self.customers
+        ] * 50
+        # The customers and their materialized loan aggregates are loaded in one query,
+        # the recent persisted scores in one and the new scores are appended in one insert
+        with self.assertNumQueries(3):
+            response = self.client.post('/check-eligibility/batch/', applications, format='json')
+        self.assertEqual(len(response.json()), 150)
+        print("Test Case Passed!")
+
+    def test_batch_requires_list(self):
+        print("\nTest Case: Batch endpoint requires a list")
+        response = self.client.post('/check-eligibility/batch/', {"customer_id": 1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        print("Test Case Passed!")
+
+    def test_batch_size_and_customer_ids_are_validated(self):
+        print("\nTest Case: Batch endpoint caps the batch size and validates customer ids like the single endpoint")
+        customer_id = self.customers[0].customer_id
+        application = {"loan_amount": 20000, "interest_rate": 8, "tenure": 24}
+        with patch.object(CheckLoanEligibilityBatchView, 'max_batch_size', 2):
+            response = self.client.post('/check-eligibility/batch/', [{"customer_id": customer_id, **application}] * 3, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        ids = [str(customer_id), customer_id + 0.9, True, None]
+        response = self.client.post('/check-eligibility/batch/', [{"customer_id": value, **application} for value in ids], format='json')
+        results = response.json()
+        self.assertEqual(results[0]['customer_id'], customer_id)
+        self.assertIn('approval', results[0])
+        for result in results[1:]:
+            self.assertEqual(result['error'], 'A valid customer_id is required.')
+
+        single = self.client.post('/check-eligibility/', {"customer_id": customer_id + 0.9, **application}, format='json')
+        self.assertEqual(single.json(), {'error': 'A valid customer_id is required.'})
+        print("Test Case Passed!")
+
+
+class VectorizedScoringTest(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        size = 5000
+        self.credit_scores = rng.integers(0, 101, size)
+        self.loan_amounts = rng.integers(1000, 5000000, size).astype(float)
+        self.tenures = rng.integers(1, 240, size)
+        self.interest_rates = rng.choice([0.0, 1.0, 8.5, 12.0, 14.0, 16.0, 18.0], size)
+        self.total_current_emis = rng.integers(0, 50000, size).astype(float)
+        self.monthly_salaries = rng.integers(10000, 200000, size).astype(float)
+
+    def test_monthly_installment_parity(self):
+        print("\nTest Case: Vectorized monthly installments match the scalar function")
+        vectorized = calculate_monthly_installments(self.loan_amounts, self.tenures, self.interest_rates)
+        scalar = [calculate_monthly_installment(amount, tenure, rate)
+                  for amount, tenure, rate in zip(self.loan_amounts.tolist(), self.tenures.tolist(), self.interest_rates.tolist())]
+        np.testing.assert_allclose(vectorized, scalar, rtol=0, atol=0.01)
+        print("Test Case Passed!")
+
+    def test_corrected_interest_rate_parity(self):
+        print("\nTest Case: Vectorized corrected interest rates match the scalar function")
+        vectorized = calculate_corrected_interest_rates(self.credit_scores, self.interest_rates)
+        for score, rate, corrected in zip(self.credit_scores.tolist(), self.interest_rates.tolist(), vectorized.tolist()):
+            expected = calculate_corrected_interest_rate(score, rate)
+            if expected is None:
+                self.assertTrue(np.isnan(corrected))
+            else:
+                self.assertEqual(corrected, expected)
+        print("Test Case Passed!")
+
+    def test_edge_cases(self):
+        print("\nTest Case: Zero interest rate, zero tenure and missing corrected rate")
+        self.assertEqual(calculate_monthly_installment(1200, 12, 0), 100)
+        self.assertIsNone(calculate_monthly_installment(1200, 12, None))
+        installments = calculate_monthly_installments([1200, 1200], [12, 12], [0, np.nan])
+        self.assertEqual(installments[0], 100)
+        self.assertTrue(np.isnan(installments[1]))
+
+        # A zero tenure offers no installment, and no loan is approved, without a division warning
+        with np.errstate(all='raise'):
+            installments = calculate_monthly_installments([1200, 1200, 1200], [0, 0, 12], [0, 12, 12])
+        self.assertTrue(np.isnan(installments[:2]).all())
+        self.assertEqual(installments[2], 106.62)
+        result = check_loan_eligibilities([90, 90], [1200, 1200], [12, 12], [0, 12], [0, 0], [50000, 50000])
+        self.assertEqual(result['approval'].tolist(), [False, True])
+        print("Test Case Passed!")
+
+    def test_eligibility_parity(self):
+        print("\nTest Case: Vectorized approvals match the scalar eligibility rules")
+        result = check_loan_eligibilities(self.credit_scores, self.loan_amounts, self.interest_rates, self.tenures,
+                                          self.total_current_emis, self.monthly_salaries)
+        for index, score in enumerate(self.credit_scores.tolist()):
+            corrected = calculate_corrected_interest_rate(score, self.interest_rates[index])
+            installment = calculate_monthly_installment(self.loan_amounts[index], self.tenures[index], corrected)
+            expected = score > 0 and (
+                (score > 50) or
+                (50 >= score > 30 and corrected > 12) or
+                (30 >= score > 10 and corrected > 16)
+            )
+            expected = expected and (self.total_current_emis[index] + installment <= 0.5 * self.monthly_salaries[index])
+            self.assertEqual(bool(result['approval'][index]), bool(expected))
+        print("Test Case Passed!")
+
+    def test_credit_score_parity(self):
+        print("\nTest Case: Vectorized credit scores match the scalar rules")
+        scores = calculate_credit_scores([0, 2, 10, 1], [1, 5, 20, 1], [0, 1, 5, 0], [100, 100, 100, 500], [1000, 1000, 1000, 400])
+        self.assertEqual(scores.tolist(), [97, 76, 0, 0])
+        print("Test Case Passed!")
+
+
+
+class CustomerLoanStatsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(first_name='John',
+                                                last_name='Doe',
+                                                age=30,
+                                                phone_number=1234567890,
+                                                monthly_salary=50000,
+                                                approved_limit=1000000)
+
+    def create_loan(self, customer, emis_paid_on_time=12):
+        return Loan.objects.create(customer=customer,
+                                   loan_amount=10000,
+                                   interest_rate=10,
+                                   monthly_repayment=900,
+                                   tenure=12,
+                                   emis_paid_on_time=emis_paid_on_time,
+                                   start_date=datetime.now().date(),
+                                   end_date=datetime.now().date() + timedelta(days=365))
+
+    def test_stats_created_with_customer(self):
+        print("\nTest Case: Stats row is created with the customer")
+        stats = CustomerLoanStats.objects.get(customer=self.customer)
+        self.assertEqual(stats.total_loans, 0)
+        print("Test Case Passed!")
+
+    def test_stats_follow_loan_writes(self):
+        print("\nTest Case: Stats follow loan inserts, updates and deletes")
+        loan = self.create_loan(self.customer, emis_paid_on_time=3)
+        self.create_loan(self.customer)
+        stats = CustomerLoanStats.objects.get(customer=self.customer)
+        self.assertEqual((stats.total_loans, stats.late_loans, stats.current_year_loans), (2, 1, 2))
+        self.assertEqual(stats.total_monthly_repayment, 1800)
+
+        loan.emis_paid_on_time = 12
+        loan.save()
+        stats.refresh_from_db()
+        self.assertEqual(stats.late_loans, 0)
+
+        other = Customer.objects.create(first_name='Jane', last_name='Doe', age=30, phone_number=1234567890, monthly_salary=50000)
+        loan.customer = other
+        loan.save()
+        self.assertEqual(CustomerLoanStats.objects.get(customer=self.customer).total_loans, 1)
+        self.assertEqual(CustomerLoanStats.objects.get(customer=other).total_loans, 1)
+
+        loan.delete()
+        self.assertEqual(CustomerLoanStats.objects.get(customer=other).total_loans, 0)
+        self.assertEqual(find_loan_stats_drift(), [])
+        print("Test Case Passed!")
+
+    def test_create_loan_view_updates_stats(self):
+        print("\nTest Case: Create loan endpoint updates the stats row")
+        data = {'customer_id': self.customer.customer_id, 'loan_amount': 100.0, 'interest_rate': 10.0, 'tenure': 12}
+        response = self.client.post('/create-loan/', data, format='json')
+        self.assertTrue(response.json()['loan_approved'])
+        stats = CustomerLoanStats.objects.get(customer=self.customer)
+        self.assertEqual(stats.total_loans, 1)
+        self.assertEqual(stats.total_monthly_repayment, response.json()['monthly_installment'])
+        print("Test Case Passed!")
+
+    def test_rebuild_and_drift_check(self):
+        print("\nTest Case: Rebuild and drift check commands")
+        self.create_loan(self.customer)
+        CustomerLoanStats.objects.filter(customer=self.customer).update(total_loans=5)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_loan_stats', '--check', stdout=StringIO())
+        self.assertEqual(rebuild_loan_stats(), 1)
+        call_command('rebuild_loan_stats', '--check', stdout=StringIO())
+        self.assertEqual(CustomerLoanStats.objects.get(customer=self.customer).total_loans, 1)
+        print("Test Case Passed!")
+
+    def test_drift_check_compares_rows_at_their_own_day(self):
+        print("\nTest Case: Drift check compares rows from earlier days with aggregates for that day")
+        yesterday = date.today() - timedelta(days=1)
+        loan = self.create_loan(self.customer, emis_paid_on_time=3)
+        Loan.objects.filter(loan_id=loan.loan_id).update(end_date=yesterday)  # bypasses the signals
+        refresh_customer_loan_stats(self.customer.customer_id, yesterday)
+        self.assertGreater(CustomerLoanStats.objects.get(customer=self.customer).current_exposure, 0)
+        self.assertEqual(find_loan_stats_drift(), [])
+
+        CustomerLoanStats.objects.filter(customer=self.customer).update(total_loans=5)
+        self.assertEqual(find_loan_stats_drift(), [(self.customer.customer_id, 'total_loans', 5, 1)])
+        print("Test Case Passed!")
+
+    def test_stale_stats_are_not_used(self):
+        print("\nTest Case: Stats from a previous year are not used")
+        self.create_loan(self.customer)
+        CustomerLoanStats.objects.filter(customer=self.customer).update(as_of=datetime(2000, 1, 1).date(), current_year_loans=0)
+        customer = Customer.objects.select_related('loan_stats').get(customer_id=self.customer.customer_id)
+        self.assertEqual(CustomerCreditSnapshot.for_customer(customer).current_year_loans, 1)
+        print("Test Case Passed!")
+
+
+# The test settings use local memory, which a single test process may share
+@override_settings(CREDIT_SCORE_CACHE_LOCAL=True)
+class CreditScoreCacheTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        rules.get_rulebook()  # Rule sets are loaded once per process, before any query is counted
+        self.customer = Customer.objects.create(first_name='John',
+                                                last_name='Doe',
+                                                age=30,
+                                                phone_number=1234567890,
+                                                monthly_salary=50000,
+                                                approved_limit=1000000)
+        score_cache.counters.reset()
+
+    def check(self):
+        data = {'customer_id': self.customer.customer_id, 'loan_amount': 10000, 'interest_rate': 10, 'tenure': 12}
+        return self.client.post('/check-eligibility/', data, format='json')
+
+    def test_repeat_checks_hit_cache(self):
+        print("\nTest Case: Repeat eligibility checks are served from the cache")
+        self.check()
+        # Only the customer lookup remains on a cache hit
+        with self.assertNumQueries(1):
+            self.check()
+        self.assertEqual(score_cache.counters.as_dict(), {'hits': 1, 'misses': 1, 'invalidations': 0})
+        print("Test Case Passed!")
+
+    def test_create_loan_invalidates_cache(self):
+        print("\nTest Case: Creating a loan invalidates the cached score")
+        self.check()
+        data = {'customer_id': self.customer.customer_id, 'loan_amount': 10000, 'interest_rate': 10, 'tenure': 12}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/create-loan/', data, format='json')
+        self.assertIsNone(score_cache.get_cache().get(score_cache.cache_key(self.customer.customer_id)))
+        self.check()
+        self.assertEqual(score_cache.counters.misses, 2)
+        print("Test Case Passed!")
+
+    def test_salary_change_invalidates_cache(self):
+        print("\nTest Case: Changing the salary or limit invalidates the cached score")
+        self.check()
+        self.customer.monthly_salary = 10
+        self.customer.save(update_fields=['monthly_salary'])
+        self.assertIsNone(score_cache.get_cache().get(score_cache.cache_key(self.customer.customer_id)))
+
+        self.check()
+        self.customer.first_name = 'Johnny'
+        self.customer.save(update_fields=['first_name'])
+        self.assertIsNotNone(score_cache.get_cache().get(score_cache.cache_key(self.customer.customer_id)))
+        print("Test Case Passed!")
+
+    def test_stale_entry_is_not_served(self):
+        print("\nTest Case: Entries computed for another limit are not served")
+        self.check()
+        Customer.objects.filter(customer_id=self.customer.customer_id).update(approved_limit=0)
+        self.check()
+        self.assertEqual(score_cache.counters.misses, 2)
+        print("Test Case Passed!")
+
+    @override_settings(CREDIT_SCORE_CACHE_LOCAL=False)
+    def test_process_local_cache_is_not_used(self):
+        print("\nTest Case: Scores are not cached in a process-local cache unless a single process is declared")
+        self.check()
+        self.check()
+        self.assertIsNone(score_cache.get_cache().get(score_cache.cache_key(self.customer.customer_id)))
+        self.assertEqual(score_cache.counters.hits, 0)
+        print("Test Case Passed!")
+
+
+class InitDataCommandTest(TestCase):
+    def test_load_excel_files(self):
+        print("\nTest Case: initdata streams the bundled Excel files")
+        out = StringIO()
+        call_command('initdata',
+                     customers=str(settings.BASE_DIR / 'customer_data.xlsx'),
+                     loans=str(settings.BASE_DIR / 'loan_data.xlsx'),
+                     chunk_size=100,
+                     stdout=out, stderr=out)
+        self.assertIn('Data initialized successfully', out.getvalue())
+        self.assertEqual(Customer.objects.count(), 300)
+        self.assertEqual(Loan.objects.count(), 782)
+        self.assertEqual(find_loan_stats_drift(), [])
+        print("Test Case Passed!")
+
+    def test_load_csv_in_chunks(self):
+        print("\nTest Case: initdata streams CSV files in chunks and replaces existing data")
+        old = Customer.objects.create(customer_id=1, first_name='Old', last_name='Customer', age=30, phone_number=1, monthly_salary=1)
+        Customer.objects.create(first_name='Gone', last_name='Customer', age=30, phone_number=2, monthly_salary=1)
+        # Configuration and audit rows are not customer data and survive the import
+        ScoringRuleSet.objects.create(version='kept-1', definition={}, weight=0)
+        IdempotencyRecord.objects.create(endpoint='register', key='kept', request_hash='', expires_at=timezone.now())
+        CreditScoreSnapshot.objects.create(customer=old, credit_score=50, inputs={}, rule_version='builtin-1')
+        with tempfile.TemporaryDirectory() as directory:
+            customers = Path(directory) / 'customers.csv'
+            loans = Path(directory) / 'loans.csv'
+            customers.write_text(
+                'Customer ID,First Name,Last Name,Age,Phone Number,Monthly Salary,Approved Limit\n'
+                '1,Aaron,Garcia,63,9629317944,50000,1800000\n'
+                '2,Aaron,Smith,40,9629317945,60000,2200000\n'
+                '3,Abby,Jones,35,9629317946,70000,2500000\n'
+            )
+            loans.write_text(
+                'Customer ID,Loan ID,Loan Amount,Tenure,Interest Rate,Monthly payment,EMIs paid on Time,Date of Approval,End Date\n'
+                '1,10,100000,12,8.2,9000,12,2020-01-01,2021-01-01\n'
+                '3,11,200000,24,9.5,9500,10,2021-03-09 00:00:00,2023-03-09 00:00:00\n'
+            )
+            out = StringIO()
+            call_command('initdata', customers=str(customers), loans=str(loans), chunk_size=2, keep_history=True,
+                         stdout=out, stderr=out)
+
+        self.assertIn('customers: 3 rows', out.getvalue())
+        self.assertEqual(sorted(Customer.objects.values_list('customer_id', flat=True)), [1, 2, 3])
+        self.assertEqual(Loan.objects.get(customer_id=3).start_date, datetime(2021, 3, 9).date())
+        self.assertEqual(CustomerLoanStats.objects.get(customer_id=3).late_loans, 1)
+        self.assertEqual(Customer.objects.get(customer_id=1).first_name, 'Aaron')
+        self.assertTrue(ScoringRuleSet.objects.filter(version='kept-1').exists())
+        self.assertTrue(IdempotencyRecord.objects.filter(key='kept').exists())
+        self.assertEqual(CreditScoreSnapshot.objects.get().customer_id, 1)
+        print("Test Case Passed!")
+
+    def test_score_history_is_cleared_unless_kept(self):
+        print("\nTest Case: initdata clears the score history unless asked to keep it")
+        scored = Customer.objects.create(customer_id=9, first_name='Old', last_name='Customer', age=30, phone_number=1, monthly_salary=1)
+        CreditScoreSnapshot.objects.create(customer=scored, credit_score=50, inputs={}, rule_version='builtin-1')
+        with tempfile.TemporaryDirectory() as directory:
+            customers = Path(directory) / 'customers.csv'
+            loans = Path(directory) / 'loans.csv'
+            customers.write_text('Customer ID,First Name,Last Name,Age,Phone Number,Monthly Salary,Approved Limit\n'
+                                 '1,Aaron,Garcia,63,9629317944,50000,1800000\n')
+            loans.write_text('Customer ID,Loan ID,Loan Amount,Tenure,Interest Rate,Monthly payment,EMIs paid on Time,Date of Approval,End Date\n')
+
+            # Customer 9 is not in the file, so kept history could not point at it
+            with self.assertRaisesMessage(CommandError, 'references customers missing from the import: 9'):
+                call_command('initdata', customers=str(customers), loans=str(loans), keep_history=True, stdout=StringIO())
+            self.assertTrue(Customer.objects.filter(customer_id=9).exists())
+
+            call_command('initdata', customers=str(customers), loans=str(loans), stdout=StringIO())
+        self.assertFalse(CreditScoreSnapshot.objects.exists())
+        self.assertEqual(list(Customer.objects.values_list('customer_id', flat=True)), [1])
+        print("Test Case Passed!")
+
+    def test_unsupported_file_type(self):
+        print("\nTest Case: initdata reports unsupported file types")
+        with self.assertRaisesMessage(CommandError, 'Unsupported file type'):
+            call_command('initdata', customers='customers.txt', stdout=StringIO())
+        print("Test Case Passed!")
+
+
+class FastIngestTest(TestCase):
+    def write_files(self, directory, customer_rows):
+        customers = Path(directory) / 'customers.csv'
+        loans = Path(directory) / 'loans.csv'
+        customers.write_text('Customer ID,First Name,Last Name,Age,Phone Number,Monthly Salary,Approved Limit\n' + customer_rows)
+        loans.write_text(
+            'Customer ID,Loan ID,Loan Amount,Tenure,Interest Rate,Monthly payment,EMIs paid on Time,Date of Approval,End Date\n'
+            '7,1,100000,12,8.2,9000,12,2020-01-01,2021-01-01\n'
+        )
+        return str(customers), str(loans)
+
+    def test_fast_mode_keeps_ids_and_resets_sequences(self):
+        print("\nTest Case: Fast ingest keeps file ids and new rows get fresh ids")
+        with tempfile.TemporaryDirectory() as directory:
+            customers, loans = self.write_files(directory, '5,Ann,Lee,30,1,50000,1800000\n7,"Tab\tName",Lee,31,2,60000,\n')
+            out = StringIO()
+            call_command('initdata', customers=customers, loans=loans, fast=True, stdout=out, stderr=out)
+
+        self.assertIn('Data initialized successfully', out.getvalue())
+        self.assertEqual(sorted(Customer.objects.values_list('customer_id', flat=True)), [5, 7])
+        self.assertEqual(Customer.objects.get(customer_id=7).first_name, 'Tab\tName')
+        # A missing approved limit gets the same default as Customer.save
+        self.assertEqual(Customer.objects.get(customer_id=7).approved_limit, 2200000)
+        self.assertEqual(Loan.objects.get().customer_id, 7)
+
+        customer = Customer.objects.create(first_name='New', last_name='Customer', age=30, phone_number=3, monthly_salary=1000)
+        self.assertGreater(customer.customer_id, 7)
+        print("Test Case Passed!")
+
+    def test_invalid_rows_are_rejected(self):
+        print("\nTest Case: Rows failing field validation abort the import")
+        with tempfile.TemporaryDirectory() as directory:
+            customers, loans = self.write_files(directory, '5,Ann,Lee,30,1,-50000,1800000\n')
+            with self.assertRaisesMessage(CommandError, 'customers.csv row 2: monthly_salary'):
+                call_command('initdata', customers=customers, loans=loans, fast=True, stdout=StringIO())
+
+        self.assertEqual(Customer.objects.count(), 0)
+        print("Test Case Passed!")
+
+    @skipUnless(connection.vendor == 'postgresql', 'COPY FROM STDIN requires PostgreSQL')
+    def test_copy_rows_on_postgresql(self):
+        print("\nTest Case: COPY FROM STDIN ingest on PostgreSQL")
+        with tempfile.TemporaryDirectory() as directory:
+            customers, loans = self.write_files(directory, '7,"Back\\slash",Lee,31,2,60000,1800000\n')
+            progress = load_customers(customers, fast=True)
+            load_loans(loans, fast=True)
+        self.assertEqual(progress.rows, 1)
+        self.assertEqual(Customer.objects.get(customer_id=7).first_name, 'Back\\slash')
+        self.assertEqual(Loan.objects.get().customer_id, 7)
+        print("Test Case Passed!")
+
+
+class ViewLoansByCustomerPaginationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(first_name='John',
+                                                last_name='Doe',
+                                                age=30,
+                                                phone_number=1234567890,
+                                                monthly_salary=50000,
+                                                approved_limit=1000000)
+        self.loans = [
+            Loan.objects.create(customer=self.customer,
+                                loan_amount=1000 * (index + 1),
+                                interest_rate=10,
+                                monthly_repayment=100,
+                                tenure=12,
+                                emis_paid_on_time=index,
+                                start_date=datetime.now().date(),
+                                end_date=datetime.now().date() + timedelta(days=365))
+            for index in range(5)
+        ]
+        self.url = f'/view-loans/customer-id/{self.customer.customer_id}/'
+
+    def test_unpaginated_response(self):
+        print("\nTest Case: Loans by customer without pagination")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([loan['loan_id'] for loan in response.json()], [loan.loan_id for loan in self.loans])
+        self.assertEqual(response.json()[3]['repayments_left'], 9)
+        self.assertNotIn('X-Next-Cursor', response)
+        print("Test Case Passed!")
+
+    def test_keyset_pages(self):
+        print("\nTest Case: Loans by customer with keyset pagination")
+        seen = []
+        cursor = None
+        while True:
+            params = {'page_size': 2}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(loan['loan_id'] for loan in response.json())
+            cursor = response.get('X-Next-Cursor')
+            if cursor is None:
+                break
+        self.assertEqual(seen, [loan.loan_id for loan in self.loans])
+        print("Test Case Passed!")
+
+    def test_cursor_past_last_loan(self):
+        print("\nTest Case: Cursor past the last loan returns an empty page")
+        response = self.client.get(self.url, {'cursor': self.loans[-1].loan_id, 'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [])
+        print("Test Case Passed!")
+
+    def test_invalid_page_size(self):
+        print("\nTest Case: Invalid page size")
+        response = self.client.get(self.url, {'page_size': 'ten'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        print("Test Case Passed!")
+
+    def test_streaming_matches_regular_response(self):
+        print("\nTest Case: Streaming mode yields the same loans")
+        regular = self.client.get(self.url).json()
+        response = self.client.get(self.url, {'stream': 'true'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), regular)
+
+        response = self.client.get(self.url, {'stream': 'true', 'cursor': self.loans[1].loan_id, 'page_size': 2})
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), regular[2:4])
+        print("Test Case Passed!")
+
+    def test_streaming_unknown_customer(self):
+        print("\nTest Case: Streaming mode for a customer without loans")
+        response = self.client.get('/view-loans/customer-id/999999/', {'stream': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        print("Test Case Passed!")
+
+
+class ReadFastPathTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(first_name='John',
+                                                last_name='Doe',
+                                                age=30,
+                                                phone_number=1234567890,
+                                                monthly_salary=50000,
+                                                approved_limit=1000000)
+        self.loan = Loan.objects.create(customer=self.customer,
+                                        loan_amount=5000,
+                                        interest_rate=10.5,
+                                        monthly_repayment=500,
+                                        tenure=12,
+                                        emis_paid_on_time=4,
+                                        start_date=datetime.now().date(),
+                                        end_date=datetime.now().date() + timedelta(days=365))
+
+    def test_loan_details_shape_and_query_count(self):
+        print("\nTest Case: Loan details come from a single joined query")
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/view-loan/loan-id/{self.loan.loan_id}/')
+        self.assertEqual(response.json(), {
+            'loan_id': self.loan.loan_id,
+            'customer': {
+                'customer_id': self.customer.customer_id,
+                'first_name': 'John',
+                'last_name': 'Doe',
+                'phone_number': 1234567890,
+                'age': 30,
+            },
+            'loan_amount': 5000.0,
+            'interest_rate': 10.5,
+            'monthly_repayment': 500.0,
+            'tenure': 12,
+        })
+        print("Test Case Passed!")
+
+    def test_loans_by_customer_shape_and_query_count(self):
+        print("\nTest Case: Loans by customer come from a single projected query")
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/view-loans/customer-id/{self.customer.customer_id}/')
+        self.assertEqual(response.json(), [{
+            'loan_id': self.loan.loan_id,
+            'loan_amount': 5000.0,
+            'interest_rate': 10.5,
+            'monthly_installment': 500.0,
+            'repayments_left': 8,
+        }])
+        print("Test Case Passed!")
+
+
+class AsyncViewsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.async_client = AsyncClient()
+        self.customer = Customer.objects.create(first_name='John',
+                                                last_name='Doe',
+                                                age=30,
+                                                phone_number=1234567890,
+                                                monthly_salary=50000,
+                                                approved_limit=1000000)
+        self.loan = Loan.objects.create(customer=self.customer,
+                                        loan_amount=5000,
+                                        interest_rate=10.5,
+                                        monthly_repayment=500,
+                                        tenure=12,
+                                        emis_paid_on_time=4,
+                                        start_date=datetime.now().date(),
+                                        end_date=datetime.now().date() + timedelta(days=365))
+        self.application = {'customer_id': self.customer.customer_id, 'loan_amount': 10000, 'interest_rate': 10, 'tenure': 12}
+
+    async def test_check_eligibility_matches_sync_view(self):
+        print("\nTest Case: Async eligibility check matches the sync endpoint")
+        response = await self.async_client.post('/async/check-eligibility/', self.application, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        expected = await sync_to_async(self.client.post)('/check-eligibility/', self.application, format='json')
+        self.assertEqual(response.json(), expected.json())
+        print("Test Case Passed!")
+
+    async def test_check_eligibility_errors(self):
+        print("\nTest Case: Async eligibility check errors")
+        response = await self.async_client.post('/async/check-eligibility/', {**self.application, 'tenure': -1}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = await self.async_client.post('/async/check-eligibility/', {**self.application, 'customer_id': -1}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        print("Test Case Passed!")
+
+    async def test_read_endpoints_match_sync_views(self):
+        print("\nTest Case: Async read endpoints match the sync endpoints")
+        for url in [f'/view-loan/loan-id/{self.loan.loan_id}/', f'/view-loans/customer-id/{self.customer.customer_id}/']:
+            response = await self.async_client.get('/async' + url)
+            expected = await sync_to_async(self.client.get)(url)
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertEqual(response.json(), expected.json())
+
+        response = await self.async_client.get(f'/async/view-loans/customer-id/{self.customer.customer_id}/', {'stream': 'true'})
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(json.loads(body)), 1)
+
+        response = await self.async_client.get('/async/view-loan/loan-id/999999/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        print("Test Case Passed!")
+
+
+class AsyncCreateLoanTest(TransactionTestCase):
+    # The create path runs on its own thread and database connection, so the rows must be committed
+    def setUp(self):
+        self.async_client = AsyncClient()
+        self.customer = Customer.objects.create(first_name='John',
+                                                last_name='Doe',
+                                                age=30,
+                                                phone_number=1234567890,
+                                                monthly_salary=50000,
+                                                approved_limit=1000000)
+        Loan.objects.create(customer=self.customer,
+                            loan_amount=5000,
+                            interest_rate=10.5,
+                            monthly_repayment=500,
+                            tenure=12,
+                            emis_paid_on_time=4,
+                            start_date=datetime.now().date(),
+                            end_date=datetime.now().date() + timedelta(days=365))
+        self.application = {'customer_id': self.customer.customer_id, 'loan_amount': 10000, 'interest_rate': 10, 'tenure': 12}
+
+    async def test_create_loan(self):
+        print("\nTest Case: Async create loan")
+        response = await self.async_client.post('/async/create-loan/', self.application, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()['loan_approved'])
+        self.assertEqual(await Loan.objects.filter(customer_id=self.customer.customer_id).acount(), 2)
+        stats = await CustomerLoanStats.objects.aget(customer_id=self.customer.customer_id)
+        self.assertEqual(stats.total_loans, 2)
+        print("Test Case Passed!")
+
+    async def test_create_loan_leaves_the_sync_thread_free(self):
+        print("\nTest Case: Async create loan does not run on the shared sync thread")
+        threads = []
+
+        def create(*args):
+            threads.append(threading.get_ident())
+            return create_loan_if_eligible(*args)
+
+        with patch('credit_app.async_views.create_loan_if_eligible', side_effect=create):
+            response = await self.async_client.post('/async/create-loan/', self.application, content_type='application/json')
+        self.assertTrue(response.json()['loan_approved'])
+        self.assertNotEqual(threads, [await sync_to_async(threading.get_ident)()])
+        print("Test Case Passed!")
+
+    async def test_async_create_loan_replays_first_response(self):
+        print("\nTest Case: Async create loan replays the stored response for a repeated key")
+        client = AsyncClient()
+        first = await client.post('/async/create-loan/', self.application, content_type='application/json',
+                                  headers={'Idempotency-Key': 'loan-1'})
+        self.assertTrue(first.json()['loan_approved'])
+        replay = await client.post('/async/create-loan/', self.application, content_type='application/json',
+                                   headers={'Idempotency-Key': 'loan-1'})
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+
+        # Keys are shared with the sync endpoint
+        response = await sync_to_async(APIClient().post)('/create-loan/', self.application, format='json', HTTP_IDEMPOTENCY_KEY='loan-1')
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(await Loan.objects.filter(customer=self.customer).acount(), 2)
+        print("Test Case Passed!")
+
+
+class ConcurrentCreateLoanTest(TransactionTestCase):
+    def setUp(self):
+        # An EMI cap of 15000 leaves room for exactly one of the loans requested below
+        self.customer = Customer.objects.create(first_name='John',
+                                                last_name='Doe',
+                                                age=30,
+                                                phone_number=1234567890,
+                                                monthly_salary=30000)
+        self.other = Customer.objects.create(first_name='Jane',
+                                             last_name='Roe',
+                                             age=35,
+                                             phone_number=1234567891,
+                                             monthly_salary=30000)
+
+    def post_in_parallel(self, applications):
+        barrier = threading.Barrier(len(applications))
+
+        def create(application):
+            try:
+                barrier.wait()
+                return APIClient().post('/create-loan/', application, format='json')
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(applications)) as executor:
+            return list(executor.map(create, applications))
+
+    def test_parallel_requests_do_not_over_commit(self):
+        print("\nTest Case: Parallel create-loan requests respect the EMI limit")
+        application = {'customer_id': self.customer.customer_id, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 12}
+        responses = self.post_in_parallel([application] * 8)
+
+        self.assertTrue(all(response.status_code == status.HTTP_200_OK for response in responses))
+        self.assertEqual(sum(response.data['loan_approved'] for response in responses), 1)
+
+        loans = Loan.objects.filter(customer=self.customer)
+        self.assertEqual(loans.count(), 1)
+        self.assertLessEqual(sum(loan.monthly_repayment for loan in loans), 0.5 * self.customer.monthly_salary)
+        self.assertEqual(CustomerLoanStats.objects.get(customer=self.customer).total_loans, 1)
+        print("Test Case Passed!")
+
+    def test_keyed_lock_only_blocks_the_same_key(self):
+        print("\nTest Case: Customer locks are independent per customer")
+        with customer_locks.hold(self.customer.customer_id):
+            # A second thread locks another customer right away but cannot take the held one
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                def lock_other():
+                    with customer_locks.hold(self.other.customer_id):
+                        return True
+                self.assertTrue(executor.submit(lock_other).result(timeout=5))
+
+                same = executor.submit(lambda: customer_locks._locks[self.customer.customer_id][0].acquire(timeout=0.1))
+                self.assertFalse(same.result(timeout=5))
+        self.assertEqual(customer_locks._locks, {})
+        print("Test Case Passed!")
+
+    @skipUnless(connection.vendor == 'postgresql', 'SQLite allows only one writer at a time')
+    def test_unrelated_customers_are_not_serialized(self):
+        print("\nTest Case: Parallel create-loan requests for different customers")
+        applications = [
+            {'customer_id': customer.customer_id, 'loan_amount': 100000, 'interest_rate': 12, 'tenure': 12}
+            for customer in (self.customer, self.other)
+        ]
+        responses = self.post_in_parallel(applications)
+
+        self.assertTrue(all(response.data['loan_approved'] for response in responses))
+        self.assertEqual(Loan.objects.count(), 2)
+        self.assertEqual(customer_locks._locks, {})
+        print("Test Case Passed!")
+
+
+class IdempotencyKeyTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(first_name='John',
+                                                last_name='Doe',
+                                                age=30,
+                                                phone_number=1234567890,
+                                                monthly_salary=50000)
+        self.application = {'customer_id': self.customer.customer_id, 'loan_amount': 10000, 'interest_rate': 10, 'tenure': 12}
+
+    def test_create_loan_replays_first_response(self):
+        print("\nTest Case: Create loan replays the stored response for a repeated key")
+        first = self.client.post('/create-loan/', self.application, format='json', HTTP_IDEMPOTENCY_KEY='loan-1')
+        self.assertTrue(first.data['loan_approved'])
+
+        with patch('credit_app.views.create_loan_if_eligible') as create:
+            replay = self.client.post('/create-loan/', self.application, format='json', HTTP_IDEMPOTENCY_KEY='loan-1')
+        create.assert_not_called()
+
+        self.assertEqual(replay.status_code, status.HTTP_200_OK)
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(Loan.objects.filter(customer=self.customer).count(), 1)
+
+        # A new key is a new request
+        self.client.post('/create-loan/', self.application, format='json', HTTP_IDEMPOTENCY_KEY='loan-2')
+        self.assertEqual(Loan.objects.filter(customer=self.customer).count(), 2)
+        print("Test Case Passed!")
+
+    def test_key_reused_with_different_body(self):
+        print("\nTest Case: Idempotency key reused for a different request")
+        self.client.post('/create-loan/', self.application, format='json', HTTP_IDEMPOTENCY_KEY='loan-1')
+        response = self.client.post('/create-loan/', {**self.application, 'loan_amount': 20000}, format='json', HTTP_IDEMPOTENCY_KEY='loan-1')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Loan.objects.filter(customer=self.customer).count(), 1)
+        print("Test Case Passed!")
+
+    def test_register_replays_first_response(self):
+        print("\nTest Case: Register replays the stored response for a repeated key")
+        data = {'first_name': 'Jane', 'last_name': 'Roe', 'age': 28, 'monthly_salary': 40000, 'phone_number': 9876543210}
+        first = self.client.post('/register/', data, format='json', HTTP_IDEMPOTENCY_KEY='register-1')
+        replay = self.client.post('/register/', data, format='json', HTTP_IDEMPOTENCY_KEY='register-1')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(Customer.objects.filter(first_name='Jane').count(), 1)
+
+        # Keys are scoped per endpoint
+        response = self.client.post('/create-loan/', self.application, format='json', HTTP_IDEMPOTENCY_KEY='register-1')
+        self.assertTrue(response.data['loan_approved'])
+        print("Test Case Passed!")
+
+    def test_unexpected_error_is_not_stored(self):
+        print("\nTest Case: A 400 from an unexpected exception leaves the key free for a retry")
+        with patch('credit_app.views.create_loan_if_eligible', side_effect=OperationalError('lock timeout')):
+            response = self.client.post('/create-loan/', self.application, format='json', HTTP_IDEMPOTENCY_KEY='loan-1')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+        response = self.client.post('/create-loan/', self.application, format='json', HTTP_IDEMPOTENCY_KEY='loan-1')
+        self.assertTrue(response.data['loan_approved'])
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+
+        # Deliberate validation answers are stored like successes
+        invalid = {**self.application, 'tenure': 0}
+        self.client.post('/create-loan/', invalid, format='json', HTTP_IDEMPOTENCY_KEY='loan-2')
+        response = self.client.post('/create-loan/', invalid, format='json', HTTP_IDEMPOTENCY_KEY='loan-2')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        print("Test Case Passed!")
+
+    def test_expired_key_runs_again(self):
+        print("\nTest Case: Expired idempotency keys are reused and purged")
+        self.client.post('/create-loan/', self.application, format='json', HTTP_IDEMPOTENCY_KEY='loan-1')
+        IdempotencyRecord.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        response = self.client.post('/create-loan/', self.application, format='json', HTTP_IDEMPOTENCY_KEY='loan-1')
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(Loan.objects.filter(customer=self.customer).count(), 2)
+
+        IdempotencyRecord.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+        call_command('purge_idempotency_keys', stdout=out)
+        self.assertIn('Deleted 1 expired idempotency keys', out.getvalue())
+        self.assertFalse(IdempotencyRecord.objects.exists())
+        print("Test Case Passed!")
+
+
+class ConcurrentIdempotencyKeyTest(TransactionTestCase):
+    def test_concurrent_duplicates_run_once(self):
+        print("\nTest Case: Concurrent requests with the same idempotency key run once")
+        customer = Customer.objects.create(first_name='John',
+                                           last_name='Doe',
+                                           age=30,
+                                           phone_number=1234567890,
+                                           monthly_salary=50000)
+        application = {'customer_id': customer.customer_id, 'loan_amount': 10000, 'interest_rate': 10, 'tenure': 12}
+        barrier = threading.Barrier(6)
+
+        def create(_):
+            try:
+                barrier.wait()
+                return APIClient().post('/create-loan/', application, format='json', HTTP_IDEMPOTENCY_KEY='loan-1').json()
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            responses = list(executor.map(create, range(6)))
+
+        self.assertEqual(Loan.objects.filter(customer=customer).count(), 1)
+        self.assertTrue(all(response == responses[0] for response in responses))
+        self.assertTrue(responses[0]['loan_approved'])
+        print("Test Case Passed!")
+
+
+class RequestMetricsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        rules.get_rulebook()  # Rule sets are loaded once per process, before any query is counted
+        registry.reset()
+        self.customer = Customer.objects.create(first_name='John',
+                                                last_name='Doe',
+                                                age=30,
+                                                phone_number=1234567890,
+                                                monthly_salary=50000)
+        self.application = {'customer_id': self.customer.customer_id, 'loan_amount': 10000, 'interest_rate': 10, 'tenure': 12}
+
+    def test_server_timing_and_metrics(self):
+        print("\nTest Case: Request metrics in Server-Timing and /metrics")
+        response = self.client.post('/check-eligibility/', self.application, format='json')
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="3 queries", dup;desc="0 duplicate queries"$')
+
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        labels = '{route="check-eligibility/",method="POST",status="200"}'
+        self.assertIn(f'credit_http_requests_total{labels} 1', body)
+        self.assertIn(f'credit_http_db_requests_total{labels} 1', body)
+        self.assertIn(f'credit_http_queries_total{labels} 3', body)
+        self.assertIn(f'credit_http_duplicate_queries_total{labels} 0', body)
+        self.assertIn('credit_http_request_duration_seconds_bucket{route="check-eligibility/",method="POST",status="200",le="+Inf"} 1', body)
+        self.assertIn('# TYPE credit_http_request_duration_seconds histogram', body)
+        self.assertIn('credit_score_cache_misses_total', body)
+        print("Test Case Passed!")
+
+    def test_routes_are_recorded_by_pattern(self):
+        print("\nTest Case: Request metrics are grouped by URL pattern")
+        self.client.get('/view-loan/loan-id/1/')
+        self.client.get('/view-loan/loan-id/2/')
+        metrics = registry.snapshot()
+        self.assertEqual(metrics[('view-loan/loan-id/<int:loan_id>/', 'GET', '400')]['requests'], 2)
+        print("Test Case Passed!")
+
+    def test_duplicate_queries_are_counted(self):
+        print("\nTest Case: Repeated queries are counted as duplicates")
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            list(Customer.objects.filter(customer_id=self.customer.customer_id))
+            list(Customer.objects.filter(customer_id=self.customer.customer_id))
+            list(Customer.objects.filter(customer_id=self.customer.customer_id + 1))
+        self.assertEqual(recorder.queries, 3)
+        self.assertEqual(recorder.duplicates, 1)
+        self.assertGreater(recorder.seconds, 0)
+        print("Test Case Passed!")
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_recorded(self):
+        print("\nTest Case: Requests outside the sample are not instrumented")
+        response = self.client.post('/check-eligibility/', self.application, format='json')
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(registry.snapshot(), {})
+        print("Test Case Passed!")
+
+    async def test_async_views_record_wall_time(self):
+        print("\nTest Case: Async views record wall time")
+        response = await AsyncClient().post('/async/check-eligibility/', self.application, content_type='application/json')
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+$')
+        self.assertEqual(registry.snapshot()[('async/check-eligibility/', 'POST', '200')]['requests'], 1)
+
+        # Unobserved queries are left out of the DB series instead of reported as zero
+        body = registry.render()
+        self.assertIn('credit_http_requests_total{route="async/check-eligibility/"', body)
+        for family in ('db_requests', 'db_seconds', 'queries', 'duplicate_queries'):
+            self.assertNotIn(f'credit_http_{family}_total{{route="async/check-eligibility/"', body)
+        print("Test Case Passed!")
+
+
+class AmortizationTest(TestCase):
+    def test_add_months_clamps_to_month_end(self):
+        print("\nTest Case: Calendar month arithmetic")
+        self.assertEqual(add_months(date(2024, 1, 31), 1), date(2024, 2, 29))
+        self.assertEqual(add_months(date(2023, 1, 31), 1), date(2023, 2, 28))
+        self.assertEqual(add_months(date(2023, 12, 15), 14), date(2025, 2, 15))
+        starts = np.array(['2024-01-31', '2023-12-15'], dtype='datetime64[D]')
+        self.assertEqual(add_months_array(starts, [1, 14]).tolist(), [date(2024, 2, 29), date(2025, 2, 15)])
+        print("Test Case Passed!")
+
+    def test_single_loan_schedule(self):
+        print("\nTest Case: Amortization schedule of a single loan")
+        rows = list(amortization_schedule(100000, 12, 12, date(2024, 1, 31)))
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(rows[0], {'installment': 1, 'due_date': date(2024, 2, 29), 'payment': 8884.88,
+                                   'principal': 7884.88, 'interest': 1000.0, 'balance': 92115.12})
+        self.assertEqual(rows[1]['due_date'], date(2024, 3, 31))
+        self.assertEqual(rows[-1]['due_date'], date(2025, 1, 31))
+        self.assertEqual(rows[-1]['balance'], 0.0)
+        self.assertAlmostEqual(sum(row['principal'] for row in rows), 100000, delta=0.05)
+        for row in rows:
+            self.assertAlmostEqual(row['payment'], row['principal'] + row['interest'], delta=0.011)
+        print("Test Case Passed!")
+
+    def test_vectorized_schedules_match_single_loans(self):
+        print("\nTest Case: Portfolio schedules match single-loan schedules")
+        loans = [(100000, 12, 12, date(2024, 1, 31)), (5000, 10, 0, date(2023, 5, 10)), (250000, 36, 8.5, date(2022, 11, 30))]
+        schedules = amortization_schedules(*[[loan[field] for loan in loans] for field in range(4)])
+        self.assertEqual(len(schedules['installment']), 58)
+        for index, loan in enumerate(loans):
+            rows = schedules['loan_index'] == index
+            expected = list(amortization_schedule(*loan))
+            self.assertEqual(schedules['payment'][rows].tolist(), [row['payment'] for row in expected])
+            self.assertEqual(schedules['balance'][rows].tolist(), [row['balance'] for row in expected])
+            self.assertEqual(schedules['due_date'][rows].tolist(), [row['due_date'] for row in expected])
+        print("Test Case Passed!")
+
+    def test_schedule_endpoint(self):
+        print("\nTest Case: Loan schedule endpoint")
+        customer = Customer.objects.create(first_name='John', last_name='Doe', age=30, phone_number=1234567890, monthly_salary=50000)
+        response = APIClient().post('/create-loan/', {'customer_id': customer.customer_id, 'loan_amount': 100000,
+                                                      'interest_rate': 12, 'tenure': 12}, format='json')
+        loan = Loan.objects.get(loan_id=response.data['loan_id'])
+        self.assertEqual(loan.end_date, add_months(loan.start_date, 12))
+
+        response = self.client.get(f'/loan/{loan.loan_id}/schedule/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(rows[0]['payment'], loan.monthly_repayment)
+        self.assertEqual(rows[-1]['due_date'], loan.end_date.isoformat())
+
+        response = self.client.get('/loan/999999/schedule/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        print("Test Case Passed!")
+
+
+class RescorePortfolioTest(TestCase):
+    def setUp(self):
+        self.customers = []
+        for index in range(5):
+            customer = Customer.objects.create(first_name='John',
+                                               last_name=f'Doe{index}',
+                                               age=30,
+                                               phone_number=1234567890,
+                                               monthly_salary=50000,
+                                               approved_limit=20000)
+            for _ in range(index):
+                Loan.objects.create(customer=customer,
+                                    loan_amount=10000,
+                                    interest_rate=10,
+                                    monthly_repayment=900,
+                                    tenure=12,
+                                    emis_paid_on_time=3,
+                                    start_date=datetime.now().date(),
+                                    end_date=datetime.now().date() + timedelta(days=365))
+            self.customers.append(customer)
+
+    def test_rescore_writes_one_snapshot_per_customer(self):
+        print("\nTest Case: Portfolio rescoring writes a snapshot per customer")
+        out = StringIO()
+        call_command('rescore_portfolio', workers=1, partition_size=2, stdout=out)
+        self.assertIn('Scored 5 customers', out.getvalue())
+
+        run = RescoreRun.objects.get()
+        self.assertIsNotNone(run.finished_at)
+        self.assertEqual(run.partitions.count(), 3)
+        for customer in self.customers:
+            snapshot = CreditScoreSnapshot.objects.get(customer=customer)
+            self.assertEqual(snapshot.credit_score, calculate_credit_score(Customer.objects.get(pk=customer.pk)))
+            self.assertEqual(snapshot.run, run)
+            self.assertEqual(snapshot.inputs['total_loans'], len(customer.loan_set.all()))
+        print("Test Case Passed!")
+
+    def test_interrupted_run_resumes(self):
+        print("\nTest Case: An interrupted rescore run resumes from its checkpoint")
+        run = start_run(partition_size=2)
+        first, *rest = pending_partitions(run)
+        rescore_partition(first)
+        self.assertEqual(CreditScoreSnapshot.objects.count(), 2)
+
+        out = StringIO()
+        call_command('rescore_portfolio', workers=1, resume=run.run_id, stdout=out)
+        self.assertIn(f'Run {run.run_id}: 2 partition(s)', out.getvalue())
+        self.assertEqual(CreditScoreSnapshot.objects.count(), 5)
+        self.assertEqual(CreditScoreSnapshot.objects.values('customer').distinct().count(), 5)
+
+        # A completed partition is never written twice
+        rescore_partition(first)
+        self.assertEqual(CreditScoreSnapshot.objects.count(), 5)
+
+        with self.assertRaises(CommandError):
+            call_command('rescore_portfolio', workers=1, resume=0, stdout=StringIO())
+        print("Test Case Passed!")
+
+    def test_past_run_counts_loans_started_by_then(self):
+        print("\nTest Case: Rescoring as of a past date ignores loans started after it")
+        customer = self.customers[4]
+        old = Loan.objects.filter(customer=customer).first()
+        Loan.objects.filter(loan_id=old.loan_id).update(start_date=date(2020, 3, 1), end_date=date(2021, 3, 1),
+                                                        emis_paid_on_time=6)
+        ArchivedLoan.objects.create(loan_id=old.loan_id + 1000, customer=customer, loan_amount=5000, tenure=12,
+                                    interest_rate=10, monthly_repayment=450, emis_paid_on_time=12,
+                                    start_date=date(2019, 1, 1), end_date=date(2020, 1, 1))
+        ArchivedLoanSummary.objects.create(customer=customer, total_loans=1, total_loan_amount=5000, total_monthly_repayment=450)
+
+        snapshot = CustomerCreditSnapshot.for_customers([customer], as_of=date(2020, 6, 1))[customer.customer_id]
+        self.assertEqual((snapshot.total_loans, snapshot.late_loans, snapshot.current_year_loans), (2, 1, 1))
+        self.assertEqual(snapshot.total_loan_amount, 15000)
+        self.assertGreater(snapshot.current_exposure, 0)
+
+        snapshot = CustomerCreditSnapshot.for_customers([customer], as_of=date(2019, 6, 1))[customer.customer_id]
+        self.assertEqual((snapshot.total_loans, snapshot.current_exposure), (1, 0))
+        self.assertEqual(CustomerCreditSnapshot.for_customers([customer])[customer.customer_id].total_loans, 5)
+        print("Test Case Passed!")
+
+
+class CreditScoreHistoryTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(first_name='John',
+                                                last_name='Doe',
+                                                age=30,
+                                                phone_number=1234567890,
+                                                monthly_salary=50000,
+                                                approved_limit=1000000)
+        self.application = {'customer_id': self.customer.customer_id, 'loan_amount': 10000, 'interest_rate': 10, 'tenure': 12}
+
+    def check(self):
+        # Clear the score cache so the check reaches the score history
+        score_cache.invalidate(self.customer.customer_id)
+        return self.client.post('/check-eligibility/', self.application, format='json')
+
+    def test_decision_writes_snapshot(self):
+        print("\nTest Case: An eligibility decision persists the score it used")
+        self.check()
+        row = CreditScoreSnapshot.objects.get(customer=self.customer)
+        self.assertEqual(row.credit_score, 100)
+        self.assertEqual(row.inputs['total_loans'], 0)
+        self.assertEqual(row.inputs['monthly_salary'], 50000)
+        self.assertIsNone(row.run)
+        print("Test Case Passed!")
+
+    def test_recent_snapshot_is_reused(self):
+        print("\nTest Case: Checks on unchanged loans reuse the recent snapshot")
+        self.check()
+        self.check()
+        self.assertEqual(CreditScoreSnapshot.objects.count(), 1)
+
+        # Outside the reuse window a new row is appended
+        with override_settings(CREDIT_SCORE_SNAPSHOT_REUSE_SECONDS=0):
+            self.check()
+        self.assertEqual(CreditScoreSnapshot.objects.count(), 2)
+        print("Test Case Passed!")
+
+    @override_settings(CREDIT_SCORE_CACHE_LOCAL=True)
+    async def test_cache_hits_are_recorded(self):
+        print("\nTest Case: Decisions served from the score cache are covered by the score history")
+        url = '/check-eligibility/'
+        await sync_to_async(self.client.post)(url, self.application, format='json')
+        score_cache.counters.reset()
+        await sync_to_async(self.client.post)(url, self.application, format='json')
+        self.assertEqual(await CreditScoreSnapshot.objects.acount(), 1)
+
+        # Once the row the cached score came from is outside the reuse window, every path appends the cached score
+        with override_settings(CREDIT_SCORE_SNAPSHOT_REUSE_SECONDS=0):
+            await sync_to_async(self.client.post)(url, self.application, format='json')
+            await sync_to_async(self.client.post)('/check-eligibility/batch/', [self.application], format='json')
+            await AsyncClient().post('/async/check-eligibility/', self.application, content_type='application/json')
+        self.assertEqual(score_cache.counters.hits, 4)
+        self.assertEqual(score_cache.counters.misses, 0)
+        rows = [row async for row in CreditScoreSnapshot.objects.order_by('created_at')]
+        self.assertEqual(len(rows), 4)
+        self.assertEqual({row.credit_score for row in rows}, {100})
+        self.assertEqual(rows[-1].inputs, rows[0].inputs)
+        print("Test Case Passed!")
+
+    def test_backdated_rescore_is_not_the_current_score(self):
+        print("\nTest Case: Scores of a rescore run for a past date stay out of the current score lookups")
+        call_command('rescore_portfolio', workers=1, as_of=date(2020, 6, 1), stdout=StringIO())
+        backdated = CreditScoreSnapshot.objects.get(customer=self.customer)
+        self.assertEqual(backdated.as_of, date(2020, 6, 1))
+        self.assertEqual(self.client.get(f'/score/customer-id/{self.customer.customer_id}/').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+        # The check scores afresh instead of reusing the backdated row
+        self.check()
+        self.assertEqual(CreditScoreSnapshot.objects.count(), 2)
+        response = self.client.get(f'/score/customer-id/{self.customer.customer_id}/')
+        self.assertEqual(response.json()['computed_at'], CreditScoreSnapshot.objects.get(as_of__isnull=True).created_at.isoformat())
+
+        # A run for today writes current scores
+        call_command('rescore_portfolio', workers=1, stdout=StringIO())
+        self.assertEqual(CreditScoreSnapshot.objects.filter(as_of__isnull=True).count(), 2)
+        print("Test Case Passed!")
+
+    def test_loan_or_salary_change_is_not_reused(self):
+        print("\nTest Case: A new loan or salary change appends a new snapshot")
+        self.check()
+        # The loan is decided on the same loans as the check, so its score is reused
+        response = self.client.post('/create-loan/', self.application, format='json')
+        self.assertTrue(response.json()['loan_approved'])
+        self.assertEqual(CreditScoreSnapshot.objects.count(), 1)
+
+        self.check()
+        self.assertEqual(CreditScoreSnapshot.objects.count(), 2)
+        self.assertEqual(CreditScoreSnapshot.objects.latest('created_at').inputs['total_loans'], 1)
+
+        Customer.objects.filter(pk=self.customer.pk).update(monthly_salary=60000)
+        self.check()
+        self.assertEqual(CreditScoreSnapshot.objects.count(), 3)
+        print("Test Case Passed!")
+
+    def test_batch_check_reuses_and_appends(self):
+        print("\nTest Case: Batch checks append new snapshots in bulk and reuse recent ones")
+        self.client.post('/check-eligibility/batch/', [self.application], format='json')
+        score_cache.invalidate(self.customer.customer_id)
+        self.client.post('/check-eligibility/batch/', [self.application], format='json')
+        self.assertEqual(CreditScoreSnapshot.objects.count(), 1)
+        print("Test Case Passed!")
+
+    def test_score_as_of(self):
+        print("\nTest Case: Score history endpoint answers the score at a point in time")
+        url = f'/score/customer-id/{self.customer.customer_id}/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        CreditScoreSnapshot.objects.create(customer=self.customer, credit_score=40, inputs={}, rule_version='builtin-1',
+                                           created_at=timezone.now() - timedelta(days=2))
+        CreditScoreSnapshot.objects.create(customer=self.customer, credit_score=70, inputs={}, rule_version='builtin-1',
+                                           created_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(self.client.get(url).json()['credit_score'], 70)
+        as_of = (timezone.now() - timedelta(hours=36)).isoformat()
+        response = self.client.get(url, {'as_of': as_of})
+        self.assertEqual(response.json()['credit_score'], 40)
+        response = self.client.get(url, {'as_of': (timezone.now() - timedelta(days=3)).isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'as_of': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        print("Test Case Passed!")
+
+
+class ScoringRulesTest(TestCase):
+    STRICT_RULES = {
+        'version': 'strict-2',
+        'base_score': 100,
+        'deductions': {'late_loans': 10, 'total_loans': 3, 'current_year_loans': 5},
+        'zero_score_over_limit': True,
+        'bands': [
+            {'score_above': 70, 'rate_floor': None, 'approve_rate_above': None},
+            {'score_above': 40, 'rate_floor': 14, 'approve_rate_above': 14},
+        ],
+        'max_emi_ratio': 0.4,
+    }
+
+    def setUp(self):
+        self.client = APIClient()
+        self.previous = rules.get_rulebook()
+        self.strict = rules.CompiledRuleSet(self.STRICT_RULES)
+        self.customer = Customer.objects.create(first_name='John',
+                                                last_name='Doe',
+                                                age=30,
+                                                phone_number=1234567890,
+                                                monthly_salary=50000,
+                                                approved_limit=1000000)
+        Loan.objects.create(customer=self.customer,
+                            loan_amount=10000,
+                            interest_rate=10,
+                            monthly_repayment=900,
+                            tenure=12,
+                            emis_paid_on_time=3,
+                            start_date=datetime.now().date(),
+                            end_date=datetime.now().date() + timedelta(days=365))
+
+    def tearDown(self):
+        rules.registry.install(self.previous)
+
+    def test_rule_set_scores_and_decides(self):
+        print("\nTest Case: A rule set defined as data scores and decides loans")
+        snapshot = CustomerCreditSnapshot.for_customer(self.customer)
+        # 100 - 10 late - 3 past - 5 this year
+        self.assertEqual(calculate_credit_score(self.customer, snapshot, self.strict), 82)
+        self.assertEqual(calculate_credit_score(self.customer, snapshot), 90)
+
+        self.assertEqual(self.strict.corrected_rate(50, 10), 14)
+        self.assertIsNone(self.strict.corrected_rate(40, 10))
+        result = decide_loan_eligibility(50, 0, 50000, 100000, 15, 12, self.strict)
+        self.assertTrue(result['approval'])
+        # The same loan takes more than 40% of the salary
+        result = decide_loan_eligibility(90, 12000, 50000, 100000, 15, 12, self.strict)
+        self.assertFalse(result['approval'])
+        self.assertTrue(decide_loan_eligibility(90, 12000, 50000, 100000, 15, 12)['approval'])
+        print("Test Case Passed!")
+
+    def test_vectorized_rules_match_scalar(self):
+        print("\nTest Case: Vectorized rule evaluation matches the scalar path")
+        rng = np.random.default_rng(3)
+        scores = rng.integers(0, 101, size=200)
+        rates = rng.uniform(5, 20, size=200)
+        emis = rng.uniform(0, 30000, size=200)
+        corrected = self.strict.corrected_rates(scores, rates)
+        installments = calculate_monthly_installments(np.full(200, 100000.0), np.full(200, 12), corrected)
+        approvals = self.strict.approvals(scores, corrected, emis, installments, np.full(200, 50000.0))
+        for index, score in enumerate(scores.tolist()):
+            expected = decide_loan_eligibility(score, emis[index], 50000, 100000, rates[index], 12, self.strict)
+            self.assertEqual(bool(approvals[index]), expected['approval'])
+            if expected['approval']:
+                self.assertAlmostEqual(corrected[index], expected['corrected_interest_rate'])
+
+        late, total, this_year = rng.integers(0, 5, size=(3, 50))
+        vectorized = calculate_credit_scores(late, total, this_year, np.zeros(50), np.ones(50), self.strict)
+        for index in range(50):
+            snapshot = CustomerCreditSnapshot(self.customer, late_loans=late[index], total_loans=total[index],
+                                              current_year_loans=this_year[index])
+            self.assertEqual(vectorized[index], self.strict.score(snapshot, 1))
+        print("Test Case Passed!")
+
+    def test_invalid_rule_sets_are_rejected(self):
+        print("\nTest Case: Rule sets that do not compile are rejected")
+        for broken in [{}, {**self.STRICT_RULES, 'bands': []}, {**self.STRICT_RULES, 'deductions': {'salary': 1}},
+                       {**self.STRICT_RULES, 'max_emi_ratio': 'half'}]:
+            with self.assertRaises(rules.RuleSetError):
+                rules.CompiledRuleSet(broken)
+        with self.assertRaises(ValidationError):
+            ScoringRuleSet(version='broken', definition={'bands': []}).full_clean()
+        print("Test Case Passed!")
+
+    def test_traffic_split_is_stable(self):
+        print("\nTest Case: A/B traffic split assigns each customer a stable rule set")
+        rulebook = rules.RuleBook([rules.BUILTIN, self.strict], {'builtin-1': 50, 'strict-2': 50})
+        customer_ids = np.arange(1, 1001)
+        groups = {ruleset.version: positions for ruleset, positions in rulebook.split(customer_ids)}
+        self.assertEqual(sum(len(positions) for positions in groups.values()), 1000)
+        self.assertTrue(400 < len(groups['strict-2']) < 600)
+        for version, positions in groups.items():
+            for customer_id in customer_ids[positions][:20].tolist():
+                self.assertEqual(rulebook.for_customer(customer_id).version, version)
+
+        # Without traffic everyone gets the default version
+        self.assertIs(rules.RuleBook([rules.BUILTIN, self.strict]).for_customer(7), rules.BUILTIN)
+        print("Test Case Passed!")
+
+    def test_database_rule_set_is_hot_reloaded(self):
+        print("\nTest Case: A rule set saved in the database is used without a restart")
+        data = {'customer_id': self.customer.customer_id, 'loan_amount': 10000, 'interest_rate': 10, 'tenure': 12}
+        self.client.post('/check-eligibility/', data, format='json')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ScoringRuleSet.objects.create(version='strict-2', definition=self.STRICT_RULES, weight=100)
+        self.assertIsNotNone(rules.get_rulebook().get('strict-2'))
+
+        # The cached builtin score is not served for the new rules
+        self.client.post('/check-eligibility/', data, format='json')
+        row = CreditScoreSnapshot.objects.latest('created_at')
+        self.assertEqual((row.rule_version, row.credit_score), ('strict-2', 82))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ScoringRuleSet.objects.filter(version='strict-2').delete()
+        self.assertIsNone(rules.get_rulebook().get('strict-2'))
+        print("Test Case Passed!")
+
+    def test_change_from_another_process_is_seen(self):
+        print("\nTest Case: Rule set changes are detected from the database without a shared cache")
+        rules.registry.reload()
+        # Saved by another process: this one's cache was never told
+        row = ScoringRuleSet.objects.create(version='strict-2', definition=self.STRICT_RULES, weight=100)
+        rules.registry.next_check = 0
+        self.assertIsNotNone(rules.get_rulebook().get('strict-2'))
+
+        row.delete()
+        rules.registry.next_check = 0
+        self.assertIsNone(rules.get_rulebook().get('strict-2'))
+        print("Test Case Passed!")
+
+    def test_row_that_is_not_an_object_is_skipped(self):
+        print("\nTest Case: A stored rule set that is not an object is skipped")
+        # create() does not run clean()
+        ScoringRuleSet.objects.create(version='broken', definition=['not', 'an', 'object'], weight=100)
+        ScoringRuleSet.objects.create(version='strict-2', definition=self.STRICT_RULES, weight=0)
+        with self.assertLogs('credit_app.rules', 'WARNING'):
+            rulebook = rules.build_rulebook()
+        self.assertIsNone(rulebook.get('broken'))
+        self.assertIsNotNone(rulebook.get('strict-2'))
+        print("Test Case Passed!")
+
+    def test_rescore_applies_assigned_rule_sets(self):
+        print("\nTest Case: Portfolio rescoring scores each customer with their assigned rule set")
+        rules.registry.install(rules.RuleBook([rules.BUILTIN, self.strict], {'strict-2': 1}))
+        call_command('rescore_portfolio', workers=1, stdout=StringIO())
+        row = CreditScoreSnapshot.objects.get(customer=self.customer)
+        self.assertEqual((row.rule_version, row.credit_score), ('strict-2', 82))
+        print("Test Case Passed!")
+
+
+class RegisterCustomerBatchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def customer_data(self, index, monthly_salary=50000):
+        return {'first_name': 'John', 'last_name': f'Doe{index}', 'age': 30, 'phone_number': 1234567890 + index,
+                'monthly_salary': monthly_salary}
+
+    def test_batch_creates_customers(self):
+        print("\nTest Case: Batch registration creates every valid customer")
+        salaries = [50000, 51389, 1850000 // 36 + 1, 0]
+        data = [self.customer_data(index, salary) for index, salary in enumerate(salaries)]
+        response = self.client.post('/register/batch/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['created'], 4)
+
+        for row, salary in zip(response.json()['results'], salaries):
+            customer = Customer.objects.get(customer_id=row['customer_id'])
+            self.assertEqual(customer.approved_limit, round(36 * salary, -5))
+            self.assertEqual(row['approved_limit'], customer.approved_limit)
+            # Stats rows are created as the post_save signal would
+            self.assertEqual(customer.loan_stats.total_loans, 0)
+        print("Test Case Passed!")
+
+    def test_invalid_rows_do_not_abort_batch(self):
+        print("\nTest Case: Invalid rows are reported without aborting the batch")
+        data = [self.customer_data(0), {'first_name': 'John', 'age': -5}, self.customer_data(2, monthly_salary=-1), 'x',
+                self.customer_data(4)]
+        response = self.client.post('/register/batch/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        body = response.json()
+        self.assertEqual(body['created'], 2)
+        results = body['results']
+        self.assertIsNotNone(results[0]['customer_id'])
+        self.assertIn('age', results[1]['errors'])
+        self.assertIn('last_name', results[1]['errors'])
+        self.assertIn('monthly_salary', results[2]['errors'])
+        self.assertIn('non_field_errors', results[3]['errors'])
+        self.assertEqual(Customer.objects.get(customer_id=results[4]['customer_id']).last_name, 'Doe4')
+        self.assertEqual(Customer.objects.count(), 2)
+        print("Test Case Passed!")
+
+    def test_batch_insert_query_count(self):
+        print("\nTest Case: Batch registration inserts with batched queries")
+        data = [self.customer_data(index) for index in range(10)]
+        # Transaction savepoints aside, one INSERT for the customers and one for their stats rows
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post('/register/batch/', data, format='json')
+        inserts = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 2)
+        print("Test Case Passed!")
+
+    def test_batch_rejects_non_list_and_all_invalid(self):
+        print("\nTest Case: Batch registration requires a list with a valid row")
+        response = self.client.post('/register/batch/', self.customer_data(0), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post('/register/batch/', [{'first_name': 'John'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['created'], 0)
+        self.assertEqual(Customer.objects.count(), 0)
+        print("Test Case Passed!")
+
+    def test_empty_batch_is_accepted(self):
+        print("\nTest Case: An empty batch is a valid request with nothing to create")
+        response = self.client.post('/register/batch/', [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json(), {'created': 0, 'results': []})
+        print("Test Case Passed!")
+
+
+class DatabaseSettingsTest(TestCase):
+    def test_defaults_and_test_fallback(self):
+        print("\nTest Case: Database settings default to persistent PostgreSQL connections and SQLite for tests")
+        config = databases({}, argv=['manage.py', 'runserver'])['default']
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((config['HOST'], config['NAME']), ('postgres_db', 'credit_approval_db'))
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('pool', config['OPTIONS'])
+
+        config = databases({}, argv=['manage.py', 'test'], base_dir=Path('/srv'))['default']
+        self.assertEqual(config, {'ENGINE': 'django.db.backends.sqlite3', 'NAME': '/srv/db.sqlite3'})
+        config = databases({'DB_ENGINE': 'postgresql'}, argv=['manage.py', 'test'])['default']
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        print("Test Case Passed!")
+
+    def test_pool_and_persistent_connections(self):
+        print("\nTest Case: Connection pool and persistent connection settings come from the environment")
+        config = databases({'DB_HOST': 'db', 'DB_CONN_MAX_AGE': 'none', 'DB_CONN_HEALTH_CHECKS': 'no'}, argv=[])['default']
+        self.assertEqual(config['HOST'], 'db')
+        self.assertIsNone(config['CONN_MAX_AGE'])
+        self.assertFalse(config['CONN_HEALTH_CHECKS'])
+
+        config = databases({'DB_POOL': '1', 'DB_POOL_MIN_SIZE': '4', 'DB_POOL_MAX_SIZE': '20'}, argv=[])['default']
+        self.assertEqual(config['OPTIONS']['pool'], {'min_size': 4, 'max_size': 20, 'timeout': 10})
+        # Django refuses persistent connections together with a pool
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+
+        for environ in [{'DB_POOL': 'maybe'}, {'DB_POOL': '1', 'DB_POOL_MIN_SIZE': '5', 'DB_POOL_MAX_SIZE': '2'},
+                        {'DB_CONN_MAX_AGE': 'soon'}, {'DB_ENGINE': 'oracle'}]:
+            with self.assertRaises(ValueError):
+                databases(environ, argv=[])
+        print("Test Case Passed!")
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], DATABASE_REPLICA_SELECTION='round_robin')
+class ReplicaRoutingTest(TransactionTestCase):
+    # A second SQLite database stands in for a replica that has not caught up with the primary
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = Customer.objects.create(first_name='John', last_name='Doe', age=30,
+                                                phone_number=1234567890, monthly_salary=50000)
+        Customer.objects.using('replica').bulk_create([Customer(
+            customer_id=self.customer.customer_id, first_name='John', last_name='Doe', age=30,
+            phone_number=1234567890, monthly_salary=50000, approved_limit=self.customer.approved_limit)])
+        CustomerLoanStats.objects.using('replica').bulk_create([
+            CustomerLoanStats(customer_id=self.customer.customer_id, as_of=date.today())])
+        # Registering made the customer sticky; start as if the replica had caught up since
+        routers.get_cache().clear()
+
+    def create_loan(self, using='default', **fields):
+        fields = {'loan_amount': 10000, 'interest_rate': 15, 'monthly_repayment': 900, 'tenure': 12, 'emis_paid_on_time': 0,
+                  'start_date': date.today(), 'end_date': date.today() + timedelta(days=365), **fields}
+        loan = Loan(customer_id=self.customer.customer_id, **fields)
+        if using == 'default':
+            loan.save()
+        else:
+            Loan.objects.using(using).bulk_create([loan])
+        return loan
+
+    def test_customer_reads_primary_after_write(self):
+        print("\nTest Case: A customer who just got a loan reads it from the primary, others read from the replica")
+        response = self.client.post('/create-loan/', {'customer_id': self.customer.customer_id, 'loan_amount': 10000,
+                                                      'interest_rate': 15, 'tenure': 12}, format='json')
+        self.assertTrue(response.data['loan_approved'])
+        self.assertTrue(routers.is_sticky(self.customer.customer_id))
+
+        url = f'/view-loans/customer-id/{self.customer.customer_id}/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+        # Once the sticky window is over the request is served by the replica, which lacks the loan
+        routers.get_cache().clear()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        print("Test Case Passed!")
+
+    def test_loan_details_fall_back_to_primary(self):
+        print("\nTest Case: Loan details come from the replica, or the primary when the replica lacks the loan")
+        loan = self.create_loan()
+        routers.get_cache().clear()
+        response = self.client.get(f'/view-loan/loan-id/{loan.loan_id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['loan_amount'], 10000)
+
+        self.create_loan(using='replica', loan_id=loan.loan_id + 1, loan_amount=20000)
+        response = self.client.get(f'/view-loan/loan-id/{loan.loan_id + 1}/')
+        self.assertEqual(response.data['loan_amount'], 20000)
+        print("Test Case Passed!")
+
+    def test_eligibility_reads_replica(self):
+        print("\nTest Case: Eligibility checks read the customer from the replica and write scores to the primary")
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = self.client.post('/check-eligibility/', {'customer_id': self.customer.customer_id, 'loan_amount': 10000,
+                                                                'interest_rate': 15, 'tenure': 12}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['approval'])
+        self.assertTrue(replica_queries.captured_queries)
+        self.assertFalse([query for query in replica_queries.captured_queries if not query['sql'].startswith('SELECT')])
+        self.assertEqual(CreditScoreSnapshot.objects.using('default').count(), 1)
+        print("Test Case Passed!")
+
+    def test_metrics_count_replica_queries(self):
+        print("\nTest Case: Request metrics count the queries sent to replicas")
+        self.create_loan(using='replica')
+        with CaptureQueriesContext(connections['replica']) as replica_queries, \
+                CaptureQueriesContext(connections['default']) as primary_queries:
+            response = self.client.get(f'/view-loans/customer-id/{self.customer.customer_id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(replica_queries.captured_queries)
+        queries = len(replica_queries.captured_queries) + len(primary_queries.captured_queries)
+        self.assertIn(f'desc="{queries} queries"', response['Server-Timing'])
+        print("Test Case Passed!")
+
+    def test_replica_aggregates_not_written_back(self):
+        print("\nTest Case: Stale stats refreshed from a lagging replica are not written to the primary")
+        self.create_loan()
+        yesterday = date.today() - timedelta(days=1)
+        CustomerLoanStats.objects.update(as_of=yesterday)
+        CustomerLoanStats.objects.using('replica').update(as_of=yesterday)
+        with routers.read_from_replica():
+            customer = Customer.objects.select_related('loan_stats').get(customer_id=self.customer.customer_id)
+            self.assertEqual(CustomerCreditSnapshot.for_customer(customer).total_loans, 0)
+        self.assertEqual(CustomerLoanStats.objects.get(customer=self.customer).as_of, yesterday)
+
+        customer = Customer.objects.select_related('loan_stats').get(customer_id=self.customer.customer_id)
+        self.assertEqual(CustomerCreditSnapshot.for_customer(customer).total_loans, 1)
+        stats = CustomerLoanStats.objects.get(customer=self.customer)
+        self.assertEqual((stats.as_of, stats.total_loans), (date.today(), 1))
+        print("Test Case Passed!")
+
+    async def test_async_views_read_replica(self):
+        print("\nTest Case: Async loan endpoints read from the replica too")
+        loan = await sync_to_async(self.create_loan)(using='replica', loan_id=1000)
+        response = await AsyncClient().get(f'/async/view-loans/customer-id/{self.customer.customer_id}/')
+        self.assertEqual([row['loan_id'] for row in response.json()], [loan.loan_id])
+        response = await AsyncClient().get(f'/async/view-loans/customer-id/{self.customer.customer_id}/', {'stream': '1'})
+        self.assertEqual(len(json.loads(b''.join([chunk async for chunk in response.streaming_content]))), 1)
+
+        # A loan the replica does not have yet is read from the primary
+        primary = await sync_to_async(self.create_loan)(loan_amount=20000)
+        await routers.get_cache().aclear()
+        response = await AsyncClient().get(f'/async/view-loan/loan-id/{primary.loan_id}/')
+        self.assertEqual(response.json()['loan_amount'], 20000)
+        print("Test Case Passed!")
+
+    def test_sticky_cache_must_be_shared(self):
+        print("\nTest Case: Replicas with sticky marks in a process-local cache fail the system checks")
+        self.assertEqual([error.id for error in routers.check_sticky_cache()], ['credit_app.E001'])
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(routers.check_sticky_cache(), [])
+        with tempfile.TemporaryDirectory() as directory:
+            shared = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}
+            with override_settings(CACHES={**settings.CACHES, 'shared': shared}, DATABASE_REPLICA_CACHE_ALIAS='shared'):
+                self.assertEqual(routers.check_sticky_cache(), [])
+        print("Test Case Passed!")
+
+    def test_reads_in_transaction_use_primary(self):
+        print("\nTest Case: Reads inside a transaction on the primary are not sent to the replica")
+        self.create_loan()
+        with routers.read_from_replica() as alias:
+            self.assertEqual(alias, 'replica')
+            self.assertEqual(Loan.objects.count(), 0)
+            with transaction.atomic():
+                self.assertEqual(Loan.objects.count(), 1)
+        self.assertEqual(Loan.objects.count(), 1)
+
+        with override_settings(DATABASE_REPLICAS=[]):
+            with routers.read_from_replica() as alias:
+                self.assertIsNone(alias)
+        print("Test Case Passed!")
+
+    def test_replica_selection(self):
+        print("\nTest Case: Replicas are picked round-robin or by the fewest requests in flight")
+        balancer = routers.ReplicaBalancer()
+        self.assertEqual([balancer.choose(['a', 'b']) for _ in range(3)], ['a', 'b', 'a'])
+
+        balancer.acquire('a')
+        self.assertEqual([balancer.choose(['a', 'b'], 'least_busy') for _ in range(2)], ['b', 'b'])
+        balancer.release('a')
+        self.assertEqual(balancer.in_flight(), {})
+        with self.assertRaises(ValueError):
+            balancer.choose(['a'], 'random')
+        print("Test Case Passed!")
+
+
+class LoanPartitioningTest(TestCase):
+    def create_loans(self, count):
+        customer = Customer.objects.create(first_name='John', last_name='Doe', age=30, phone_number=1234567890, monthly_salary=50000)
+        return [Loan.objects.create(customer=customer, loan_amount=10000, interest_rate=12, monthly_repayment=900, tenure=12,
+                                    emis_paid_on_time=12, start_date=date(2023, 1, 1), end_date=date(2024, 1, 1))
+                for _ in range(count)]
+
+    def test_partition_statements(self):
+        print("\nTest Case: Hash and range partitions of the Loan table")
+        statements = partitioning.partition_statements('loans', 'hash', 4)
+        self.assertEqual(len(statements), 4)
+        self.assertIn('FOR VALUES WITH (MODULUS 4, REMAINDER 3)', statements[3])
+
+        statements = partitioning.partition_statements('loans', 'range', years=[2024, 2023, 2024])
+        self.assertEqual([statement.split('"')[1] for statement in statements], ['loans_y2023', 'loans_y2024', 'loans_default'])
+        self.assertIn("FROM ('2023-01-01') TO ('2024-01-01')", statements[0])
+
+        for strategy, partitions in [('list', 4), ('hash', 0)]:
+            with self.assertRaises(partitioning.PartitioningError):
+                partitioning.partition_statements('loans', strategy, partitions)
+        print("Test Case Passed!")
+
+    def test_move_statements(self):
+        print("\nTest Case: The partitioned table gets the model's indexes and takes over the table's names on swap")
+        statements = partitioning.prepare_statements(connection.schema_editor(), 'hash', 4)
+        created = '\n'.join(statements)
+        self.assertIn('PARTITION BY HASH ("customer_id")', created)
+        self.assertIn('UNIQUE (loan_id, customer_id)', created)
+        for index in Loan._meta.indexes:
+            self.assertIn(f'CREATE INDEX "{index.name}_p" ON "credit_app_loan_partitioned"', created)
+        self.assertIn('AFTER INSERT OR UPDATE OR DELETE ON "credit_app_loan"', created)
+
+        swapped = '\n'.join(partitioning.swap_statements('range'))
+        self.assertIn('ALTER TABLE "credit_app_loan_partitioned" RENAME TO "credit_app_loan"', swapped)
+        self.assertIn('RENAME CONSTRAINT "credit_app_loan_partitioned_pkey" TO "credit_app_loan_pkey"', swapped)
+        self.assertIn('ALTER INDEX "loan_customer_scoring_idx_p" RENAME TO "loan_customer_scoring_idx"', swapped)
+        print("Test Case Passed!")
+
+    @skipUnless(connection.vendor != 'postgresql', 'Checks the error on backends without partitioning')
+    def test_command_requires_postgresql(self):
+        print("\nTest Case: partition_loans refuses to run without PostgreSQL")
+        with self.assertRaisesMessage(CommandError, 'needs PostgreSQL'):
+            call_command('partition_loans', stdout=StringIO())
+        print("Test Case Passed!")
+
+    @skipUnless(connection.vendor == 'postgresql', 'Declarative partitioning requires PostgreSQL')
+    def test_online_move_on_postgresql(self):
+        print("\nTest Case: Loans written during the move end up in the partitioned table")
+        loans = self.create_loans(3)
+        partitioning.prepare(connection, 'hash', 4)
+        # Writes between prepare and swap are mirrored by the trigger
+        moved = Loan.objects.create(customer=loans[0].customer, loan_amount=20000, interest_rate=12, monthly_repayment=1800,
+                                    tenure=12, emis_paid_on_time=0, start_date=date(2024, 1, 1), end_date=date(2025, 1, 1))
+        Loan.objects.filter(loan_id=loans[1].loan_id).update(emis_paid_on_time=6)
+        self.assertEqual(partitioning.backfill(connection, batch_size=2), 2)
+        loans[2].delete()
+        partitioning.swap(connection)
+
+        state = partitioning.status(connection)
+        self.assertTrue(state['partitioned'])
+        self.assertEqual((state['strategy'], state['partitions']), ('hash', 4))
+        self.assertEqual(sorted(Loan.objects.values_list('loan_id', flat=True)), [loans[0].loan_id, loans[1].loan_id, moved.loan_id])
+        self.assertEqual(Loan.objects.get(loan_id=loans[1].loan_id).emis_paid_on_time, 6)
+
+        # New ids continue after the moved rows
+        response = APIClient().post('/create-loan/', {'customer_id': loans[0].customer_id, 'loan_amount': 10000,
+                                                      'interest_rate': 15, 'tenure': 12}, format='json')
+        self.assertGreater(response.data['loan_id'], moved.loan_id)
+        partitioning.drop_old(connection)
+        self.assertFalse(partitioning.status(connection)['old_table'])
+        print("Test Case Passed!")
+
+
+class LoanArchiveTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.async_client = AsyncClient()
+        self.year = date.today().year
+        self.customer = Customer.objects.create(first_name='John', last_name='Doe', age=30, phone_number=1234567890,
+                                                monthly_salary=50000)
+        old = date(self.year - 3, 1, 1)
+        # Two closed loans from earlier years, a late one, one closed this year and an active one
+        self.loans = [self.create_loan(old, date(self.year - 2, 1, 1), 12, 12),
+                      self.create_loan(old, date(self.year - 2, 1, 1), 12, 12),
+                      self.create_loan(old, date(self.year - 2, 1, 1), 12, 6),
+                      self.create_loan(date(self.year, 1, 1), date(self.year, 2, 1), 1, 1),
+                      self.create_loan(date(self.year, 1, 1), date(self.year + 5, 1, 1), 60, 5)]
+        self.as_of = date.today()
+
+    def create_loan(self, start_date, end_date, tenure, emis_paid_on_time):
+        return Loan.objects.create(customer=self.customer, loan_amount=10000, interest_rate=12, monthly_repayment=900,
+                                   tenure=tenure, emis_paid_on_time=emis_paid_on_time, start_date=start_date, end_date=end_date)
+
+    def test_closed_loans_move_to_archive(self):
+        print("\nTest Case: Closed loans move to the archive and the scoring aggregates stay the same")
+        before = CustomerLoanStats.objects.get(customer=self.customer)
+        score = calculate_credit_score(self.customer)
+        self.assertEqual(archive_closed_loans(self.as_of, batch_size=1), 2)
+
+        archived_ids = [self.loans[0].loan_id, self.loans[1].loan_id]
+        self.assertEqual(sorted(ArchivedLoan.objects.values_list('loan_id', flat=True)), archived_ids)
+        self.assertFalse(Loan.objects.filter(loan_id__in=archived_ids).exists())
+        summary = ArchivedLoanSummary.objects.get(customer=self.customer)
+        self.assertEqual((summary.total_loans, summary.total_loan_amount, summary.total_monthly_repayment), (2, 20000, 1800))
+
+        # The stored aggregates are untouched and still match a recomputation from the hot loans plus the summary
+        self.assertEqual(CustomerLoanStats.objects.get(customer=self.customer).updated_at, before.updated_at)
+        self.assertEqual(find_loan_stats_drift(), [])
+        CustomerLoanStats.objects.all().delete()
+        customer = Customer.objects.get(customer_id=self.customer.customer_id)
+        snapshot = CustomerCreditSnapshot.for_customer(customer)
+        self.assertEqual((snapshot.total_loans, snapshot.late_loans, snapshot.total_loan_amount), (5, 2, 50000))
+        self.assertEqual(calculate_credit_score(customer, snapshot), score)
+        snapshots = CustomerCreditSnapshot.for_customers([customer])
+        self.assertEqual(snapshots[customer.customer_id].total_loans, 5)
+
+        self.assertEqual(archive_closed_loans(self.as_of), 0)
+        print("Test Case Passed!")
+
+    def test_history_endpoints_read_archive_when_asked(self):
+        print("\nTest Case: Loan history endpoints include archived loans with include_archived")
+        archive_closed_loans(self.as_of)
+        url = f'/view-loans/customer-id/{self.customer.customer_id}/'
+        self.assertEqual(len(self.client.get(url).data), 3)
+
+        response = self.client.get(url, {'include_archived': '1'})
+        self.assertEqual([loan['loan_id'] for loan in response.data], [loan.loan_id for loan in self.loans])
+        response = self.client.get(url, {'include_archived': '1', 'page_size': 2, 'cursor': self.loans[0].loan_id})
+        self.assertEqual([loan['loan_id'] for loan in response.data], [self.loans[1].loan_id, self.loans[2].loan_id])
+        self.assertEqual(response['X-Next-Cursor'], str(self.loans[2].loan_id))
+        response = self.client.get(url, {'include_archived': '1', 'stream': '1'})
+        self.assertEqual(len(json.loads(b''.join(response.streaming_content))), 5)
+
+        url = f'/view-loan/loan-id/{self.loans[0].loan_id}/'
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'include_archived': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['customer']['customer_id'], self.customer.customer_id)
+
+        url = f'/loan/{self.loans[0].loan_id}/schedule/'
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'include_archived': '1'})
+        self.assertEqual(len(json.loads(b''.join(response.streaming_content))), 12)
+        print("Test Case Passed!")
+
+    async def test_async_history_endpoints_read_archive(self):
+        print("\nTest Case: Async loan history endpoints include archived loans with include_archived")
+        await sync_to_async(archive_closed_loans)(self.as_of)
+        response = await self.async_client.get(f'/async/view-loans/customer-id/{self.customer.customer_id}/', {'include_archived': '1'})
+        self.assertEqual(len(response.json()), 5)
+        response = await self.async_client.get(f'/async/view-loan/loan-id/{self.loans[1].loan_id}/', {'include_archived': '1'})
+        self.assertEqual(response.json()['loan_id'], self.loans[1].loan_id)
+        print("Test Case Passed!")
+
+    def test_archive_command(self):
+        print("\nTest Case: archive_loans command reports and moves closed loans")
+        out = StringIO()
+        call_command('archive_loans', '--as-of', self.as_of.isoformat(), '--dry-run', stdout=out)
+        self.assertIn('2 loan(s) can be archived', out.getvalue())
+        self.assertEqual(ArchivedLoan.objects.count(), 0)
+
+        out = StringIO()
+        call_command('archive_loans', '--as-of', self.as_of.isoformat(), stdout=out)
+        self.assertIn('Moved 2 closed loan(s)', out.getvalue())
+        self.assertEqual(Loan.objects.count(), 3)
+
+        # A later date would archive loans that still count as current, so it is refused
+        tomorrow = (date.today() + timedelta(days=1)).isoformat()
+        with self.assertRaises(CommandError):
+            call_command('archive_loans', '--as-of', tomorrow, stdout=StringIO())
+        with self.assertRaises(ValueError):
+            archive_closed_loans(date(self.year + 6, 1, 1))
+        self.assertEqual(Loan.objects.count(), 3)
+        print("Test Case Passed!")
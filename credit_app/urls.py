@@ -1,13 +1,19 @@
 from django.urls import path
-from .views import RegisterCustomerView, CheckLoanEligibilityView, CreateLoanView, ViewLoanDetails, ViewLoansByCustomer
+from .views import RegisterCustomerView, RegisterCustomerBatchView, CheckLoanEligibilityView, CheckLoanEligibilityBatchView, CreateLoanView, ViewLoanDetails, ViewLoansByCustomer, LoanScheduleView, CreditScoreHistoryView, MetricsView
 
 urlpatterns = [
     # Endpoint for registering a new customer
     path('register/', RegisterCustomerView.as_view(), name='register-customer'),
 
+    # Endpoint for registering a batch of customers with bulk inserts
+    path('register/batch/', RegisterCustomerBatchView.as_view(), name='register-customer-batch'),
+
     # Endpoint for checking loan eligibility
     path('check-eligibility/', CheckLoanEligibilityView.as_view(), name='check-eligibility'),
 
+    # Endpoint for checking loan eligibility for a batch of applications
+    path('check-eligibility/batch/', CheckLoanEligibilityBatchView.as_view(), name='check-eligibility-batch'),
+
     # Endpoint for creating a new loan
     path('create-loan/', CreateLoanView.as_view(), name='create-loan'),
 
@@ -16,4 +22,13 @@ urlpatterns = [
 
     # Endpoint for viewing all loans associated with a specific customer
     path('view-loans/customer-id/<int:customer_id>/', ViewLoansByCustomer.as_view(), name='view-loans-by-customer'),
+
+    # Endpoint streaming the amortization schedule of a specific loan
+    path('loan/<int:loan_id>/schedule/', LoanScheduleView.as_view(), name='loan-schedule'),
+
+    # Endpoint returning a customer's persisted credit score, optionally as of a point in time
+    path('score/customer-id/<int:customer_id>/', CreditScoreHistoryView.as_view(), name='credit-score-history'),
+
+    # Endpoint exposing per-endpoint request metrics to Prometheus
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
@@ -1,67 +1,444 @@
 # credit_app/utils.py
-from datetime import datetime
-from django.db import models
-from django.db.models import F
-from .models import Loan, Customer
+from datetime import date, datetime
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Least, Power
+from . import archive, locks, routers, rules, score_cache, score_history
+from .amortization import add_months
+from .vectorized import calculate_approved_limits
+from .models import CreditScoreSnapshot, Loan, Customer, CustomerLoanStats
 
-def calculate_credit_score(customer):
+
+def current_year_range(year):
+    """
+    Return a sargable start_date range filter for a calendar year.
+
+    A plain range on the column lets the database use the (customer, start_date)
+    index, where an extract on the year would not.
+
+    Args:
+    - year: int, Calendar year
+
+    Returns:
+    - dict: Lookup keyword arguments for Loan.objects.filter
+    """
+    return {'start_date__gte': date(year, 1, 1), 'start_date__lt': date(year + 1, 1, 1)}
+
+
+def remaining_principal_expression():
+    """
+    Return a database expression for the principal a loan still owes.
+
+    Uses the closed form of the annuity balance after k = min(emis_paid_on_time, tenure)
+    installments, P * ((1 + r)^n - (1 + r)^k) / ((1 + r)^n - 1) with r the monthly
+    rate, so the database computes it per row without a schedule. Interest-free
+    loans amortize linearly. Matches amortization.remaining_principal.
+
+    Returns:
+    - Expression: Remaining principal of the loan row
+    """
+    paid = Least(F('emis_paid_on_time'), F('tenure'))
+    growth = Value(1.0) + F('interest_rate') / Value(1200.0)
+    return Case(
+        When(tenure__lte=0, then=Value(0.0)),
+        When(interest_rate=0, then=F('loan_amount') * (F('tenure') - paid) / F('tenure')),
+        default=F('loan_amount') * (Power(growth, F('tenure')) - Power(growth, paid)) / (Power(growth, F('tenure')) - Value(1.0)),
+        output_field=FloatField(),
+    )
+
+
+class CustomerCreditSnapshot:
+    """
+    Every loan aggregate the scoring rules need for a single customer.
+
+    The aggregates are loaded with one conditional-aggregate query, so scoring a
+    customer and checking eligibility costs a single round-trip to the Loan table
+    instead of one query per rule.
+    """
+
+    def __init__(self, customer, total_loans=0, late_loans=0, current_year_loans=0,
+                 total_loan_amount=0, total_monthly_repayment=0, current_exposure=0, stats_updated_at=None):
+        self.customer = customer
+        self.total_loans = total_loans  # Number of loans taken in the past
+        self.late_loans = late_loans  # Number of loans with EMIs not paid on time
+        self.current_year_loans = current_year_loans  # Number of loans started in the current year
+        self.total_loan_amount = total_loan_amount or 0  # Sum of loan_amount over all loans
+        self.total_monthly_repayment = total_monthly_repayment or 0  # Sum of monthly_repayment over all loans
+        self.current_exposure = current_exposure or 0  # Remaining principal of loans that have not ended
+        self.stats_updated_at = stats_updated_at  # updated_at of the CustomerLoanStats row read, None if aggregated from loans
+
+    @staticmethod
+    def aggregates(as_of=None):
+        """
+        Return the conditional aggregates that make up a snapshot.
+
+        Args:
+        - as_of: date, Date the snapshot is taken on; sets the year of rule iii and the
+          loans counted as current for rule iv (defaults to today)
+
+        Returns:
+        - dict: Aggregate expressions keyed by snapshot attribute name
+        """
+        if as_of is None:
+            as_of = date.today()
+
+        return {
+            'total_loans': Count('loan_id'),
+            'late_loans': Count('loan_id', filter=Q(emis_paid_on_time__lt=F('tenure'))),
+            'current_year_loans': Count('loan_id', filter=Q(**current_year_range(as_of.year))),
+            'total_loan_amount': Sum('loan_amount'),
+            'total_monthly_repayment': Sum('monthly_repayment'),
+            'current_exposure': Sum(remaining_principal_expression(), filter=Q(end_date__gte=as_of)),
+        }
+
+    @classmethod
+    def from_stats(cls, customer, stats):
+        """
+        Build the snapshot from the customer's materialized CustomerLoanStats row.
+
+        Args:
+        - customer: Customer object
+        - stats: CustomerLoanStats object
+
+        Returns:
+        - CustomerCreditSnapshot: Aggregates for the customer's loans
+        """
+        return cls(customer,
+                   total_loans=stats.total_loans,
+                   late_loans=stats.late_loans,
+                   current_year_loans=stats.current_year_loans,
+                   total_loan_amount=stats.total_loan_amount,
+                   total_monthly_repayment=stats.total_monthly_repayment,
+                   current_exposure=stats.current_exposure,
+                   stats_updated_at=stats.updated_at)
+
+    @staticmethod
+    def usable_stats(customer, as_of=None):
+        """
+        Return the customer's CustomerLoanStats row if it was computed for as_of.
+
+        Uses the row cached by select_related('loan_stats') when present.
+
+        Args:
+        - customer: Customer object
+        - as_of: date, Date the snapshot is taken on (defaults to today)
+
+        Returns:
+        - CustomerLoanStats or None: The stats row, or None if it is missing or stale
+        """
+        if as_of is None:
+            as_of = date.today()
+
+        try:
+            stats = customer.loan_stats
+        except CustomerLoanStats.DoesNotExist:
+            return None
+
+        return stats if stats.as_of == as_of else None
+
+    @classmethod
+    def for_customer(cls, customer, as_of=None):
+        """
+        Load the snapshot for a customer.
+
+        Reads the materialized CustomerLoanStats row (a primary-key lookup, or no query
+        at all when it was loaded with select_related), and falls back to a single
+        aggregate query over the Loan table when the row is missing or stale. A stale
+        row is brought up to date with the result, so only the first check of the day
+        pays for the aggregate; results read from a replica are not written back.
+
+        Args:
+        - customer: Customer object
+        - as_of: date, Date the snapshot is taken on (defaults to today)
+
+        Returns:
+        - CustomerCreditSnapshot: Aggregates for the customer's loans
+        """
+        if as_of is None:
+            as_of = date.today()
+
+        try:
+            stats = customer.loan_stats
+        except CustomerLoanStats.DoesNotExist:
+            stats = None
+        if stats is not None and stats.as_of == as_of:
+            return cls.from_stats(customer, stats)
+
+        values = Loan.objects.filter(customer=customer).aggregate(**cls.aggregates(as_of))
+        values = archive.add_archived(values, archive.archived_totals([customer.customer_id]).get(customer.customer_id))
+        snapshot = cls(customer, **values)
+
+        if stats is not None and stats.as_of < as_of and routers.current_read_alias() is None:
+            # Only overwrite the row the snapshot replaces; a concurrent refresh has already moved as_of on.
+            # Aggregates read from a replica may lag the primary, so they are not written back.
+            CustomerLoanStats.objects.filter(customer_id=customer.customer_id, as_of=stats.as_of).update(
+                as_of=as_of, updated_at=timezone.now(), **{field: getattr(snapshot, field) for field in values})
+        return snapshot
+
+    @classmethod
+    async def afor_customer(cls, customer, as_of=None):
+        """
+        Async version of for_customer for ASGI views, using the async ORM.
+
+        Args:
+        - customer: Customer object
+        - as_of: date, Date the snapshot is taken on (defaults to today)
+
+        Returns:
+        - CustomerCreditSnapshot: Aggregates for the customer's loans
+        """
+        if as_of is None:
+            as_of = date.today()
+
+        if Customer.loan_stats.is_cached(customer):
+            stats = cls.usable_stats(customer, as_of)
+        else:
+            stats = await CustomerLoanStats.objects.filter(customer_id=customer.customer_id, as_of=as_of).afirst()
+        if stats is not None:
+            return cls.from_stats(customer, stats)
+
+        values = await Loan.objects.filter(customer_id=customer.customer_id).aaggregate(**cls.aggregates(as_of))
+        totals = await archive.aarchived_totals([customer.customer_id])
+        return cls(customer, **archive.add_archived(values, totals.get(customer.customer_id)))
+
+    @classmethod
+    def for_customers(cls, customers, as_of=None, chunk_size=2000):
+        """
+        Load snapshots for many customers with set-based grouped aggregate queries.
+
+        Args:
+        - customers: iterable of Customer objects
+        - as_of: date, Date the snapshots are taken on (defaults to today); for a past date
+          only loans that had started by then are counted
+        - chunk_size: int, Number of customer ids per query
+
+        Returns:
+        - dict: CustomerCreditSnapshot objects keyed by customer_id
+        """
+        if as_of is None:
+            as_of = date.today()
+
+        customers = {customer.customer_id: customer for customer in customers}
+        snapshots = {}
+
+        # Customers loaded with select_related('loan_stats') are served from their stats row
+        for customer_id, customer in customers.items():
+            if Customer.loan_stats.is_cached(customer):
+                stats = cls.usable_stats(customer, as_of)
+                if stats is not None:
+                    snapshots[customer_id] = cls.from_stats(customer, stats)
+
+        aggregates = cls.aggregates(as_of)
+        customer_ids = [customer_id for customer_id in customers if customer_id not in snapshots]
+
+        # For a past date only the loans that had started by then count; the archive summary
+        # has no dates, so archived loans are then aggregated from their own rows
+        past = as_of < date.today()
+        loans = Loan.objects.filter(start_date__lte=as_of) if past else Loan.objects.all()
+
+        for start in range(0, len(customer_ids), chunk_size):
+            chunk = customer_ids[start:start + chunk_size]
+            rows = (
+                loans.filter(customer_id__in=chunk)
+                .values('customer_id')
+                .annotate(**aggregates)
+                .order_by()
+            )
+            values = {row.pop('customer_id'): row for row in rows}
+            archived = archive.archived_aggregates(chunk, aggregates, as_of) if past else archive.archived_totals(chunk)
+            for customer_id, totals in archived.items():
+                values[customer_id] = archive.add_archived(values.get(customer_id, {}), totals)
+            for customer_id, row in values.items():
+                snapshots[customer_id] = cls(customers[customer_id], **row)
+
+        # Customers without any loans still get an (empty) snapshot
+        for customer_id in customer_ids:
+            if customer_id not in snapshots:
+                snapshots[customer_id] = cls(customers[customer_id])
+
+        return snapshots
+
+
+def calculate_credit_score(customer, snapshot=None, ruleset=None):
     """
     Calculate the credit score for a customer based on various rules.
 
-    Rules:
+    Rules (as defined by the rule set, rules.BUILTIN_RULES by default):
     i. Deduct points for EMIs not paid on time
     ii. Deduct points for the number of loans taken in the past
     iii. Deduct points for loan activity in the current year
-    iv. Deduct points if the sum of current loans > approved limit
+    iv. Deduct points if the outstanding principal of current loans > approved limit
 
     Args:
     - customer: Customer object
+    - snapshot: CustomerCreditSnapshot, Preloaded loan aggregates (loaded if not given)
+    - ruleset: CompiledRuleSet, Rules to apply (the builtin rules if not given)
 
     Returns:
     - int: Calculated credit score
     """
-    credit_score = 100  # Start with a base score of 100
+    if snapshot is None:
+        snapshot = CustomerCreditSnapshot.for_customer(customer)
+
+    return (ruleset or rules.BUILTIN).score(snapshot, customer.approved_limit)
+
+
+def score_snapshot(snapshot, ruleset):
+    """
+    Score a snapshot and append the result to the customer's score history.
+
+    A score persisted in the last CREDIT_SCORE_SNAPSHOT_REUSE_SECONDS from the same
+    stats row, salary, limit and rules is returned instead of writing a new row, so
+    the history answers what the score was at any decision without a row per check.
+
+    Args:
+    - snapshot: CustomerCreditSnapshot, Loan aggregates of the customer
+    - ruleset: CompiledRuleSet, Rules the customer is scored with
+
+    Returns:
+    - CreditScoreSnapshot: The reused or new history row holding the score
+    """
+    row = score_history.latest_score(snapshot.customer.customer_id) if snapshot.stats_updated_at else None
+    if score_history.is_reusable(row, snapshot, ruleset.version):
+        return row
+
+    credit_score = ruleset.score(snapshot, snapshot.customer.approved_limit)
+    return score_history.record_score(snapshot, credit_score, ruleset.version)
+
+
+async def ascore_snapshot(snapshot, ruleset):
+    # Async version of score_snapshot for ASGI views
+    row = await score_history.alatest_score(snapshot.customer.customer_id) if snapshot.stats_updated_at else None
+    if score_history.is_reusable(row, snapshot, ruleset.version):
+        return row
+
+    credit_score = ruleset.score(snapshot, snapshot.customer.approved_limit)
+    return await score_history.arecord_score(snapshot, credit_score, ruleset.version)
+
+
+def stale_cache_hit(customer, entry):
+    # Score history row to append for a decision served from the cache, or None while the
+    # row the entry came from still stands for it (the same window score_snapshot reuses rows in)
+    if score_history.covers(entry['recorded_at']):
+        return None
+    return score_history.cached_score_row(customer.customer_id, entry)
+
+
+def get_credit_score_and_emis(customer, snapshot=None, ruleset=None):
+    """
+    Return the customer's credit score and current EMI total, served from the score cache when possible.
+
+    Every decision is covered by the score history: on a cache hit, the cached
+    score is appended again once the row it came from is older than the reuse window.
+
+    Args:
+    - customer: Customer object
+    - snapshot: CustomerCreditSnapshot, Preloaded loan aggregates used on a cache miss (loaded if not given)
+    - ruleset: CompiledRuleSet, Rules the customer is scored with (looked up if not given)
+
+    Returns:
+    - tuple: (credit_score, total_current_emis)
+    """
+    ruleset = ruleset or rules.for_customer(customer.customer_id)
+    entry = score_cache.lookup(customer, ruleset.version)
+    if entry is not None:
+        row = stale_cache_hit(customer, entry)
+        if row is not None:
+            row.save(force_insert=True)
+            score_cache.store(customer, entry['total_current_emis'], row)
+        return entry['credit_score'], entry['total_current_emis']
+
+    snapshot = snapshot if snapshot is not None else CustomerCreditSnapshot.for_customer(customer)
+    row = score_snapshot(snapshot, ruleset)
+    score_cache.store(customer, snapshot.total_monthly_repayment, row)
+    return row.credit_score, snapshot.total_monthly_repayment
+
+
+def get_credit_scores_and_emis(snapshots, rulebook=None):
+    """
+    Batch version of get_credit_score_and_emis for many customers.
+
+    Cache misses are scored together: the reusable persisted scores are read with
+    one query and the new ones, with the cache hits due a new history row, are
+    appended to the score history with one insert.
+
+    Args:
+    - snapshots: dict, CustomerCreditSnapshot objects keyed by customer_id
+    - rulebook: RuleBook, Rule sets the customers are assigned to (the current one if not given)
 
-    # Rule i: Deduct points for EMIs not paid on time
-    emis_not_paid_on_time = Loan.objects.filter(customer=customer, emis_paid_on_time__lt=F('tenure')).count()
-    credit_score -= emis_not_paid_on_time * 2  # Deduct 2 points for each EMI not paid on time
+    Returns:
+    - dict: (credit_score, total_current_emis) tuples keyed by customer_id
+    """
+    rulebook = rulebook or rules.get_rulebook()
+    rulesets = {customer_id: rulebook.for_customer(customer_id) for customer_id in snapshots}
+    results = {}
+    new_rows = {}
+    for customer_id, snapshot in snapshots.items():
+        entry = score_cache.lookup(snapshot.customer, rulesets[customer_id].version)
+        if entry is not None:
+            results[customer_id] = (entry['credit_score'], entry['total_current_emis'])
+            row = stale_cache_hit(snapshot.customer, entry)
+            if row is not None:
+                new_rows[customer_id] = row
 
-    # Rule ii: Deduct points for the number of loans taken in the past
-    total_loans_taken = Loan.objects.filter(customer=customer).count()
-    credit_score -= total_loans_taken * 3  # Deduct 3 points for each loan taken in the past
+    missing = {customer_id: snapshot for customer_id, snapshot in snapshots.items() if customer_id not in results}
+    reusable = score_history.reusable_scores(missing, {customer_id: rulesets[customer_id].version for customer_id in missing})
+    rows = dict(reusable)
+    for customer_id, snapshot in missing.items():
+        if customer_id not in reusable:
+            ruleset = rulesets[customer_id]
+            credit_score = ruleset.score(snapshot, snapshot.customer.approved_limit)
+            new_rows[customer_id] = score_history.new_score_snapshot(snapshot, credit_score, ruleset.version)
+        results[customer_id] = (rows.get(customer_id, new_rows.get(customer_id)).credit_score, snapshot.total_monthly_repayment)
 
-    # Rule iii: Deduct points for loan activity in the current year
-    current_year = datetime.now().year
-    loans_in_current_year = Loan.objects.filter(customer=customer, start_date__year=current_year).count()
-    credit_score -= loans_in_current_year * 5  # Deduct 5 points for loan activity in the current year
+    if new_rows:
+        CreditScoreSnapshot.objects.bulk_create(new_rows.values())
+    rows.update(new_rows)
+    for customer_id, row in rows.items():
+        score_cache.store(snapshots[customer_id].customer, results[customer_id][1], row)
+    return results
 
-    # Rule iv: Deduct points if the sum of current loans > approved limit
-    total_current_loan_amount = Loan.objects.filter(customer=customer).aggregate(models.Sum('loan_amount'))['loan_amount__sum'] or 0
-    if total_current_loan_amount > customer.approved_limit:
-        credit_score = 0
 
-    return max(credit_score, 0)  # Ensure credit score is not negative
+async def aget_credit_score_and_emis(customer, ruleset=None):
+    """
+    Async version of get_credit_score_and_emis for ASGI views.
 
+    Args:
+    - customer: Customer object
+    - ruleset: CompiledRuleSet, Rules the customer is scored with (looked up if not given)
 
-def calculate_corrected_interest_rate(credit_score, interest_rate):
+    Returns:
+    - tuple: (credit_score, total_current_emis)
+    """
+    ruleset = ruleset or (await rules.aget_rulebook()).for_customer(customer.customer_id)
+    entry = await score_cache.alookup(customer, ruleset.version)
+    if entry is not None:
+        row = stale_cache_hit(customer, entry)
+        if row is not None:
+            await row.asave(force_insert=True)
+            await score_cache.astore(customer, entry['total_current_emis'], row)
+        return entry['credit_score'], entry['total_current_emis']
+
+    snapshot = await CustomerCreditSnapshot.afor_customer(customer)
+    row = await ascore_snapshot(snapshot, ruleset)
+    await score_cache.astore(customer, snapshot.total_monthly_repayment, row)
+    return row.credit_score, snapshot.total_monthly_repayment
+
+
+def calculate_corrected_interest_rate(credit_score, interest_rate, ruleset=None):
     """
     Calculate the corrected interest rate based on the customer's credit score.
 
     Args:
     - credit_score: int, Customer's credit score
     - interest_rate: float, Initial interest rate
+    - ruleset: CompiledRuleSet, Rules to apply (the builtin rules if not given)
 
     Returns:
     - float or None: Corrected interest rate or None if not applicable
     """
-    if credit_score > 50:
-        return interest_rate
-    elif 50 >= credit_score > 30:
-        return max(interest_rate, 12)
-    elif 30 >= credit_score > 10:
-        return max(interest_rate, 16)
-    else:
-        return None
+    return (ruleset or rules.BUILTIN).corrected_rate(credit_score, interest_rate)
 
 
 def calculate_monthly_installment(loan_amount, tenure, interest_rate):
@@ -74,8 +451,14 @@ def calculate_monthly_installment(loan_amount, tenure, interest_rate):
     - interest_rate: float, Interest rate per annum
 
     Returns:
-    - float: Calculated monthly installment rounded to 2 decimal places
+    - float or None: Calculated monthly installment rounded to 2 decimal places, or None if no rate applies
     """
+    if interest_rate is None:
+        return None  # No corrected interest rate means no installment can be offered
+
+    if interest_rate == 0:
+        return round(loan_amount / tenure, 2)  # Interest-free loans are repaid in equal parts
+
     interest_rate /= 100  # Convert percentage to decimal
     monthly_interest_rate = interest_rate / 12
     numerator = loan_amount * monthly_interest_rate
@@ -86,35 +469,29 @@ def calculate_monthly_installment(loan_amount, tenure, interest_rate):
     return round(monthly_installment, 2)  # Round to 2 decimal places
 
 
-def check_loan_eligibility(customer, loan_amount, interest_rate, tenure):
+def decide_loan_eligibility(credit_score, total_current_emis, monthly_salary, loan_amount, interest_rate, tenure, ruleset=None):
     """
-    Check the eligibility of a loan based on the customer's credit score and provided loan details.
+    Decide a loan application from the customer's credit score and current EMIs.
 
     Args:
-    - customer: Customer object
+    - credit_score: int, Customer's credit score
+    - total_current_emis: float, Sum of the customer's current monthly repayments
+    - monthly_salary: int, Customer's monthly salary
     - loan_amount: float, Requested loan amount
     - interest_rate: float, Requested interest rate
     - tenure: int, Requested loan tenure in months
+    - ruleset: CompiledRuleSet, Rules to apply (the builtin rules if not given)
 
     Returns:
     - dict: Loan approval details including interest rate, corrected interest rate, tenure, and monthly installment
     """
-    credit_score = calculate_credit_score(customer)
-    corrected_interest_rate = calculate_corrected_interest_rate(credit_score, interest_rate)
+    ruleset = ruleset or rules.BUILTIN
+    corrected_interest_rate = ruleset.corrected_rate(credit_score, interest_rate)
     monthly_installment = calculate_monthly_installment(loan_amount, tenure, corrected_interest_rate)
 
-    total_current_emis = Loan.objects.filter(customer=customer).aggregate(models.Sum('monthly_repayment'))['monthly_repayment__sum'] or 0
-    monthly_salary = customer.monthly_salary
-
-    # Check loan eligibility based on the provided conditions
-    approval = credit_score > 0 and (
-        (credit_score > 50) or
-        (50 >= credit_score > 30 and corrected_interest_rate > 12) or
-        (30 >= credit_score > 10 and corrected_interest_rate > 16)
-    )
+    # Check loan eligibility against the rule set's score bands and EMI limit
+    approval = ruleset.approves(credit_score, corrected_interest_rate, total_current_emis, monthly_installment, monthly_salary)
 
-    approval = approval and (total_current_emis + monthly_installment <= 0.5 * monthly_salary)
-    
     if approval:
         return {
             'approval': approval,
@@ -131,3 +508,146 @@ def check_loan_eligibility(customer, loan_amount, interest_rate, tenure):
             'tenure': None,
             'monthly_installment': None
         }
+
+
+def check_loan_eligibility(customer, loan_amount, interest_rate, tenure, snapshot=None):
+    """
+    Check the eligibility of a loan based on the customer's credit score and provided loan details.
+
+    Args:
+    - customer: Customer object
+    - loan_amount: float, Requested loan amount
+    - interest_rate: float, Requested interest rate
+    - tenure: int, Requested loan tenure in months
+    - snapshot: CustomerCreditSnapshot, Preloaded loan aggregates used on a score cache miss (loaded if not given)
+
+    Returns:
+    - dict: Loan approval details including interest rate, corrected interest rate, tenure, and monthly installment
+    """
+    ruleset = rules.for_customer(customer.customer_id)
+    credit_score, total_current_emis = get_credit_score_and_emis(customer, snapshot, ruleset)
+    return decide_loan_eligibility(credit_score, total_current_emis, customer.monthly_salary, loan_amount, interest_rate, tenure,
+                                   ruleset)
+
+
+async def acheck_loan_eligibility(customer, loan_amount, interest_rate, tenure):
+    """
+    Async version of check_loan_eligibility for ASGI views.
+
+    Args:
+    - customer: Customer object
+    - loan_amount: float, Requested loan amount
+    - interest_rate: float, Requested interest rate
+    - tenure: int, Requested loan tenure in months
+
+    Returns:
+    - dict: Loan approval details including interest rate, corrected interest rate, tenure, and monthly installment
+    """
+    ruleset = (await rules.aget_rulebook()).for_customer(customer.customer_id)
+    credit_score, total_current_emis = await aget_credit_score_and_emis(customer, ruleset)
+    return decide_loan_eligibility(credit_score, total_current_emis, customer.monthly_salary, loan_amount, interest_rate, tenure,
+                                   ruleset)
+
+
+def create_customers(rows, batch_size=2000):
+    """
+    Insert many validated customers with batched inserts in one transaction.
+
+    Approved limits are computed in one vectorized pass with the same formula as
+    Customer.save. bulk_create skips save() and the post_save signal, so the empty
+    CustomerLoanStats rows are inserted and the replica reads redirected here as well.
+
+    Args:
+    - rows: list of dict, Validated customer fields (first_name, last_name, age, phone_number, monthly_salary)
+    - batch_size: int, Number of rows per INSERT statement
+
+    Returns:
+    - list: The created Customer objects, with their customer_id, in input order
+    """
+    fields = ['first_name', 'last_name', 'age', 'phone_number', 'monthly_salary']
+    limits = calculate_approved_limits([row['monthly_salary'] for row in rows]).tolist()
+    customers = [Customer(**{field: row[field] for field in fields}, approved_limit=limit) for row, limit in zip(rows, limits)]
+
+    if not customers:
+        return customers
+
+    today = date.today()
+    with transaction.atomic():
+        Customer.objects.bulk_create(customers, batch_size=batch_size)
+        CustomerLoanStats.objects.bulk_create(
+            [CustomerLoanStats(customer_id=customer.customer_id, as_of=today) for customer in customers], batch_size=batch_size)
+        routers.mark_written(customer.customer_id for customer in customers)
+    return customers
+
+
+def create_approved_loan(customer, loan_amount, interest_rate, tenure):
+    """
+    Insert an approved loan for a customer.
+
+    CustomerLoanStats and the score cache are updated by signal handlers in the
+    same transaction as the insert.
+
+    Args:
+    - customer: Customer object
+    - loan_amount: float, Loan amount
+    - interest_rate: float, Interest rate per annum
+    - tenure: int, Loan tenure in months
+
+    Returns:
+    - Loan: The created loan
+    """
+    # Calculate start_date (current date)
+    start_date = datetime.now().date()
+
+    # The last installment falls due tenure calendar months after the start date
+    end_date = add_months(start_date, tenure)
+
+    # Calculate monthly_repayment
+    monthly_repayment = calculate_monthly_installment(loan_amount, tenure, interest_rate)
+
+    with transaction.atomic():
+        return Loan.objects.create(
+            customer=customer,
+            loan_amount=loan_amount,
+            interest_rate=interest_rate,
+            tenure=tenure,
+            start_date=start_date,
+            emis_paid_on_time=0,
+            end_date=end_date,
+            monthly_repayment=monthly_repayment
+        )
+
+
+def create_loan_if_eligible(customer_id, loan_amount, interest_rate, tenure):
+    """
+    Check a loan application and insert the loan if approved, as one atomic step.
+
+    The customer is locked for the duration of the check and the insert, so two
+    concurrent applications for the same customer are decided one after the other
+    and cannot both pass the EMI and approved-limit checks against the same loans.
+    The score cache is bypassed because it may still hold a score computed before
+    the previous loan committed; the score used for the decision is persisted to
+    the score history.
+
+    Args:
+    - customer_id: int, Customer applying for the loan
+    - loan_amount: float, Requested loan amount
+    - interest_rate: float, Requested interest rate
+    - tenure: int, Requested loan tenure in months
+
+    Returns:
+    - tuple: (eligibility result dict, created Loan or None)
+    """
+    # Pick the rules before locking: a first load of the rule sets reads the database
+    ruleset = rules.for_customer(customer_id)
+    with locks.lock_customer(customer_id) as customer:
+        snapshot = CustomerCreditSnapshot.for_customer(customer)
+        credit_score = score_snapshot(snapshot, ruleset).credit_score
+        eligibility_result = decide_loan_eligibility(credit_score, snapshot.total_monthly_repayment, customer.monthly_salary,
+                                                     loan_amount, interest_rate, tenure, ruleset)
+
+        new_loan = None
+        if eligibility_result['approval']:
+            new_loan = create_approved_loan(customer, loan_amount, interest_rate, tenure)
+
+        return eligibility_result, new_loan
@@ -0,0 +1,115 @@
+# credit_app/vectorized.py
+import numpy as np
+from . import rules
+
+
+def calculate_approved_limits(monthly_salaries):
+    """
+    Calculate the default approved limits of many customers at once.
+
+    Applies the same formula as Customer.save: 36 monthly salaries rounded to the
+    nearest lakh, with ties rounded to even like Python's round.
+
+    Args:
+    - monthly_salaries: array of int, Monthly salaries
+
+    Returns:
+    - ndarray of int: Approved limits
+    """
+    return np.round(np.asarray(monthly_salaries, dtype=np.int64) * 36, -5)
+
+
+def calculate_credit_scores(late_loans, total_loans, current_year_loans, current_exposure, approved_limit, ruleset=None):
+    """
+    Calculate credit scores for many customers at once.
+
+    Applies the same rules as utils.calculate_credit_score to arrays of loan aggregates.
+
+    Args:
+    - late_loans: array of int, Number of loans with EMIs not paid on time
+    - total_loans: array of int, Number of loans taken in the past
+    - current_year_loans: array of int, Number of loans started in the current year
+    - current_exposure: array of float, Remaining principal of current loans
+    - approved_limit: array of float, Approved credit limit
+    - ruleset: CompiledRuleSet, Rules to apply (the builtin rules if not given)
+
+    Returns:
+    - ndarray of int: Calculated credit scores
+    """
+    return (ruleset or rules.BUILTIN).scores(late_loans, total_loans, current_year_loans, current_exposure, approved_limit)
+
+
+def calculate_corrected_interest_rates(credit_scores, interest_rates, ruleset=None):
+    """
+    Calculate corrected interest rates for many credit scores at once.
+
+    Args:
+    - credit_scores: array of int, Customers' credit scores
+    - interest_rates: array of float, Initial interest rates
+    - ruleset: CompiledRuleSet, Rules to apply (the builtin rules if not given)
+
+    Returns:
+    - ndarray of float: Corrected interest rates, NaN where the scalar path returns None
+    """
+    return (ruleset or rules.BUILTIN).corrected_rates(credit_scores, interest_rates)
+
+
+def calculate_monthly_installments(loan_amounts, tenures, interest_rates):
+    """
+    Calculate monthly installments for many loans at once.
+
+    Args:
+    - loan_amounts: array of float, Loan amounts
+    - tenures: array of int, Loan tenures in months
+    - interest_rates: array of float, Interest rates per annum (NaN for no rate)
+
+    Returns:
+    - ndarray of float: Monthly installments rounded to 2 decimal places, NaN where no rate applies
+      or the tenure is not positive
+    """
+    loan_amounts = np.asarray(loan_amounts, dtype=np.float64)
+    tenures = np.asarray(tenures, dtype=np.float64)
+    monthly_interest_rates = np.asarray(interest_rates, dtype=np.float64) / 100 / 12
+
+    # Interest-free loans and loans without a term would divide by zero below, so price them separately
+    interest_free = monthly_interest_rates == 0
+    no_term = ~(tenures > 0)
+    safe_rates = np.where(interest_free, 1.0, monthly_interest_rates)
+    safe_tenures = np.where(no_term, 1.0, tenures)
+    monthly_installments = loan_amounts * safe_rates / (1 - (1 + safe_rates) ** -safe_tenures)
+    monthly_installments = np.where(interest_free, loan_amounts / safe_tenures, monthly_installments)
+    monthly_installments = np.where(no_term, np.nan, monthly_installments)
+
+    return np.round(monthly_installments, 2)
+
+
+def check_loan_eligibilities(credit_scores, loan_amounts, interest_rates, tenures, total_current_emis, monthly_salaries,
+                             ruleset=None):
+    """
+    Check the eligibility of many loans at once.
+
+    Applies the same rules as utils.check_loan_eligibility to arrays of precomputed credit scores.
+
+    Args:
+    - credit_scores: array of int, Customers' credit scores
+    - loan_amounts: array of float, Requested loan amounts
+    - interest_rates: array of float, Requested interest rates
+    - tenures: array of int, Requested loan tenures in months
+    - total_current_emis: array of float, Sum of the customers' current monthly repayments
+    - monthly_salaries: array of float, Customers' monthly salaries
+    - ruleset: CompiledRuleSet, Rules to apply (the builtin rules if not given)
+
+    Returns:
+    - dict: Arrays of approval flags, corrected interest rates and monthly installments
+    """
+    ruleset = ruleset or rules.BUILTIN
+    corrected_interest_rates = ruleset.corrected_rates(credit_scores, interest_rates)
+    monthly_installments = calculate_monthly_installments(loan_amounts, tenures, corrected_interest_rates)
+    approvals = ruleset.approvals(credit_scores, corrected_interest_rates, total_current_emis, monthly_installments,
+                                  monthly_salaries)
+
+    return {
+        'approval': approvals,
+        'corrected_interest_rate': corrected_interest_rates,
+        'monthly_installment': monthly_installments,
+    }
@@ -1,12 +1,29 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Customer,Loan
-from .serializers import CustomerSerializer,LoanSerializer
-from .utils import check_loan_eligibility, calculate_monthly_installment
-from datetime import datetime,timedelta
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views import View
+from . import rules
+from .routers import read_from_replica, replica_reads
+from .amortization import amortization_schedule
+from .idempotency import idempotent
+from .metrics import registry
+from .middleware import get_sample_rate
+from .models import ArchivedLoan,Customer,Loan
+from .score_history import score_as_of
+from .serializers import CustomerBatchSerializer, CustomerSerializer, LoanApplicationSerializer
+from .utils import (CustomerCreditSnapshot, check_loan_eligibility, create_customers, create_loan_if_eligible,
+                    decide_loan_eligibility, get_credit_scores_and_emis)
+import json
+
+def include_archived(params):
+    # History endpoints read archived loans too when asked with ?include_archived=1
+    return params.get('include_archived') in ('1', 'true')
 
 class RegisterCustomerView(APIView):
+    @idempotent('register')
     def post(self, request, *args, **kwargs):
         # Validate incoming data using CustomerSerializer
         serializer = CustomerSerializer(data=request.data)
@@ -38,21 +55,59 @@ class RegisterCustomerView(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CheckLoanEligibilityView(APIView):
+class RegisterCustomerBatchView(APIView):
+    # Largest number of customers accepted in one request
+    max_batch_size = 10000
+
+    # Number of customers per INSERT statement
+    insert_batch_size = 2000
+
+    @idempotent('register-batch')
     def post(self, request, *args, **kwargs):
-        try:
-            # Extract data from the request
-            customer_id = request.data.get('customer_id')
-            loan_amount = request.data.get('loan_amount')
-            interest_rate = request.data.get('interest_rate')
-            tenure = request.data.get('tenure')
+        # Validate every row on its own; invalid rows are reported and the rest are still created
+        serializer = CustomerBatchSerializer(data=request.data, many=True, max_length=self.max_batch_size)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-            # Check if values are greater than zero
-            if not all(value > 0 for value in [loan_amount, interest_rate, tenure]):
-                return Response({'error': 'Loan amount, interest rate, and tenure must be greater than zero.'}, status=status.HTTP_400_BAD_REQUEST)
+        rows = serializer.validated_data
+        customers = iter(create_customers([row for row in rows if row is not None], batch_size=self.insert_batch_size))
+
+        # Report the created customer or the errors of each row, in input order
+        response_data = []
+        for index, row in enumerate(rows):
+            if row is None:
+                response_data.append({'customer_id': None, 'errors': serializer.row_errors[index]})
+                continue
+            customer = next(customers)
+            response_data.append({'customer_id': customer.customer_id, 'approved_limit': customer.approved_limit})
+
+        # 201 when every row was created (an empty list included), 207 for a partial batch, 400 when every row failed
+        created = len(rows) - len(serializer.row_errors)
+        if not serializer.row_errors:
+            response_status = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'created': created, 'results': response_data}, status=response_status)
 
-            # Retrieve customer based on customer_id
-            customer = Customer.objects.get(customer_id=customer_id)
+
+class CheckLoanEligibilityView(APIView):
+    @replica_reads(customer_id=lambda request, kwargs: request.data.get('customer_id'))
+    def post(self, request, *args, **kwargs):
+        try:
+            # Validate the customer_id and check that the loan values are greater than zero
+            serializer = LoanApplicationSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response({'error': serializer.error_message()}, status=status.HTTP_400_BAD_REQUEST)
+            application = serializer.validated_data
+            customer_id = application['customer_id']
+            loan_amount = application['loan_amount']
+            interest_rate = application['interest_rate']
+            tenure = application['tenure']
+
+            # Retrieve customer and its materialized loan aggregates based on customer_id
+            customer = Customer.objects.select_related('loan_stats').get(customer_id=customer_id)
 
             # Check loan eligibility using utility function
             eligibility_result = check_loan_eligibility(customer, loan_amount, interest_rate, tenure)
@@ -65,7 +120,81 @@ class CheckLoanEligibilityView(APIView):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+class CheckLoanEligibilityBatchView(APIView):
+    # Largest number of applications accepted in one request
+    max_batch_size = 10000
+
+    # Number of customer ids loaded per query when scoring a batch
+    chunk_size = 2000
+
+    def parse_application(self, application):
+        # Validate a single application as the single-application endpoint does and return its customer_id and loan details
+        if not isinstance(application, dict):
+            raise ValueError('Each application must be an object.')
+
+        serializer = LoanApplicationSerializer(data=application)
+        if not serializer.is_valid():
+            raise ValueError(serializer.error_message())
+        application = serializer.validated_data
+        return application['customer_id'], application['loan_amount'], application['interest_rate'], application['tenure']
+
+    def post(self, request, *args, **kwargs):
+        applications = request.data
+        if not isinstance(applications, list):
+            return Response({'error': 'Expected a list of loan applications.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(applications) > self.max_batch_size:
+            return Response({'error': f'A batch may hold at most {self.max_batch_size} applications.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Validate every row up front; bad rows keep their error instead of failing the batch
+        parsed = []
+        for application in applications:
+            try:
+                parsed.append(self.parse_application(application))
+            except ValueError as e:
+                parsed.append(e)
+
+        # Load all requested customers and their loan aggregates with set-based queries
+        customer_ids = {row[0] for row in parsed if not isinstance(row, Exception)}
+        customers = Customer.objects.select_related('loan_stats').in_bulk(customer_ids)
+        snapshots = CustomerCreditSnapshot.for_customers(customers.values(), chunk_size=self.chunk_size)
+
+        # Score and decide the whole batch with one RuleBook, even if the rules are reloaded meanwhile
+        rulebook = rules.get_rulebook()
+        scores = get_credit_scores_and_emis(snapshots, rulebook)
+
+        # Score each application in input order
+        response_data = []
+        for application, row in zip(applications, parsed):
+            if isinstance(row, Exception):
+                customer_id = application.get('customer_id') if isinstance(application, dict) else None
+                response_data.append({'customer_id': customer_id, 'error': str(row)})
+                continue
+
+            customer_id, loan_amount, interest_rate, tenure = row
+            customer = customers.get(customer_id)
+            if customer is None:
+                response_data.append({'customer_id': customer_id, 'error': 'Customer matching query does not exist.'})
+                continue
+
+            try:
+                credit_score, total_current_emis = scores[customer_id]
+                eligibility_result = decide_loan_eligibility(credit_score, total_current_emis, customer.monthly_salary,
+                                                             loan_amount, interest_rate, tenure, rulebook.for_customer(customer_id))
+            except Exception as e:
+                response_data.append({'customer_id': customer_id, 'error': str(e)})
+                continue
+
+            # Adjust interest_rate if needed, as the single-application endpoint does
+            if interest_rate != eligibility_result['corrected_interest_rate']:
+                eligibility_result['interest_rate'] = eligibility_result['corrected_interest_rate']
+
+            response_data.append({'customer_id': customer_id, **eligibility_result})
+
+        return Response(response_data, status=status.HTTP_200_OK)
+
 class CreateLoanView(APIView):
+    @idempotent('create-loan')
     def post(self, request, *args, **kwargs):
         try:
             # Extract data from the request
@@ -78,42 +207,18 @@ class CreateLoanView(APIView):
             if not all(value > 0 for value in [loan_amount, interest_rate, tenure]):
                 return Response({'error': 'Loan amount, interest rate, and tenure must be greater than zero.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Retrieve customer based on customer_id
-            customer = Customer.objects.get(customer_id=customer_id)
-
-            # Check loan eligibility using utility function
-            eligibility_result = check_loan_eligibility(customer, loan_amount, interest_rate, tenure)
+            # Check eligibility and create the loan while holding a lock on the customer
+            eligibility_result, new_loan = create_loan_if_eligible(customer_id, loan_amount, interest_rate, tenure)
 
             # Process loan creation based on eligibility
             if eligibility_result['approval']:
-                # Calculate start_date (current date)
-                start_date = datetime.now().date()
-
-                # Calculate end_date based on tenure
-                end_date = start_date + timedelta(days=30 * tenure)
-
-                # Calculate monthly_repayment
-                monthly_repayment = calculate_monthly_installment(loan_amount, tenure, interest_rate)
-
-                # Create a new Loan instance
-                new_loan = Loan.objects.create(
-                    customer=customer,
-                    loan_amount=loan_amount,
-                    interest_rate=interest_rate,
-                    tenure=tenure,
-                    start_date=start_date,
-                    emis_paid_on_time=0,
-                    end_date=end_date,
-                    monthly_repayment=monthly_repayment
-                )
-
                 # Prepare and send the response data
                 response_data = {
                     'loan_id': new_loan.loan_id,
                     'customer_id': customer_id,
                     'loan_approved': True,
                     'message': 'Loan approved',
-                    'monthly_installment': monthly_repayment
+                    'monthly_installment': new_loan.monthly_repayment
                 }
             else:
                 # Prepare and send the response data for non-approved loans
@@ -127,70 +232,237 @@ class CreateLoanView(APIView):
 
             return Response(response_data, status=status.HTTP_200_OK)
         except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            # Flagged as an exception response so a retry with the same Idempotency-Key runs again
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST, exception=True)
 
 class ViewLoanDetails(APIView):
-    def get(self, request, loan_id):
-        try:
-            # Retrieve loan based on loan_id
-            loan = Loan.objects.get(loan_id=loan_id)
-
-            # Serialize loan and customer data
-            loan_serializer = LoanSerializer(loan)
-            customer_serializer = CustomerSerializer(loan.customer)
+    # Loan and customer columns read by the endpoint, fetched in a single joined query
+    fields = ['loan_id', 'loan_amount', 'interest_rate', 'monthly_repayment', 'tenure',
+              'customer__customer_id', 'customer__first_name', 'customer__last_name', 'customer__phone_number', 'customer__age']
+
+    @staticmethod
+    def loan_details(loan):
+        # Build the response body from the projected loan and customer columns
+        customer_data = None
+        if loan['customer__customer_id'] is not None:
             customer_data = {
-                'customer_id': customer_serializer.data['customer_id'],
-                'first_name': customer_serializer.data['first_name'],
-                'last_name': customer_serializer.data['last_name'],
-                'phone_number': customer_serializer.data['phone_number'],
-                'age': customer_serializer.data['age'],
+                'customer_id': loan['customer__customer_id'],
+                'first_name': loan['customer__first_name'],
+                'last_name': loan['customer__last_name'],
+                'phone_number': loan['customer__phone_number'],
+                'age': loan['customer__age'],
             }
 
-            # Prepare and send the response data
-            response_data = {
-                'loan_id': loan_serializer.data['loan_id'],
-                'customer': customer_data,
-                'loan_amount': loan_serializer.data['loan_amount'],
-                'interest_rate': loan_serializer.data['interest_rate'],
-                'monthly_repayment': loan_serializer.data['monthly_repayment'],
-                'tenure': loan_serializer.data['tenure']
-            }
+        return {
+            'loan_id': loan['loan_id'],
+            'customer': customer_data,
+            'loan_amount': loan['loan_amount'],
+            'interest_rate': loan['interest_rate'],
+            'monthly_repayment': loan['monthly_repayment'],
+            'tenure': loan['tenure']
+        }
+
+    @classmethod
+    def find_loan(cls, loan_id, archived=False, fields=None):
+        # The loan as a plain dict of fields (the endpoint's by default), looked up in the archive too when archived is set
+        fields = fields or cls.fields
+        loan = Loan.objects.filter(loan_id=loan_id).values(*fields).first()
+        if loan is None and archived:
+            loan = ArchivedLoan.objects.filter(loan_id=loan_id).values(*fields).first()
+        return loan
 
-            return Response(response_data, status=status.HTTP_200_OK)
+    def get(self, request, loan_id):
+        try:
+            # Retrieve loan and customer data based on loan_id as a plain dict, from a replica when there is one
+            archived = include_archived(request.query_params)
+            with read_from_replica() as replica:
+                loan = self.find_loan(loan_id, archived)
+            if loan is None and replica is not None:
+                # The customer is unknown until the loan is read, so a loan too new for the replica is read from the primary
+                loan = self.find_loan(loan_id, archived)
+            if loan is None:
+                raise Loan.DoesNotExist('Loan matching query does not exist.')
+
+            # Prepare and send the response data
+            return Response(self.loan_details(loan), status=status.HTTP_200_OK)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 class ViewLoansByCustomer(APIView):
+    # Largest page a client may ask for with ?page_size=
+    max_page_size = 1000
+
+    # Number of rows fetched per database round trip in streaming mode
+    stream_chunk_size = 2000
+
+    # Columns needed to build a loan entry, read as plain dicts instead of model instances
+    fields = ['loan_id', 'loan_amount', 'interest_rate', 'monthly_repayment', 'tenure', 'emis_paid_on_time']
+
+    @staticmethod
+    def parse_positive_int(params, name):
+        # Read an optional positive integer query parameter
+        value = params.get(name)
+        if value in (None, ''):
+            return None
+        if not value.isdigit() or int(value) <= 0:
+            raise ValueError(f'{name} must be a positive integer.')
+        return int(value)
+
+    @staticmethod
+    def loan_entry(loan_data):
+        # Build the response entry of a single loan
+        return {
+            'loan_id': loan_data['loan_id'],
+            'loan_amount': loan_data['loan_amount'],
+            'interest_rate': loan_data['interest_rate'],
+            'monthly_installment': loan_data['monthly_repayment'],
+            # Calculate repayments_left based on tenure and emis_paid_on_time
+            'repayments_left': loan_data['tenure'] - loan_data['emis_paid_on_time'],
+        }
+
+    @classmethod
+    def loan_rows(cls, customer_id, cursor=None, archived=False):
+        """
+        Return the customer's loans in loan_id order as plain dicts.
+
+        Args:
+        - customer_id: int, Customer whose loans are listed
+        - cursor: int, Only loans with a greater loan_id (keyset pagination)
+        - archived: bool, Merge in the customer's archived loans
+
+        Returns:
+        - QuerySet: Rows with the fields of a loan entry
+        """
+        querysets = [Loan.objects.filter(customer_id=customer_id)]
+        if archived:
+            querysets.append(ArchivedLoan.objects.filter(customer_id=customer_id))
+        if cursor is not None:
+            querysets = [queryset.filter(loan_id__gt=cursor) for queryset in querysets]
+
+        rows = querysets[0].values(*cls.fields)
+        if len(querysets) > 1:
+            rows = rows.union(querysets[1].values(*cls.fields), all=True)
+        return rows.order_by('loan_id')
+
+    def stream(self, loans):
+        # Yield the loans as a JSON array without building the whole list in memory
+        rows = loans.iterator(chunk_size=self.stream_chunk_size)
+        first = next(rows, None)
+        if first is None:
+            return None
+
+        def generate():
+            yield '[' + json.dumps(self.loan_entry(first))
+            for row in rows:
+                yield ',' + json.dumps(self.loan_entry(row))
+            yield ']'
+
+        return StreamingHttpResponse(generate(), content_type='application/json', status=status.HTTP_200_OK)
+
+    @replica_reads(customer_id=lambda request, kwargs: kwargs['customer_id'])
     def get(self, request, customer_id, *args, **kwargs):
         try:
-            # Retrieve all loans for the given customer_id
-            loans = Loan.objects.filter(customer__customer_id=customer_id)
-
-            # Serialize loan data
-            loan_serializer = LoanSerializer(loans, many=True)
-
-            # Create a response with the serialized data
-            response_data = []
-            for loan_data in loan_serializer.data:
-                # Calculate repayments_left based on tenure and emis_paid_on_time
-                repayments_left = loan_data['tenure'] - loan_data['emis_paid_on_time']
-
-                # Add additional information to the response
-                loan_response = {
-                    'loan_id': loan_data['loan_id'],
-                    'loan_amount': loan_data['loan_amount'],
-                    'interest_rate': loan_data['interest_rate'],
-                    'monthly_installment': loan_data['monthly_repayment'],
-                    'repayments_left': repayments_left,
-                }
+            # Keyset pagination parameters: the last loan_id already seen and the page size
+            try:
+                cursor = self.parse_positive_int(request.query_params, 'cursor')
+                page_size = self.parse_positive_int(request.query_params, 'page_size')
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if page_size is not None:
+                page_size = min(page_size, self.max_page_size)
+
+            # Retrieve the loans for the given customer_id in loan_id order
+            loans = self.loan_rows(customer_id, cursor, include_archived(request.query_params))
+
+            # Stream the loans straight from the database cursor when asked to
+            if request.query_params.get('stream') in ('1', 'true'):
+                if page_size is not None:
+                    loans = loans[:page_size]
+                response = self.stream(loans)
+                if response is not None:
+                    return response
+                if cursor is not None:
+                    return Response([], status=status.HTTP_200_OK)
+                return Response({'Error': 'Customer is not present'}, status=status.HTTP_400_BAD_REQUEST)
+
+            # Fetch one extra loan to know whether another page follows
+            if page_size is not None:
+                loans = list(loans[:page_size + 1])
+                has_next = len(loans) > page_size
+                loans = loans[:page_size]
+            else:
+                has_next = False
 
-                response_data.append(loan_response)
+            # Create a response from the projected loan data
+            response_data = [self.loan_entry(loan_data) for loan_data in loans]
 
             # Return a custom error if there are no loans for the customer
-            if len(response_data) == 0:
+            if len(response_data) == 0 and cursor is None:
                 return Response({'Error': 'Customer is not present'}, status=status.HTTP_400_BAD_REQUEST)
 
-            return Response(response_data, status=status.HTTP_200_OK)
+            response = Response(response_data, status=status.HTTP_200_OK)
+            if has_next:
+                # Clients pass this back as ?cursor= to fetch the next page
+                response['X-Next-Cursor'] = str(response_data[-1]['loan_id'])
+            return response
+
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+class LoanScheduleView(APIView):
+    def stream(self, loan):
+        # Yield the schedule as a JSON array, one installment at a time
+        first = True
+        yield '['
+        for row in amortization_schedule(loan['loan_amount'], loan['tenure'], loan['interest_rate'], loan['start_date']):
+            row['due_date'] = row['due_date'].isoformat()
+            yield ('' if first else ',') + json.dumps(row)
+            first = False
+        yield ']'
+
+    def get(self, request, loan_id, *args, **kwargs):
+        try:
+            # Retrieve the loan terms based on loan_id, from the archive too with ?include_archived=1
+            loan = ViewLoanDetails.find_loan(loan_id, include_archived(request.query_params),
+                                             ['loan_amount', 'tenure', 'interest_rate', 'start_date'])
+            if loan is None:
+                raise Loan.DoesNotExist('Loan matching query does not exist.')
+
+            # Stream the full amortization schedule: due date, principal and interest split, and balance
+            return StreamingHttpResponse(self.stream(loan), content_type='application/json', status=status.HTTP_200_OK)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class CreditScoreHistoryView(APIView):
+    def get(self, request, customer_id, *args, **kwargs):
+        try:
+            # Optional ?as_of= timestamp; without it the latest persisted score is returned
+            when = None
+            as_of = request.query_params.get('as_of')
+            if as_of:
+                when = parse_datetime(as_of)
+                if when is None:
+                    return Response({'error': 'as_of must be an ISO 8601 date and time.'}, status=status.HTTP_400_BAD_REQUEST)
+                if timezone.is_naive(when):
+                    when = timezone.make_aware(when)
+
+            # Retrieve the newest score persisted at or before that time
+            row = score_as_of(customer_id, when)
+            if row is None:
+                return Response({'error': 'No credit score recorded for the customer at that time.'}, status=status.HTTP_400_BAD_REQUEST)
+
+            response_data = {
+                'customer_id': row.customer_id,
+                'credit_score': row.credit_score,
+                'rule_version': row.rule_version,
+                'computed_at': row.created_at.isoformat(),
+                'inputs': row.inputs,
+            }
+            return Response(response_data, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class MetricsView(View):
+    def get(self, request, *args, **kwargs):
+        # Per-endpoint request metrics of this process in the Prometheus text format
+        return HttpResponse(registry.render(get_sample_rate()), content_type='text/plain; version=0.0.4; charset=utf-8')
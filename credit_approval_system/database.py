@@ -0,0 +1,155 @@
+"""
+Database settings read from the environment.
+
+Every value has a default matching the Docker Compose setup, so an unset
+environment keeps working. Tests (``manage.py test``) run on SQLite unless
+DB_ENGINE says otherwise.
+
+Variables:
+- DB_ENGINE: postgresql or sqlite
+- DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT: connection parameters
+  (DB_NAME is the database file for SQLite)
+- DB_CONNECT_TIMEOUT: seconds to wait for a new PostgreSQL connection
+- DB_CONN_MAX_AGE: seconds a connection is kept open between requests,
+  0 to close it after every request, "none" to keep it forever
+- DB_CONN_HEALTH_CHECKS: check a persistent connection before reusing it
+- DB_POOL: use the psycopg 3 connection pool (PostgreSQL only); replaces
+  persistent connections, which Django does not allow together with a pool
+- DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE: connections kept open and the most
+  opened at once, per process
+- DB_POOL_TIMEOUT: seconds a request waits for a free pooled connection
+- DB_REPLICA_HOSTS: comma-separated host[:port] list of read replicas, added as
+  aliases replica_1, replica_2, ... with the primary's other settings
+- DB_REPLICA_SELECTION: how a replica is picked, round_robin or least_busy
+"""
+import os
+import sys
+
+ENGINES = {
+    'postgresql': 'django.db.backends.postgresql',
+    'sqlite': 'django.db.backends.sqlite3',
+}
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'off', ''}
+
+
+def env_bool(environ, name, default):
+    # Read a yes/no variable
+    value = environ.get(name)
+    if value is None:
+        return default
+    if value.strip().lower() in TRUE_VALUES:
+        return True
+    if value.strip().lower() in FALSE_VALUES:
+        return False
+    raise ValueError(f'{name} must be a boolean, got {value!r}')
+
+
+def env_int(environ, name, default):
+    # Read a whole-number variable
+    value = environ.get(name)
+    if value is None or value.strip() == '':
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer, got {value!r}') from None
+
+
+def conn_max_age(environ, name, default):
+    # CONN_MAX_AGE accepts "none" for connections that are never closed
+    value = environ.get(name)
+    if value is not None and value.strip().lower() == 'none':
+        return None
+    return env_int(environ, name, default)
+
+
+def running_tests(argv):
+    return len(argv) > 1 and argv[1] == 'test'
+
+
+def database_settings(environ, prefix='DB_', base_dir=None, engine=None):
+    """
+    Build the settings of one database alias from variables starting with prefix.
+
+    Args:
+    - environ: mapping, Environment variables
+    - prefix: str, Variable name prefix, e.g. DB_ or DB_REPLICA_
+    - base_dir: Path, Directory of the default SQLite file
+    - engine: str, Engine used when <prefix>ENGINE is not set
+
+    Returns:
+    - dict: A DATABASES entry
+    """
+    engine = environ.get(f'{prefix}ENGINE', engine or 'postgresql')
+    if engine not in ENGINES:
+        raise ValueError(f'{prefix}ENGINE must be one of {", ".join(ENGINES)}, got {engine!r}')
+
+    if engine == 'sqlite':
+        return {
+            'ENGINE': ENGINES[engine],
+            'NAME': environ.get(f'{prefix}NAME', str(base_dir / 'db.sqlite3') if base_dir else 'db.sqlite3'),
+        }
+
+    config = {
+        'ENGINE': ENGINES[engine],
+        'NAME': environ.get(f'{prefix}NAME', 'credit_approval_db'),
+        'USER': environ.get(f'{prefix}USER', 'sri'),
+        'PASSWORD': environ.get(f'{prefix}PASSWORD', '123'),
+        'HOST': environ.get(f'{prefix}HOST', 'postgres_db'),
+        'PORT': environ.get(f'{prefix}PORT', '5432'),
+        # Reuse connections across requests instead of paying the connection setup on every one
+        'CONN_MAX_AGE': conn_max_age(environ, f'{prefix}CONN_MAX_AGE', 60),
+        # Reconnect transparently when a persistent connection was dropped by the server
+        'CONN_HEALTH_CHECKS': env_bool(environ, f'{prefix}CONN_HEALTH_CHECKS', True),
+        'OPTIONS': {'connect_timeout': env_int(environ, f'{prefix}CONNECT_TIMEOUT', 5)},
+    }
+
+    if env_bool(environ, f'{prefix}POOL', False):
+        min_size = env_int(environ, f'{prefix}POOL_MIN_SIZE', 2)
+        max_size = env_int(environ, f'{prefix}POOL_MAX_SIZE', 10)
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(f'{prefix}POOL_MIN_SIZE and {prefix}POOL_MAX_SIZE must satisfy 0 <= min <= max, max >= 1')
+        config['OPTIONS']['pool'] = {
+            'min_size': min_size,
+            'max_size': max_size,
+            'timeout': env_int(environ, f'{prefix}POOL_TIMEOUT', 10),
+        }
+        # Pooled connections go back to the pool at the end of each request
+        config['CONN_MAX_AGE'] = 0
+    return config
+
+
+def databases(environ=None, argv=None, base_dir=None):
+    """
+    Build the DATABASES setting.
+
+    Args:
+    - environ: mapping, Environment variables (defaults to os.environ)
+    - argv: list, Command line (defaults to sys.argv); tests default to SQLite
+    - base_dir: Path, Project directory, where the SQLite file lives
+
+    Returns:
+    - dict: DATABASES
+    """
+    environ = os.environ if environ is None else environ
+    argv = sys.argv if argv is None else argv
+    engine = 'sqlite' if running_tests(argv) else 'postgresql'
+    default = database_settings(environ, 'DB_', base_dir, engine)
+    config = {'default': default}
+
+    for index, host in enumerate(filter(None, (host.strip() for host in environ.get('DB_REPLICA_HOSTS', '').split(','))), start=1):
+        host, _, port = host.partition(':')
+        config[f'replica_{index}'] = {**default, 'HOST': host, 'PORT': port or default.get('PORT', ''),
+                                      'OPTIONS': dict(default.get('OPTIONS', {}))}
+
+    if running_tests(argv) and default['ENGINE'] == ENGINES['sqlite'] and len(config) == 1:
+        # A separate database standing in for a replica, used only by the replica routing tests
+        config['replica'] = {'ENGINE': ENGINES['sqlite'], 'NAME': str(base_dir / 'replica.sqlite3') if base_dir else 'replica.sqlite3'}
+    return config
+
+
+def replica_aliases(config):
+    # Aliases of the read replicas configured by DB_REPLICA_HOSTS
+    return [alias for alias in config if alias.startswith('replica_')]
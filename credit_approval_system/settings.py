@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .database import databases, replica_aliases
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -42,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'credit_app.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -75,32 +79,73 @@ WSGI_APPLICATION = 'credit_approval_system.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Read from DB_* environment variables (see credit_approval_system/database.py). The defaults
+# match the Docker Compose database; set DB_HOST=localhost to run against a local PostgreSQL.
+# Connections persist for DB_CONN_MAX_AGE seconds, or come from a psycopg 3 pool with DB_POOL=1.
+DATABASES = databases(base_dir=BASE_DIR)
+
+# Read-only loan endpoints read from these replicas (DB_REPLICA_HOSTS); writes always go to the primary
+DATABASE_ROUTERS = ['credit_app.routers.ReplicaRouter']
+DATABASE_REPLICAS = replica_aliases(DATABASES)
+
+# How the replica of each read-only request is picked: round_robin or least_busy
+DATABASE_REPLICA_SELECTION = os.environ.get('DB_REPLICA_SELECTION', 'round_robin')
+
+# Seconds a customer keeps reading from the primary after a write, so new loans are visible
+# before they replicate; marks are kept in this cache alias, which must be shared between processes
+# (the process-local default fails check credit_app.E001 once DB_REPLICA_HOSTS is set)
+DATABASE_REPLICA_STICKY_SECONDS = 30
+DATABASE_REPLICA_CACHE_ALIAS = 'default'
+
+# PostgreSQL partitioning of the Loan table created by migration 0018 on an empty database, e.g.
+# {'strategy': 'hash', 'partitions': 16} or {'strategy': 'range'}; existing tables are moved online
+# with `manage.py partition_loans`
+LOAN_PARTITIONING = None
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
 
-# Use for localhost
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.postgresql',
-#         'NAME': 'credit_approval_db',
-#         'USER': 'sri',
-#         'PASSWORD': '123',
-#         'HOST': 'localhost',
-#         'PORT': '5432',
-#     }
-# }
-
-# Use for Docker
-DATABASES = {
+# Local memory evicts least recently used entries once MAX_ENTRIES is reached;
+# point this at a shared backend (e.g. Redis with allkeys-lru) in production
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'credit_approval_db',
-        'USER': 'sri',
-        'PASSWORD': '123',
-        'HOST': 'postgres_db',
-        'PORT': '5432',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
     }
 }
 
+# Cache alias and time-to-live (seconds) of cached credit scores
+CREDIT_SCORE_CACHE_ALIAS = 'default'
+CREDIT_SCORE_CACHE_TIMEOUT = 300
+# A process-local cache (LocMemCache) only caches scores when set: loan writes invalidate the cache of one
+# process, so enable it only when a single process serves requests (e.g. runserver)
+CREDIT_SCORE_CACHE_LOCAL = False
+
+# Seconds a persisted credit score is reused by later checks on unchanged loans instead of appending a new one
+CREDIT_SCORE_SNAPSHOT_REUSE_SECONDS = 60
+
+# Scoring rule sets besides the builtin one: inline definitions and/or a JSON file holding a list of them
+# (see credit_app.rules.BUILTIN_RULES for the format). ScoringRuleSet rows in the database are loaded too.
+CREDIT_RULE_SETS = []
+CREDIT_RULES_FILE = None
+
+# Share of customers scored with each rule set version for A/B tests, e.g. {'builtin-1': 90, 'strict-2': 10};
+# customers get CREDIT_RULES_DEFAULT_VERSION when no version takes traffic
+CREDIT_RULES_TRAFFIC = {}
+CREDIT_RULES_DEFAULT_VERSION = 'builtin-1'
+
+# Seconds between checks for rule sets changed by another process
+CREDIT_RULES_CHECK_SECONDS = 5
+
+# Seconds an Idempotency-Key and its stored response are kept
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
 
+# Fraction of requests whose timings and query counts are recorded for /metrics
+REQUEST_METRICS_SAMPLE_RATE = 1.0
 
 
 REST_FRAMEWORK = {
@@ -20,4 +20,5 @@ from django.urls import path, include
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('credit_app.urls')),  # Include app-specific URLs
+    path('async/', include('credit_app.async_urls')),  # Async versions of the loan endpoints, for ASGI servers
 ]